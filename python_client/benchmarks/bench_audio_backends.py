@@ -0,0 +1,78 @@
+"""
+Compare the latency of each audio operation with each backend: the ffmpeg program, and PyAV in process
+The short operations, like encoding a title or probing a file, show the cost of starting a process
+Usage: python -m benchmarks.bench_audio_backends [calls_per_operation]
+"""
+
+import sys
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable
+
+from benchmarks.fixtures import generate_audio
+from python_client.audio_backends import AUDIO_BACKENDS, set_audio_backend
+from python_client.audio_processing import (
+    concatenate_mp3s,
+    convert_to_mp3,
+    cut_audio,
+)
+from python_client.media_metadata import _probe_with_backend
+
+
+def operations(fixtures_dir: Path) -> dict[str, Callable[[], None]]:
+    """
+    The operations to time, by name, each one writing its output in the fixtures directory
+    """
+    title = generate_audio(fixtures_dir / "title.mp3", 2)
+    title_content = title.read_bytes()
+    episode = generate_audio(fixtures_dir / "episode.m4a", 120)
+    part = generate_audio(fixtures_dir / "part.mp3", 30)
+    output = fixtures_dir / "output.mp3"
+    return {
+        "probe[m4a]": lambda: _probe_with_backend(episode),
+        "convert_to_mp3[title,piped]": lambda: convert_to_mp3(title_content, output),
+        "cut_audio[2s of 30s]": lambda: cut_audio(part, output, 10, 12),
+        "concatenate_mp3s[title+30s]": lambda: concatenate_mp3s([title, part], output),
+        "convert_to_mp3[2min]": lambda: convert_to_mp3(episode, output),
+    }
+
+
+def main() -> None:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with TemporaryDirectory() as fixtures_dir:
+        timed_operations = operations(Path(fixtures_dir))
+        latencies = {}
+        for backend in AUDIO_BACKENDS:
+            try:
+                set_audio_backend(backend)
+            except ImportError as e:
+                print(f"Skipping {backend}: {e}")
+                continue
+            # The first call loads the libraries, it is not counted
+            timed_operations["probe[m4a]"]()
+            for name, operation in timed_operations.items():
+                durations = []
+                for _ in range(calls):
+                    start = perf_counter()
+                    operation()
+                    durations.append(perf_counter() - start)
+                latencies[name, backend] = median(durations)
+        print(f"{'':<30}" + "".join(f"{backend:>12}" for backend in AUDIO_BACKENDS))
+        for name in timed_operations:
+            print(
+                f"{name:<30}"
+                + "".join(
+                    (
+                        f"{latencies[name, backend] * 1000:10.1f}ms"
+                        if (name, backend) in latencies
+                        else f"{'-':>12}"
+                    )
+                    for backend in AUDIO_BACKENDS
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
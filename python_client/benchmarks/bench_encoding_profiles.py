@@ -0,0 +1,40 @@
+"""
+Time the conversion of an episode to mp3 with each encoding profile, and compare the size of the files
+The episode is synthetic, a tone and noise: speech compresses better with the variable bitrate profile
+Usage: python -m benchmarks.bench_encoding_profiles [duration_in_minutes ...]
+"""
+
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.fixtures import generate_audio
+from python_client.audio_processing import ENCODING_PROFILES, convert_to_mp3
+
+
+def main() -> None:
+    durations_in_minutes = [int(arg) for arg in sys.argv[1:]] or [10, 60]
+    with TemporaryDirectory() as fixtures_dir:
+        fixtures_dir = Path(fixtures_dir)
+        for duration_in_minutes in durations_in_minutes:
+            episode = generate_audio(
+                fixtures_dir / f"episode_{duration_in_minutes}min.m4a",
+                duration_in_minutes * 60,
+            )
+            for encoding_profile in ENCODING_PROFILES:
+                output_file = fixtures_dir / f"{encoding_profile}.mp3"
+                start = perf_counter()
+                convert_to_mp3(episode, output_file, encoding_profile=encoding_profile)
+                encoding = perf_counter() - start
+                size = output_file.stat().st_size
+                print(
+                    f"{duration_in_minutes:>4} min {encoding_profile:<16}: encoding {encoding:6.2f}s "
+                    f"({duration_in_minutes * 60 / encoding:4.0f}x real time), "
+                    f"{size / 1e6:7.1f} MB ({size * 8 / 1000 / (duration_in_minutes * 60):4.0f} kbps)"
+                )
+                output_file.unlink()
+
+
+if __name__ == "__main__":
+    main()
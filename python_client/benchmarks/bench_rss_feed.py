@@ -0,0 +1,131 @@
+"""
+Time the lookups of every item of a large feed, through the filename index against a search through all the items,
+and the update of the duration of every item, one copy of the feed per update against a single batch update,
+and the peak memory used to list the filenames of the feed, parsing the whole feed against streaming through it
+Usage: python -m benchmarks.bench_rss_feed [item_count ...]
+"""
+
+import sys
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from python_client.rss_feed import (
+    PodcastUpdate,
+    RssFeed,
+    get_podcast_title,
+    iter_feed_items,
+    list_filenames,
+    set_podcast_duration,
+    update_podcasts,
+    _get_item_filename,
+)
+from benchmarks.fixtures import generate_rss_feed, episode_filename
+
+
+def get_podcast_title_by_search(rss_feed: RssFeed, podcast_filename: Path) -> str:
+    """
+    The former implementation of get_podcast_title, kept as a reference point
+    """
+    return (
+        next(
+            item
+            for item in rss_feed.tree.find("channel").findall("item")
+            if _get_item_filename(item) == podcast_filename.name
+        )
+        .find("title")
+        .text
+    )
+
+
+def time_lookups(rss_feed: RssFeed, item_count: int, lookup) -> float:
+    """
+    Time the lookup of the title of every item of a feed
+    :param rss_feed: the feed
+    :param item_count: how many items the feed has
+    :param lookup: the function looking up a title
+    :return: the wall time in seconds
+    """
+    start = perf_counter()
+    for number in range(item_count):
+        lookup(rss_feed, Path(episode_filename(number)))
+    return perf_counter() - start
+
+
+def time_duration_updates(rss_feed: RssFeed, item_count: int, batch: bool) -> float:
+    """
+    Time the update of the duration of every item of a feed
+    :param rss_feed: the feed
+    :param item_count: how many items the feed has
+    :param batch: whether to use a single update_podcasts, or a set_podcast_duration per item
+    :return: the wall time in seconds
+    """
+    start = perf_counter()
+    if batch:
+        update_podcasts(
+            rss_feed,
+            {
+                Path(episode_filename(number)): PodcastUpdate(duration="00:10:00")
+                for number in range(item_count)
+            },
+        )
+    else:
+        for number in range(item_count):
+            rss_feed = set_podcast_duration(
+                rss_feed, Path(episode_filename(number)), "00:10:00"
+            )
+    return perf_counter() - start
+
+
+def peak_memory_of_listing_filenames(rss_file: Path, streaming: bool) -> int:
+    """
+    Measure the peak memory allocated while listing the filenames of a feed
+    :param rss_file: the feed
+    :param streaming: whether to use iter_feed_items or to parse the whole feed
+    :return: the peak memory in bytes
+    """
+    tracemalloc.start()
+    if streaming:
+        [item.filename for item in iter_feed_items(rss_file)]
+    else:
+        list_filenames(RssFeed(rss_file))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    item_counts = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000]
+    with TemporaryDirectory() as fixtures_dir:
+        for item_count in item_counts:
+            rss_file = generate_rss_feed(
+                Path(fixtures_dir) / f"rss_{item_count}.xml", item_count
+            )
+            start = perf_counter()
+            rss_feed = RssFeed(rss_file)
+            parsing = perf_counter() - start
+            search = time_lookups(rss_feed, item_count, get_podcast_title_by_search)
+            index = time_lookups(rss_feed, item_count, get_podcast_title)
+            print(
+                f"{item_count:>6} items: parsing {parsing:7.3f}s, "
+                f"lookups by search {search:8.3f}s, lookups by index {index:7.4f}s"
+            )
+            parsed = peak_memory_of_listing_filenames(rss_file, streaming=False)
+            streamed = peak_memory_of_listing_filenames(rss_file, streaming=True)
+            print(
+                f"{item_count:>6} items: peak memory to list filenames parsing the whole feed {parsed / 2**20:7.2f}MiB, "
+                f"streaming {streamed / 2**20:7.2f}MiB"
+            )
+            if item_count <= 1000:
+                # A copy of the feed per update gets too slow to measure beyond that
+                per_update = time_duration_updates(rss_feed, item_count, batch=False)
+                batch = time_duration_updates(rss_feed, item_count, batch=True)
+                print(
+                    f"{item_count:>6} items: duration updates with one copy per update {per_update:7.3f}s, "
+                    f"in a batch {batch:7.4f}s"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Time the analysis of an episode looking for pauses to cut in, and compare the audio delivered with fixed boundaries
+and a 10 seconds overlap against silence-aware boundaries and a 1 second overlap
+Usage: python -m benchmarks.bench_silence [duration_in_minutes ...]
+"""
+
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.fixtures import generate_audio
+from python_client.audio_processing import get_duration
+from python_client.silence import get_silence_aware_segments
+from python_client.split_podcasts import (
+    OVERLAP_SECONDS,
+    SEGMENT_DURATION_SECONDS,
+    SILENCE_OVERLAP_SECONDS,
+    get_segments,
+)
+
+
+def delivered_seconds(segments: list[tuple[float, float]], duration: float) -> float:
+    """
+    How much audio the segments hold altogether, the last one ending with the episode
+    """
+    return sum(min(end, duration) - start for start, end in segments)
+
+
+def main() -> None:
+    durations_in_minutes = [int(arg) for arg in sys.argv[1:]] or [30, 60, 180]
+    with TemporaryDirectory() as fixtures_dir:
+        for duration_in_minutes in durations_in_minutes:
+            episode = generate_audio(
+                Path(fixtures_dir) / f"episode_{duration_in_minutes}min.mp3",
+                duration_in_minutes * 60,
+            )
+            duration = get_duration(episode)
+            start = perf_counter()
+            silence_segments = get_silence_aware_segments(
+                episode, duration, SEGMENT_DURATION_SECONDS, SILENCE_OVERLAP_SECONDS
+            )
+            analysis = perf_counter() - start
+            fixed_segments = get_segments(
+                duration, SEGMENT_DURATION_SECONDS, OVERLAP_SECONDS
+            )
+            fixed = delivered_seconds(fixed_segments, duration)
+            silence = delivered_seconds(silence_segments, duration)
+            print(
+                f"{duration_in_minutes:>4} min: analysis {analysis:6.2f}s ({duration / analysis:6.0f}x real time), "
+                f"audio delivered {fixed:8.0f}s with fixed boundaries, {silence:8.0f}s in pauses "
+                f"({fixed - silence:.0f}s less)"
+            )
+
+
+if __name__ == "__main__":
+    main()
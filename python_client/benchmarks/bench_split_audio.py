@@ -0,0 +1,77 @@
+"""
+Compare the wall time of splitting an episode with one ffmpeg process per segment against the single pass segmenter
+and against copying the mp3 frames
+Usage: python -m benchmarks.bench_split_audio [duration_in_minutes ...]
+"""
+
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from python_client.audio_processing import cut_audio, get_duration
+from python_client.split_podcasts import get_segments, split_audio, get_segment_filename
+from benchmarks.fixtures import generate_audio
+
+SEGMENT_DURATION_SECONDS = 600
+OVERLAP = 10
+
+
+def split_audio_one_process_per_segment(input_file: Path, output_dir: Path) -> None:
+    """
+    The former implementation of split_audio, kept as a reference point
+    :param input_file: The file to split
+    :param output_dir: The target directory for the splits
+    """
+    segments = get_segments(get_duration(input_file), SEGMENT_DURATION_SECONDS, OVERLAP)
+    for part_number, (lower_bound, upper_bound) in enumerate(segments):
+        cut_audio(
+            input_file,
+            output_dir / get_segment_filename(input_file, part_number, len(segments)),
+            lower_bound,
+            upper_bound,
+        )
+
+
+def time_split(input_file: Path, strategy: str) -> float:
+    """
+    Time one split of the given episode into a throwaway directory
+    :param input_file: the episode to split
+    :param strategy: "per segment" for the one process per segment reference, or a cutting mode of split_audio
+    :return: the wall time in seconds
+    """
+    with TemporaryDirectory() as output_dir:
+        start = perf_counter()
+        if strategy == "per segment":
+            split_audio_one_process_per_segment(input_file, Path(output_dir))
+        else:
+            split_audio(
+                input_file,
+                Path(output_dir),
+                SEGMENT_DURATION_SECONDS,
+                OVERLAP,
+                cutting_mode=strategy,
+            )
+        return perf_counter() - start
+
+
+def main() -> None:
+    durations_in_minutes = [int(arg) for arg in sys.argv[1:]] or [30, 60, 180]
+    with TemporaryDirectory() as fixtures_dir:
+        for duration_in_minutes in durations_in_minutes:
+            episode = generate_audio(
+                Path(fixtures_dir) / f"episode_{duration_in_minutes}min.mp3",
+                duration_in_minutes * 60,
+            )
+            per_segment = time_split(episode, "per segment")
+            single_pass = time_split(episode, "reencode")
+            copy = time_split(episode, "copy")
+            print(
+                f"{duration_in_minutes:>4} min: one process per segment {per_segment:7.2f}s, "
+                f"single pass {single_pass:7.2f}s ({per_segment / single_pass:.2f}x), "
+                f"frame copy {copy:7.2f}s ({per_segment / copy:.2f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import ffmpeg
+
+NOISE_SEED = 42
+
+
+def generate_audio(
+    output_file: Path, duration_seconds: float, seed: int = NOISE_SEED
+) -> Path:
+    """
+    Generate a synthetic audio file of the given duration, a tone mixed with some noise so the encoder has work to do
+    The noise is seeded, so the same file is generated on every run. It is only generated once, and reused if it already exists
+    :param output_file: the target file, an mp3, or an m4a if its name ends with .m4a
+    :param duration_seconds: how long the audio should last
+    :param seed: the seed of the noise. Files of different seeds hold different audio, so they are not skipped as
+    duplicates of each other
+    :return: the path of the generated file
+    """
+    if output_file.exists():
+        return output_file
+    tone = ffmpeg.input(
+        f"sine=frequency=440:sample_rate=44100:duration={duration_seconds}",
+        f="lavfi",
+    )
+    noise = ffmpeg.input(
+        f"anoisesrc=color=pink:sample_rate=44100:amplitude=0.1:seed={seed}:duration={duration_seconds}",
+        f="lavfi",
+    )
+    acodec = "aac" if output_file.suffix == ".m4a" else "libmp3lame"
+    ffmpeg.filter([tone, noise], "amix", inputs=2).output(
+        str(output_file), acodec=acodec, ac=2, ab="192k", loglevel="quiet"
+    ).run(overwrite_output=True)
+    return output_file
+
+
+def generate_rss_feed(output_file: Path, item_count: int) -> Path:
+    """
+    Generate a synthetic rss.xml with the given number of items, shaped like the ones the extension downloads
+    The enclosures are named episode_00000.mp3, episode_00001.mp3...
+    :param output_file: the target rss.xml file
+    :param item_count: how many items the feed has
+    :return: the path of the generated file
+    """
+    items = "\n".join(f"""        <item>
+            <title>Episode {number}</title>
+            <enclosure url="https://my-website-noan.web.app/{episode_filename(number)}" type="audio/mpeg"/>
+            <itunes:duration>undefined</itunes:duration>
+            <pubDate>Thu, 04 Jan 2024</pubDate>
+        </item>""" for number in range(item_count))
+    output_file.write_text(
+        f"""<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd">
+    <channel>
+        <title>Benchmark podcasts</title>
+{items}
+    </channel>
+</rss>""",
+        encoding="utf-8",
+    )
+    return output_file
+
+
+def episode_filename(number: int) -> str:
+    """
+    :param number: the number of an episode of a feed generated by generate_rss_feed
+    :return: the filename of its enclosure
+    """
+    return f"episode_{number:05d}.mp3"
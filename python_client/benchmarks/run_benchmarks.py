@@ -0,0 +1,302 @@
+"""
+Time the split and upload pipelines on synthetic fixtures, and compare the results against a baseline
+
+Usage:
+    python -m benchmarks.run_benchmarks --durations 10 60 --items 1000 --output results.json
+    python -m benchmarks.run_benchmarks --baseline results.json --threshold 0.2
+
+The fixtures are generated locally with ffmpeg and kept in --fixtures-dir, so later runs reuse them.
+Each benchmark runs in a fresh work directory, with an empty cache, and the best time of --repeat runs is kept.
+With --baseline, the run fails if a benchmark is slower than its baseline by more than --threshold.
+"""
+
+import json
+import os
+import platform
+import shutil
+import sys
+from argparse import ArgumentParser, Namespace
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable
+from unittest.mock import patch
+
+import ffmpeg
+
+from benchmarks.fixtures import (
+    NOISE_SEED,
+    episode_filename,
+    generate_audio,
+    generate_rss_feed,
+)
+from python_client.cache import CACHE_DIR_ENVIRONMENT_VARIABLE
+from python_client.preprocessing import set_id3_tags
+from python_client.split_podcasts import (
+    add_title_to_segment,
+    split_audio,
+    split_podcasts,
+)
+from python_client.upload_podcasts import (
+    fill_podcasts_duration,
+    prepare_podcast_upload,
+)
+
+EPISODES_PER_DIRECTORY = 3
+
+
+def parse_args() -> Namespace:
+    """
+    Parse the arguments from the command line
+    :return: the arguments
+    """
+    parser = ArgumentParser(description="Benchmark the split and upload pipelines")
+    parser.add_argument(
+        "--durations",
+        type=float,
+        nargs="+",
+        default=[10.0, 60.0],
+        help="Durations of the synthetic episodes, in minutes",
+    )
+    parser.add_argument(
+        "--items", type=int, default=1000, help="Number of items of the synthetic feed"
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per benchmark")
+    parser.add_argument(
+        "--fixtures-dir",
+        type=Path,
+        default=Path(".benchmark_fixtures"),
+        help="Where the synthetic fixtures are generated and kept",
+    )
+    parser.add_argument("--output", type=Path, help="JSON file to write results to")
+    parser.add_argument("--baseline", type=Path, help="JSON results to compare to")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative slowdown against the baseline considered a regression",
+    )
+    return parser.parse_args()
+
+
+def make_input_dir(work_dir: Path, episodes: list[Path], rss_file: Path) -> Path:
+    """
+    Make an input directory like the one the extension downloads to: a few episodes and the feed
+    :param work_dir: the directory to create the input directory in
+    :param episodes: the synthetic episodes, each one different so none is skipped as a duplicate, mp3 or m4a files
+    :param rss_file: the synthetic feed, its first items being the episodes of the directory
+    :return: the input directory
+    """
+    input_dir = work_dir / "input"
+    input_dir.mkdir()
+    shutil.copy(rss_file, input_dir / "rss.xml")
+    for number, episode in enumerate(episodes):
+        shutil.copy(
+            episode,
+            input_dir / Path(episode_filename(number)).with_suffix(episode.suffix),
+        )
+    return input_dir
+
+
+def check_episodes_processed(output_dir: Path, episode_count: int) -> None:
+    """
+    Make sure every episode of the input directory was processed, since the time measured is otherwise the one of
+    part of the work, e.g. if episodes were skipped as duplicates
+    :param output_dir: the directory of the published episodes, or of their parts
+    :param episode_count: how many episodes there should be
+    :raise RuntimeError: if there are fewer or more episodes
+    """
+    episodes = {part.name.split("_part_")[0] for part in output_dir.glob("*.mp3")}
+    if len(episodes) != episode_count:
+        raise RuntimeError(
+            f"{len(episodes)} episode(s) in {output_dir} instead of {episode_count}, the benchmark is not comparable"
+        )
+
+
+def run_cli(function: Callable[[], None], argv: list[str], work_dir: Path) -> None:
+    """
+    Run an entry point as if called from the command line, from the work directory, publishing in the work directory
+    """
+    previous_dir = Path.cwd()
+    os.chdir(work_dir)
+    try:
+        with patch("sys.argv", argv), patch(
+            "python_client.upload_podcasts.determine_public_dir_path",
+            return_value=work_dir / "public",
+        ):
+            function()
+    finally:
+        os.chdir(previous_dir)
+
+
+def benchmarks_for(
+    duration_minutes: float, fixtures: dict[str, Path | list[Path]]
+) -> dict[str, Callable[[Path], Callable[[], None]]]:
+    """
+    The benchmarks of an episode duration. Each one prepares a work directory and returns the function to time
+    :param duration_minutes: the duration of the episodes
+    :param fixtures: the synthetic files: the different mp3 episodes, the m4a ones, and the rss
+    :return: the benchmarks, by name
+    """
+    mp3s, m4as, rss_file = fixtures["mp3"], fixtures["m4a"], fixtures["rss"]
+    mp3 = mp3s[0]
+
+    def split_audio_benchmark(cutting_mode: str):
+        def setup(work_dir: Path) -> Callable[[], None]:
+            (work_dir / "output").mkdir()
+            return lambda: split_audio(
+                mp3, work_dir / "output", 600, 10, cutting_mode=cutting_mode
+            )
+
+        return setup
+
+    def add_title_to_segment_setup(work_dir: Path) -> Callable[[], None]:
+        segment = work_dir / "segment.mp3"
+        ffmpeg.input(str(mp3), t=600).output(
+            str(segment), acodec="copy", loglevel="quiet"
+        ).run()
+        return lambda: add_title_to_segment(segment, "Partie 1 sur 3 de Episode 0")
+
+    def fill_podcasts_duration_setup(work_dir: Path) -> Callable[[], None]:
+        input_dir = make_input_dir(work_dir, mp3s, rss_file)
+        return lambda: fill_podcasts_duration(input_dir)
+
+    def set_id3_tags_setup(work_dir: Path) -> Callable[[], None]:
+        input_dir = make_input_dir(work_dir, mp3s, rss_file)
+        return lambda: set_id3_tags(input_dir)
+
+    def prepare_podcast_upload_setup(work_dir: Path) -> Callable[[], None]:
+        input_dir = make_input_dir(work_dir, m4as, rss_file)
+
+        def prepare() -> None:
+            run_cli(
+                prepare_podcast_upload,
+                ["prepare_podcast_upload", str(input_dir)],
+                work_dir,
+            )
+            check_episodes_processed(work_dir / "public", len(m4as))
+
+        return prepare
+
+    def split_podcasts_setup(work_dir: Path) -> Callable[[], None]:
+        input_dir = make_input_dir(work_dir, mp3s, rss_file)
+
+        def split() -> None:
+            run_cli(
+                split_podcasts,
+                ["split_podcasts", str(input_dir), str(work_dir / "output")],
+                work_dir,
+            )
+            check_episodes_processed(work_dir / "output", len(mp3s))
+
+        return split
+
+    return {
+        f"split_audio[reencode,{duration_minutes:g}min]": split_audio_benchmark(
+            "reencode"
+        ),
+        f"split_audio[copy,{duration_minutes:g}min]": split_audio_benchmark("copy"),
+        f"add_title_to_segment[{min(duration_minutes, 10):g}min]": add_title_to_segment_setup,
+        f"fill_podcasts_duration[{duration_minutes:g}min]": fill_podcasts_duration_setup,
+        f"set_id3_tags[{duration_minutes:g}min]": set_id3_tags_setup,
+        f"prepare_podcast_upload[{duration_minutes:g}min]": prepare_podcast_upload_setup,
+        f"split_podcasts[{duration_minutes:g}min]": split_podcasts_setup,
+    }
+
+
+def fixture_filename(duration_minutes: float, number: int, suffix: str) -> str:
+    """
+    The name of a synthetic episode, the first one keeping the name it had when every episode was a copy of it
+    """
+    if number == 0:
+        return f"episode_{duration_minutes:g}min.{suffix}"
+    return f"episode_{duration_minutes:g}min_{number}.{suffix}"
+
+
+def time_benchmark(setup: Callable[[Path], Callable[[], None]], repeat: int) -> float:
+    """
+    Time a benchmark, each run in a fresh work directory with an empty cache
+    :param setup: prepares a work directory and returns the function to time
+    :param repeat: how many times to run it
+    :return: the best wall time, in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        with TemporaryDirectory() as work_dir, TemporaryDirectory() as cache_dir:
+            with patch.dict(os.environ, {CACHE_DIR_ENVIRONMENT_VARIABLE: cache_dir}):
+                function = setup(Path(work_dir))
+                start = perf_counter()
+                function()
+                timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def compare_to_baseline(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """
+    Find the benchmarks slower than their baseline by more than the threshold
+    :param results: the seconds of each benchmark
+    :param baseline: the seconds of each benchmark in the baseline, benchmarks missing from either side are ignored
+    :param threshold: the relative slowdown tolerated, e.g. 0.2 for 20%
+    :return: a description of each regression
+    """
+    return [
+        f"{name}: {results[name]:.3f}s against {baseline[name]:.3f}s (+{results[name] / baseline[name] - 1:.0%})"
+        for name in sorted(results.keys() & baseline.keys())
+        if results[name] > baseline[name] * (1 + threshold)
+    ]
+
+
+def main() -> None:
+    args = parse_args()
+    args.fixtures_dir.mkdir(parents=True, exist_ok=True)
+    rss_file = generate_rss_feed(
+        args.fixtures_dir / f"rss_{args.items}.xml", args.items
+    )
+    results = {}
+    for duration_minutes in args.durations:
+        fixtures = {
+            suffix: [
+                generate_audio(
+                    args.fixtures_dir
+                    / fixture_filename(duration_minutes, number, suffix),
+                    duration_minutes * 60,
+                    seed=NOISE_SEED + number,
+                )
+                for number in range(EPISODES_PER_DIRECTORY)
+            ]
+            for suffix in ("mp3", "m4a")
+        }
+        fixtures["rss"] = rss_file
+        for name, setup in benchmarks_for(duration_minutes, fixtures).items():
+            if name in results:
+                continue
+            results[name] = time_benchmark(setup, args.repeat)
+            print(f"{name:<45} {results[name]:9.3f}s")
+
+    report = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "parameters": {"durations": args.durations, "items": args.items},
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print("Regressions against the baseline:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print("No regression against the baseline")
+
+
+if __name__ == "__main__":
+    main()
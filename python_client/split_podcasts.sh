@@ -1 +1 @@
-poetry run split_podcasts $1 $2
+poetry run split_podcasts "$@"
\ No newline at end of file
@@ -0,0 +1,586 @@
+import asyncio
+import io
+import os
+from abc import ABC, abstractmethod
+from fractions import Fraction
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+import ffmpeg
+
+from python_client.ffmpeg_processes import (
+    FFMPEG_TIMEOUT_SECONDS,
+    FFPROBE_TIMEOUT_SECONDS,
+    probe_async,
+    run_ffmpeg_async,
+)
+from python_client.media_metadata import MediaMetadata, probe_media
+
+AUDIO_BACKEND_ENVIRONMENT_VARIABLE = "PYTHON_CLIENT_AUDIO_BACKEND"
+DEFAULT_AUDIO_BACKEND = "ffmpeg"
+
+# An audio file, or its content, which is then piped to ffmpeg instead of being written to a file first.
+# The content must be readable as a stream, like WAV or mp3, unlike an m4a whose index is at its end
+AudioInput = Path | bytes
+
+# How LAME's quality scale is passed to libavcodec, see FF_QP2LAMBDA
+_QP2LAMBDA = 118
+
+
+class AudioBackend(ABC):
+    """
+    What decodes, encodes and probes the audio, see audio_processing for what each operation does
+    The encodings are given as ffmpeg output options, see ENCODING_PROFILES
+    """
+
+    # The prefix of the profiled calls, and how many processes each call spawns
+    name: str
+    processes_per_call: int
+
+    @abstractmethod
+    async def convert(
+        self,
+        input_file: AudioInput,
+        output_file: Path,
+        encoding: dict,
+        sample_rate: int | None,
+        title: str | None,
+        timeout: float | None,
+    ) -> None:
+        pass
+
+    @abstractmethod
+    async def probe(self, input_file: Path, timeout: float | None) -> MediaMetadata:
+        pass
+
+    @abstractmethod
+    async def cut(
+        self,
+        input_file: Path,
+        output_file: Path,
+        lower_bound: float,
+        upper_bound: float,
+        encoding: dict,
+        timeout: float | None,
+    ) -> None:
+        pass
+
+    @abstractmethod
+    async def cut_segments(
+        self,
+        input_file: Path,
+        segments: list[tuple[Path, float, float]],
+        title_audio_files: list[Path] | None,
+        encoding: dict,
+        timeout: float | None,
+    ) -> None:
+        pass
+
+    @abstractmethod
+    async def concatenate(
+        self,
+        inputs: list[AudioInput],
+        output_file: Path,
+        encoding: dict,
+        timeout: float | None,
+    ) -> None:
+        pass
+
+
+class FfmpegBackend(AudioBackend):
+    """
+    Runs the ffmpeg and ffprobe programs, one process per operation
+    """
+
+    name = "ffmpeg"
+    processes_per_call = 1
+
+    async def convert(
+        self,
+        input_file: AudioInput,
+        output_file: Path,
+        encoding: dict,
+        sample_rate: int | None,
+        title: str | None,
+        timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+    ) -> None:
+        resampling = {} if sample_rate is None else {"ar": sample_rate}
+        tags = {} if title is None else {"metadata": f"title={title}"}
+        input_streams, stdin = _ffmpeg_inputs([input_file])
+        await run_ffmpeg_async(
+            input_streams[0].output(
+                str(output_file),
+                format="mp3",  # The output file name may not end with .mp3
+                **encoding,
+                **resampling,
+                **tags,
+            ),
+            timeout,
+            stdin,
+        )
+
+    async def probe(
+        self, input_file: Path, timeout: float | None = FFPROBE_TIMEOUT_SECONDS
+    ) -> MediaMetadata:
+        probe_result = await probe_async(input_file, timeout)
+        audio_stream = probe_result["streams"][0]
+        bitrate = audio_stream.get("bit_rate", probe_result["format"].get("bit_rate"))
+        return MediaMetadata(
+            duration=float(probe_result["format"]["duration"]),
+            codec=audio_stream["codec_name"],
+            bitrate=None if bitrate is None else int(bitrate),
+            sample_rate=int(audio_stream["sample_rate"]),
+            channels=int(audio_stream["channels"]),
+        )
+
+    async def cut(
+        self,
+        input_file: Path,
+        output_file: Path,
+        lower_bound: float,
+        upper_bound: float,
+        encoding: dict,
+        timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+    ) -> None:
+        await run_ffmpeg_async(
+            ffmpeg.input(str(input_file), ss=lower_bound).output(
+                str(output_file), t=upper_bound - lower_bound, **encoding
+            ),
+            timeout,
+        )
+
+    async def cut_segments(
+        self,
+        input_file: Path,
+        segments: list[tuple[Path, float, float]],
+        title_audio_files: list[Path] | None,
+        encoding: dict,
+        timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+    ) -> None:
+        # The input is decoded once and split into as many streams as there are segments
+        split_streams = ffmpeg.input(str(input_file)).audio.filter_multi_output(
+            "asplit", len(segments)
+        )
+        if title_audio_files is not None:
+            # Probing may run ffprobe synchronously, which cannot be done from the event loop's thread
+            sample_rate, channel_layout = await asyncio.to_thread(
+                _get_audio_format, input_file
+            )
+        outputs = []
+        for index, (output_file, lower_bound, upper_bound) in enumerate(segments):
+            segment_stream = (
+                split_streams.stream(index)
+                .filter("atrim", start=lower_bound, end=upper_bound)
+                .filter("asetpts", "PTS-STARTPTS")
+            )
+            if title_audio_files is not None:
+                # The titles are converted to the format of the input, otherwise the segment would take the format of the title
+                title_stream = ffmpeg.input(str(title_audio_files[index])).audio.filter(
+                    "aformat",
+                    sample_rates=sample_rate,
+                    channel_layouts=channel_layout,
+                )
+                segment_stream = ffmpeg.concat(title_stream, segment_stream, v=0, a=1)
+            outputs.append(segment_stream.output(str(output_file), **encoding))
+        await run_ffmpeg_async(ffmpeg.merge_outputs(*outputs), timeout)
+
+    async def concatenate(
+        self,
+        inputs: list[AudioInput],
+        output_file: Path,
+        encoding: dict,
+        timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+    ) -> None:
+        # The concat filter rather than the concat protocol, which cannot read a pipe
+        input_streams, stdin = _ffmpeg_inputs(inputs)
+        await run_ffmpeg_async(
+            ffmpeg.concat(*(stream.audio for stream in input_streams), v=0, a=1).output(
+                str(output_file), **encoding
+            ),
+            timeout,
+            stdin,
+        )
+
+
+class PyAVBackend(AudioBackend):
+    """
+    Runs the libav libraries in process through PyAV, which saves starting a process per operation
+    Probing is faster, but encoding is slower with the LAME built into PyAV's wheels, about 4 times slower than the one
+    of the ffmpeg program, see benchmarks/bench_audio_backends.py. Requires PyAV, see the "pyav" extra.
+    A call cannot be interrupted, so the timeouts are not applied
+    """
+
+    name = "pyav"
+    processes_per_call = 0
+
+    async def convert(
+        self,
+        input_file: AudioInput,
+        output_file: Path,
+        encoding: dict,
+        sample_rate: int | None,
+        title: str | None,
+        timeout: float | None = None,
+    ) -> None:
+        await asyncio.to_thread(
+            self._transcode,
+            [(input_file, None, None)],
+            output_file,
+            encoding,
+            sample_rate,
+            title,
+        )
+
+    async def probe(
+        self, input_file: Path, timeout: float | None = None
+    ) -> MediaMetadata:
+        return await asyncio.to_thread(self._probe, input_file)
+
+    async def cut(
+        self,
+        input_file: Path,
+        output_file: Path,
+        lower_bound: float,
+        upper_bound: float,
+        encoding: dict,
+        timeout: float | None = None,
+    ) -> None:
+        await asyncio.to_thread(
+            self._transcode,
+            [(input_file, lower_bound, upper_bound)],
+            output_file,
+            encoding,
+        )
+
+    async def cut_segments(
+        self,
+        input_file: Path,
+        segments: list[tuple[Path, float, float]],
+        title_audio_files: list[Path] | None,
+        encoding: dict,
+        timeout: float | None = None,
+    ) -> None:
+        await asyncio.to_thread(
+            self._cut_segments, input_file, segments, title_audio_files, encoding
+        )
+
+    async def concatenate(
+        self,
+        inputs: list[AudioInput],
+        output_file: Path,
+        encoding: dict,
+        timeout: float | None = None,
+    ) -> None:
+        await asyncio.to_thread(
+            self._transcode,
+            [(audio, None, None) for audio in inputs],
+            output_file,
+            encoding,
+        )
+
+    def _probe(self, input_file: Path) -> MediaMetadata:
+        av = _import_av()
+        with av.open(str(input_file)) as container:
+            stream = container.streams.audio[0]
+            return MediaMetadata(
+                # Rounded to the microsecond, like ffprobe's
+                duration=round(container.duration / av.time_base, 6),
+                codec=stream.codec_context.codec.canonical_name,
+                bitrate=stream.bit_rate or container.bit_rate or None,
+                sample_rate=stream.codec_context.sample_rate,
+                channels=stream.codec_context.layout.nb_channels,
+            )
+
+    def _transcode(
+        self,
+        inputs: list[tuple[AudioInput, float | None, float | None]],
+        output_file: Path,
+        encoding: dict,
+        sample_rate: int | None = None,
+        title: str | None = None,
+    ) -> None:
+        """
+        Decode audio inputs one after the other, possibly only between bounds, into a single mp3
+        :param inputs: a list of (input, lower_bound, upper_bound), bounds in seconds, None for the whole input
+        :param output_file: the mp3 file
+        :param encoding: the encoding of the mp3
+        :param sample_rate: the sample rate of the mp3, by default the one of the first input
+        :param title: if provided, the title written in the id3 tag of the mp3
+        """
+        av = _import_av()
+        encoder = None
+        try:
+            for audio, lower_bound, upper_bound in inputs:
+                with av.open(_open_source(audio)) as container:
+                    stream = container.streams.audio[0]
+                    if encoder is None:
+                        encoder = _Mp3Encoder(
+                            output_file,
+                            encoding,
+                            sample_rate or stream.codec_context.sample_rate,
+                            stream.codec_context.layout.nb_channels,
+                            title,
+                        )
+                    if lower_bound:
+                        _seek_before(container, stream, lower_bound)
+                    graph = encoder.make_graph(stream, lower_bound, upper_bound)
+                    for frame in container.decode(stream):
+                        if not encoder.push(graph, frame):
+                            break
+                    else:
+                        encoder.push(graph, None)
+        finally:
+            if encoder is not None:
+                encoder.close()
+
+    def _cut_segments(
+        self,
+        input_file: Path,
+        segments: list[tuple[Path, float, float]],
+        title_audio_files: list[Path] | None,
+        encoding: dict,
+    ) -> None:
+        """
+        Cut several parts of an audio file, decoding it once, each decoded frame going to every part it belongs to
+        """
+        av = _import_av()
+        encoders = []
+        try:
+            with av.open(str(input_file)) as container:
+                stream = container.streams.audio[0]
+                for index, (output_file, _, _) in enumerate(segments):
+                    encoders.append(
+                        _Mp3Encoder(
+                            output_file,
+                            encoding,
+                            stream.codec_context.sample_rate,
+                            stream.codec_context.layout.nb_channels,
+                        )
+                    )
+                    if title_audio_files is not None:
+                        # Encoded in the format of the input, like the rest of the part
+                        with av.open(str(title_audio_files[index])) as title_container:
+                            title_stream = title_container.streams.audio[0]
+                            title_graph = encoders[-1].make_graph(title_stream)
+                            for frame in title_container.decode(title_stream):
+                                encoders[-1].push(title_graph, frame)
+                            encoders[-1].push(title_graph, None)
+                graphs = [
+                    encoder.make_graph(stream, lower_bound, upper_bound)
+                    for encoder, (_, lower_bound, upper_bound) in zip(
+                        encoders, segments
+                    )
+                ]
+                pending = set(range(len(segments)))
+                _seek_before(container, stream, min(lower for _, lower, _ in segments))
+                for frame in container.decode(stream):
+                    for index in list(pending):
+                        if not encoders[index].push(graphs[index], frame):
+                            pending.discard(index)
+                    if not pending:
+                        break
+                for index in pending:
+                    encoders[index].push(graphs[index], None)
+        finally:
+            for encoder in encoders:
+                encoder.close()
+
+
+class _Mp3Encoder:
+    """
+    An mp3 file being encoded by PyAV, from the frames of one input after the other
+    Each input goes through its own filter graph, which trims it and converts it to the format of the mp3
+    """
+
+    def __init__(
+        self,
+        output_file: Path,
+        encoding: dict,
+        sample_rate: int,
+        default_channels: int,
+        title: str | None = None,
+    ):
+        av = _import_av()
+        codec, channels, bit_rate, codec_options = _to_pyav_encoding(encoding)
+        self.container = av.open(str(output_file), "w", format="mp3")
+        if title is not None:
+            self.container.metadata["title"] = title
+        self.stream = self.container.add_stream(
+            codec, rate=sample_rate, options=codec_options
+        )
+        self.stream.layout = "mono" if (channels or default_channels) == 1 else "stereo"
+        if bit_rate is not None:
+            self.stream.bit_rate = bit_rate
+        self.sample_format = self.stream.codec_context.codec.audio_formats[0].name
+        self.stream.format = self.sample_format
+        self.time_base = Fraction(1, sample_rate)
+        self.samples_written = 0
+
+    def make_graph(
+        self,
+        input_stream: Any,
+        lower_bound: float | None = None,
+        upper_bound: float | None = None,
+    ) -> Any:
+        av = _import_av()
+        graph = av.filter.Graph()
+        nodes = [graph.add_abuffer(template=input_stream)]
+        if lower_bound is not None:
+            nodes.append(
+                graph.add("atrim", start=str(lower_bound), end=str(upper_bound))
+            )
+        nodes += [
+            graph.add("aresample", str(self.stream.codec_context.sample_rate)),
+            graph.add(
+                "aformat",
+                sample_fmts=self.sample_format,
+                channel_layouts=self.stream.layout.name,
+            ),
+            graph.add("abuffersink"),
+        ]
+        graph.link_nodes(*nodes).configure()
+        return graph
+
+    def push(self, graph: Any, frame: Any) -> bool:
+        """
+        Encode a decoded frame, None once the input is over
+        :return: whether the graph expects more frames, False once its upper bound is reached
+        """
+        av = _import_av()
+        try:
+            graph.push(frame)
+            more_frames = frame is not None
+        except av.EOFError:
+            more_frames = False
+        while True:
+            try:
+                filtered_frame = graph.pull()
+            except (av.BlockingIOError, av.EOFError):
+                return more_frames
+            # The inputs follow each other, their timestamps are replaced by the position in the output
+            filtered_frame.pts = self.samples_written
+            filtered_frame.time_base = self.time_base
+            self.samples_written += filtered_frame.samples
+            self.container.mux(self.stream.encode(filtered_frame))
+
+    def close(self) -> None:
+        try:
+            self.container.mux(self.stream.encode(None))
+        finally:
+            self.container.close()
+
+
+AUDIO_BACKENDS = {"ffmpeg": FfmpegBackend, "pyav": PyAVBackend}
+
+
+def get_audio_backend() -> AudioBackend:
+    """
+    Get the backend chosen with set_audio_backend, or with the environment variable PYTHON_CLIENT_AUDIO_BACKEND
+    :return: the backend, ffmpeg by default
+    """
+    return _make_audio_backend(
+        os.environ.get(AUDIO_BACKEND_ENVIRONMENT_VARIABLE, DEFAULT_AUDIO_BACKEND)
+    )
+
+
+def set_audio_backend(name: str) -> None:
+    """
+    Choose the backend of the audio operations, for this process and the processes it starts
+    :param name: the name of the backend, one of AUDIO_BACKENDS
+    :raise ValueError: if there is no such backend
+    :raise ImportError: if the backend's dependencies are not installed
+    """
+    _make_audio_backend(name)
+    if name == "pyav":
+        _import_av()
+    os.environ[AUDIO_BACKEND_ENVIRONMENT_VARIABLE] = name
+
+
+@cache
+def _make_audio_backend(name: str) -> AudioBackend:
+    try:
+        return AUDIO_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown audio backend {name}, expected one of {', '.join(AUDIO_BACKENDS)}"
+        ) from None
+
+
+def _ffmpeg_inputs(audio_inputs: list[AudioInput]) -> tuple[list[Any], bytes | None]:
+    """
+    Make the ffmpeg inputs of audio files, or of their content piped to ffmpeg
+    :param audio_inputs: the files, or their content, at most one content since there is one standard input
+    :return: the ffmpeg inputs, and what to write to ffmpeg's standard input if any
+    """
+    contents = [audio for audio in audio_inputs if isinstance(audio, bytes)]
+    return [
+        ffmpeg.input("pipe:" if isinstance(audio, bytes) else str(audio))
+        for audio in audio_inputs
+    ], next(iter(contents), None)
+
+
+def _get_audio_format(input_file: Path) -> tuple[int, str]:
+    """
+    Get the format of the first audio stream of a file
+    :param input_file: the audio file
+    :return: its sample rate and channel layout, e.g. (44100, "2c") for a stereo file
+    """
+    metadata = probe_media(input_file)
+    return metadata.sample_rate, f"{metadata.channels}c"
+
+
+def _to_pyav_encoding(
+    encoding: dict,
+) -> tuple[str, int | None, int | None, dict[str, str]]:
+    """
+    Translate ffmpeg output options into what PyAV takes
+    :param encoding: the options, e.g. {"acodec": "libmp3lame", "ac": 1, "q:a": 7}
+    :return: the codec, the number of channels, the bit rate, None when not set, and the options of the codec
+    """
+    unknown_options = encoding.keys() - {"acodec", "ac", "ab", "q:a"}
+    if unknown_options:
+        raise ValueError(
+            f"Unsupported encoding options: {', '.join(sorted(unknown_options))}"
+        )
+    bit_rate = None
+    if "ab" in encoding:
+        bit_rate = str(encoding["ab"])
+        bit_rate = (
+            int(bit_rate[:-1]) * 1000 if bit_rate.endswith("k") else int(bit_rate)
+        )
+    codec_options = {}
+    if "q:a" in encoding:
+        # How the ffmpeg program passes -q:a to the encoder
+        codec_options = {
+            "flags": "+qscale",
+            "global_quality": str(int(encoding["q:a"] * _QP2LAMBDA)),
+        }
+    return (
+        encoding.get("acodec", "libmp3lame"),
+        encoding.get("ac"),
+        bit_rate,
+        codec_options,
+    )
+
+
+def _open_source(audio: AudioInput) -> Any:
+    return io.BytesIO(audio) if isinstance(audio, bytes) else str(audio)
+
+
+def _seek_before(container: Any, stream: Any, seconds: float) -> None:
+    """
+    Seek to a keyframe a second before a position, the trimming filter then drops what comes before it
+    """
+    if seconds > 1:
+        container.seek(int((seconds - 1) / stream.time_base), stream=stream)
+
+
+def _import_av():
+    try:
+        import av
+    except ImportError as e:
+        raise ImportError(
+            "The pyav audio backend requires PyAV, install it with: poetry install --extras pyav"
+        ) from e
+    return av
@@ -1,35 +1,151 @@
 from pathlib import Path
 
-import ffmpeg
+from python_client.audio_backends import AudioInput, get_audio_backend
+from python_client.ffmpeg_processes import FFMPEG_TIMEOUT_SECONDS, run_sync
+from python_client.media_metadata import probe_media
+from python_client.mp3_frames import read_mp3_stream_info
+from python_client.profiling import profile_call
 
+# The encodings of the mp3 files written, the options given to ffmpeg by profile name
+ENCODING_PROFILES = {
+    # Stereo at 192 kbps, transparent for music
+    "archive": {"acodec": "libmp3lame", "ac": 2, "ab": "192k"},
+    # Mono at 64 kbps, a third of the size, speech stays clear
+    "speech-mono-64k": {"acodec": "libmp3lame", "ac": 1, "ab": "64k"},
+    # Mono at LAME's quality 7, about 50 kbps on speech, less during pauses
+    "speech-vbr": {"acodec": "libmp3lame", "ac": 1, "q:a": 7},
+}
+DEFAULT_ENCODING_PROFILE = "archive"
+MP3_ENCODING = ENCODING_PROFILES[DEFAULT_ENCODING_PROFILE]
 
-def convert_to_mp3(input_file: Path, output_file: Path) -> None:
+
+def get_encoding(encoding_profile: str) -> dict:
+    """
+    Get the ffmpeg options of an encoding profile
+    :param encoding_profile: the name of the profile, one of ENCODING_PROFILES
+    :return: the options, to give to an ffmpeg output
+    :raise ValueError: if there is no such profile
+    """
+    try:
+        return ENCODING_PROFILES[encoding_profile]
+    except KeyError:
+        raise ValueError(
+            f"Unknown encoding profile {encoding_profile}, expected one of {', '.join(ENCODING_PROFILES)}"
+        ) from None
+
+
+def convert_to_mp3(
+    input_file: AudioInput,
+    output_file: Path,
+    sample_rate: int | None = None,
+    title: str | None = None,
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+    timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+    channels: int | None = None,
+    bitrate: int | None = None,
+) -> None:
+    """
+    Converts an audio file to mp3, see convert_to_mp3_async
+    """
+    run_sync(
+        convert_to_mp3_async(
+            input_file,
+            output_file,
+            sample_rate,
+            title,
+            encoding_profile,
+            timeout,
+            channels,
+            bitrate,
+        )
+    )
+
+
+async def convert_to_mp3_async(
+    input_file: AudioInput,
+    output_file: Path,
+    sample_rate: int | None = None,
+    title: str | None = None,
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+    timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+    channels: int | None = None,
+    bitrate: int | None = None,
+) -> None:
     """
     Converts an audio file to mp3
-    :param input_file: path of the input file
-    :param output_file: path of the output file
+    :param input_file: path of the input file, or its content, e.g. a WAV synthesized in memory
+    :param output_file: path of the output file, written by the encoder as it goes
+    :param sample_rate: the sample rate of the output, by default the one of the input
+    :param title: if provided, the title written in the id3 tag of the output, in the same pass as the encoding
+    :param encoding_profile: the encoding of the output, one of ENCODING_PROFILES
+    :param timeout: how many seconds ffmpeg may run, None for no limit. The pyav backend does not apply it
+    :param channels: the number of channels of the output, by default the one of the profile
+    :param bitrate: the constant bitrate of the output in bits per second, by default the one of the profile. The
+    encoder rounds it to a bitrate mp3 allows
     """
-    ffmpeg.input(str(input_file)).output(
-        str(output_file),
-        acodec="libmp3lame",  # Specify MP3 codec
-        ac=2,  # Set audio channels to 2
-        ab="192k",  # Set audio bitrate to 192k
-        y=None,  # Overwrite output files without asking
-        loglevel="quiet",
-    ).global_args("-v", "5").run()
+    encoding = get_encoding(encoding_profile)
+    if channels is not None:
+        encoding = {**encoding, "ac": channels}
+    if bitrate is not None:
+        encoding = {
+            **{option: value for option, value in encoding.items() if option != "q:a"},
+            "ab": f"{round(bitrate / 1000)}k",
+        }
+    backend = get_audio_backend()
+    with profile_call(
+        f"{backend.name}.convert_to_mp3",
+        processes=backend.processes_per_call,
+        reads=_files([input_file]),
+        writes=[output_file],
+    ) as record:
+        await backend.convert(
+            input_file, output_file, encoding, sample_rate, title, timeout
+        )
+        if record is not None:
+            record.bytes_read += sum(map(len, _contents([input_file])))
+            record.audio_seconds = _get_mp3_duration(output_file)
 
 
 def get_duration(input_file: Path) -> float:
     """
-    Get the duration of an audio file using ffmpeg
+    Get the duration of an audio file
+    The result is cached until the file changes, see probe_media
     :param input_file: the audio file
     :return: its duration in seconds
     """
-    return float(ffmpeg.probe(input_file)["format"]["duration"])
+    return probe_media(input_file).duration
 
 
 def cut_audio(
-    input_file: Path, output_file: Path, lower_bound: float, upper_bound: float
+    input_file: Path,
+    output_file: Path,
+    lower_bound: float,
+    upper_bound: float,
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+    timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+) -> None:
+    """
+    Cut a part of an audio file, see cut_audio_async
+    """
+    run_sync(
+        cut_audio_async(
+            input_file,
+            output_file,
+            lower_bound,
+            upper_bound,
+            encoding_profile,
+            timeout,
+        )
+    )
+
+
+async def cut_audio_async(
+    input_file: Path,
+    output_file: Path,
+    lower_bound: float,
+    upper_bound: float,
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+    timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
 ) -> None:
     """
     Cut a part of an audio file
@@ -37,24 +153,142 @@ def cut_audio(
     :param output_file: the output file path
     :param lower_bound: start of the segment to cut
     :param upper_bound: end of the segment to cut
+    :param encoding_profile: the encoding of the output, one of ENCODING_PROFILES
+    :param timeout: how many seconds ffmpeg may run, None for no limit. The pyav backend does not apply it
     """
+    encoding = get_encoding(encoding_profile)
     if not input_file.exists():
         raise FileNotFoundError(f"File not found: {input_file}")
     if not output_file.parent.exists():
         raise FileNotFoundError(f"Folder not found: {output_file.parent}")
-    ffmpeg.input(str(input_file), ss=lower_bound).output(
-        str(output_file), t=upper_bound - lower_bound, loglevel="quiet"
-    ).run(overwrite_output=True)
+    backend = get_audio_backend()
+    with profile_call(
+        f"{backend.name}.cut_audio",
+        processes=backend.processes_per_call,
+        reads=[input_file],
+        writes=[output_file],
+    ) as record:
+        await backend.cut(
+            input_file, output_file, lower_bound, upper_bound, encoding, timeout
+        )
+        if record is not None:
+            record.audio_seconds = _get_mp3_duration(output_file)
+
+
+def cut_audio_segments(
+    input_file: Path,
+    segments: list[tuple[Path, float, float]],
+    title_audio_files: list[Path] | None = None,
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+    timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+) -> None:
+    """
+    Cut several parts of an audio file in a single pass, see cut_audio_segments_async
+    """
+    run_sync(
+        cut_audio_segments_async(
+            input_file, segments, title_audio_files, encoding_profile, timeout
+        )
+    )
+
+
+async def cut_audio_segments_async(
+    input_file: Path,
+    segments: list[tuple[Path, float, float]],
+    title_audio_files: list[Path] | None = None,
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+    timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+) -> None:
+    """
+    Cut several parts of an audio file in a single pass
+    The input is decoded once and split into as many streams as there are segments, each one trimmed to its bounds,
+    so the overlapping parts of the segments are not decoded twice
+    :param input_file: the input file path
+    :param segments: a list of (output_file, lower_bound, upper_bound), bounds in seconds
+    :param title_audio_files: if provided, the audio to put at the start of each segment, one per segment.
+    Each segment is then encoded only once, title included
+    :param encoding_profile: the encoding of the output, one of ENCODING_PROFILES
+    :param timeout: how many seconds ffmpeg may run, None for no limit. The pyav backend does not apply it
+    """
+    encoding = get_encoding(encoding_profile)
+    if not input_file.exists():
+        raise FileNotFoundError(f"File not found: {input_file}")
+    for output_file, _, _ in segments:
+        if not output_file.parent.exists():
+            raise FileNotFoundError(f"Folder not found: {output_file.parent}")
+    if not segments:
+        return
+    output_files = [output_file for output_file, _, _ in segments]
+    backend = get_audio_backend()
+    with profile_call(
+        f"{backend.name}.cut_audio_segments",
+        processes=backend.processes_per_call,
+        reads=[input_file, *(title_audio_files or [])],
+        writes=output_files,
+    ) as record:
+        await backend.cut_segments(
+            input_file, segments, title_audio_files, encoding, timeout
+        )
+        if record is not None:
+            record.audio_seconds = sum(map(_get_mp3_duration, output_files))
+
+
+def concatenate_mp3s(
+    mp3s: list[AudioInput],
+    output_mp3: Path,
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+    timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+) -> None:
+    """
+    Concatenate mp3 files, see concatenate_mp3s_async
+    """
+    run_sync(concatenate_mp3s_async(mp3s, output_mp3, encoding_profile, timeout))
+
+
+async def concatenate_mp3s_async(
+    mp3s: list[AudioInput],
+    output_mp3: Path,
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+    timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+) -> None:
+    """
+    Concatenate mp3 files, reencode the audio (here the title of the part and its content)
+    The files may have different formats, the output takes the sample rate of the first one
+    :param mp3s: the mp3 files, in order, e.g. the title then the content. At most one of them may be given as its
+    content, e.g. when the output replaces it
+    :param output_mp3: the output file path
+    :param encoding_profile: the encoding of the output, one of ENCODING_PROFILES
+    :param timeout: how many seconds ffmpeg may run, None for no limit. The pyav backend does not apply it
+    """
+    encoding = get_encoding(encoding_profile)
+    contents = _contents(mp3s)
+    if len(contents) > 1:
+        raise ValueError("Only one of the mp3 files can be given as its content")
+    backend = get_audio_backend()
+    with profile_call(
+        f"{backend.name}.concatenate_mp3s",
+        processes=backend.processes_per_call,
+        reads=_files(mp3s),
+        writes=[output_mp3],
+    ) as record:
+        await backend.concatenate(mp3s, output_mp3, encoding, timeout)
+        if record is not None:
+            record.bytes_read += sum(map(len, contents))
+            record.audio_seconds = _get_mp3_duration(output_mp3)
+
+
+def _files(audio_inputs: list[AudioInput]) -> list[Path]:
+    return [audio for audio in audio_inputs if isinstance(audio, Path)]
+
+
+def _contents(audio_inputs: list[AudioInput]) -> list[bytes]:
+    return [audio for audio in audio_inputs if isinstance(audio, bytes)]
 
 
-def concatenate_mp3s(mp3s: list[Path], output_mp3: Path) -> None:
+def _get_mp3_duration(mp3_file: Path) -> float:
     """
-    Concatenate 2 mp3 files using ffmpeg, reencode the audio (here the title of the part and its content)
-    :param first_mp3: The path to the title
-    :param second_mp3: The path to the content
-    :param output_mp3 : The output file pat
+    Read the duration of an mp3 from its headers, for profiling, without going through the metadata cache
+    :return: the duration in seconds, 0 if the file is not a plain mp3 file
     """
-    ffmpeg_argument = "|".join(str(mp3) for mp3 in mp3s)
-    ffmpeg.input(f"concat:{ffmpeg_argument}").output(
-        str(output_mp3), acodec="libmp3lame", loglevel="quiet"
-    ).run(overwrite_output=True)
+    stream_info = read_mp3_stream_info(mp3_file)
+    return 0.0 if stream_info is None else stream_info.duration
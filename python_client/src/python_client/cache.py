@@ -0,0 +1,100 @@
+import os
+from hashlib import sha256
+from pathlib import Path
+from tempfile import mkstemp
+
+CACHE_DIR_ENVIRONMENT_VARIABLE = "PYTHON_CLIENT_CACHE_DIR"
+
+
+def determine_cache_dir_path(name: str) -> Path:
+    """
+    Determine the path of a cache directory, creating it if necessary
+    The caches live in ~/.cache/python_client unless the environment variable PYTHON_CLIENT_CACHE_DIR says otherwise
+    :param name: the name of the cache, i.e. the sub directory used by one kind of cached data
+    :return: the path of the cache directory
+    """
+    cache_root = os.environ.get(
+        CACHE_DIR_ENVIRONMENT_VARIABLE, Path.home() / ".cache" / "python_client"
+    )
+    cache_dir = Path(cache_root) / name
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def file_cache_key(file: Path) -> str:
+    """
+    Compute a key identifying a file in its current state, it changes as soon as the file is modified or moved
+    :param file: the file
+    :return: a hash of the file's absolute path, size and modification time
+    """
+    stat = file.stat()
+    identity = f"{file.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+    return sha256(identity.encode("utf-8")).hexdigest()
+
+
+class FileCache:
+    """
+    A directory of files addressed by a key, bounded in size
+    When it grows over its maximum size, the least recently used files are evicted
+    """
+
+    def __init__(self, name: str, max_size_bytes: int, suffix: str = ""):
+        self.directory = determine_cache_dir_path(name)
+        self.max_size_bytes = max_size_bytes
+        self.suffix = suffix
+
+    def get(self, key: str) -> Path | None:
+        """
+        Get the file stored under a key, marking it as recently used
+        :param key: the key of the file
+        :return: the path of the cached file, None if it is not in the cache
+        """
+        path = self.directory / (key + self.suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def new_temporary_file(self) -> Path:
+        """
+        Create an empty file in the cache directory, to be filled then stored with put
+        Being on the same filesystem as the cache, it is moved into it without copy
+        :return: the path of the temporary file
+        """
+        file_descriptor, path = mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(file_descriptor)
+        return Path(path)
+
+    def put(self, key: str, file: Path) -> Path:
+        """
+        Move a file into the cache, then evict the least recently used files if the cache is too big
+        :param key: the key to store the file under
+        :param file: the file to move, usually created by new_temporary_file
+        :return: the path of the cached file
+        """
+        path = self.directory / (key + self.suffix)
+        file.replace(path)
+        self.evict()
+        return path
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used files until the cache fits in its maximum size
+        """
+        entries = []
+        for path in self.directory.glob("*" + self.suffix):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Evicted by another process meanwhile
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
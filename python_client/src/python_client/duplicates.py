@@ -0,0 +1,143 @@
+import sqlite3
+from contextlib import contextmanager
+from hashlib import sha256
+from pathlib import Path
+from typing import Iterator
+
+import ffmpeg
+
+from python_client.cache import determine_cache_dir_path
+from python_client.ffmpeg_processes import run_ffmpeg
+from python_client.media_metadata import probe_media
+from python_client.profiling import profile_call
+
+# A few short windows spread over the episode are decoded, rather than the whole file hashed
+FINGERPRINT_WINDOWS = 4
+FINGERPRINT_WINDOW_SECONDS = 2.0
+# Decoded as mono at a low rate, the fingerprint is then the same whatever the id3 tags or the file name
+FINGERPRINT_SAMPLE_RATE = 8000
+
+
+def find_duplicate_episodes(
+    episodes: list[Path], feed_filenames: list[str] | None = None
+) -> dict[Path, Path]:
+    """
+    Find the episodes captured more than once, e.g. under different URLs, by comparing the fingerprints of their audio
+    The fingerprints are cached until the files change, see fingerprint_audio
+    :param episodes: the audio files of the episodes
+    :param feed_filenames: the filenames in the order of the feed, see list_filenames. Of several copies of an episode,
+    the one that comes first in the feed is kept. By default, the first one by name
+    :return: the episode kept, by duplicate episode
+    """
+    feed_order = {
+        filename: index for index, filename in enumerate(feed_filenames or [])
+    }
+    kept_episodes: dict[str, Path] = {}
+    duplicates = {}
+    for episode in sorted(
+        episodes,
+        key=lambda episode: (
+            feed_order.get(episode.with_suffix(".mp3").name, len(feed_order)),
+            episode.name,
+        ),
+    ):
+        kept_episode = kept_episodes.setdefault(fingerprint_audio(episode), episode)
+        if kept_episode != episode:
+            duplicates[episode] = kept_episode
+    return duplicates
+
+
+def report_duplicates(duplicates: dict[Path, Path]) -> None:
+    """
+    Tell which episodes are skipped for being duplicates of others
+    :param duplicates: the episode kept, by duplicate episode, see find_duplicate_episodes
+    """
+    for duplicate, kept_episode in duplicates.items():
+        print(
+            f"{duplicate.name} is the same episode as {kept_episode.name}, it is skipped"
+        )
+
+
+def fingerprint_audio(audio_file: Path) -> str:
+    """
+    Get the fingerprint of an audio file, computing it only if the file has changed since it was last computed
+    The fingerprints are stored in an sqlite database, by path, along with the size and modification time of the file
+    :param audio_file: the audio file
+    :return: its fingerprint, see compute_audio_fingerprint
+    """
+    path = str(audio_file.resolve())
+    stat = audio_file.stat()
+    with _connect() as connection:
+        row = connection.execute(
+            "SELECT fingerprint FROM fingerprints WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, stat.st_size, stat.st_mtime_ns),
+        ).fetchone()
+    if row is not None:
+        return row[0]
+
+    fingerprint = compute_audio_fingerprint(audio_file)
+    with _connect() as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO fingerprints (path, size, mtime_ns, fingerprint) VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, fingerprint),
+        )
+    return fingerprint
+
+
+def compute_audio_fingerprint(audio_file: Path) -> str:
+    """
+    Compute a fingerprint of the audio of a file, the same for 2 files holding the same audio
+    A few windows, evenly spread over the audio, are decoded in a single ffmpeg process and hashed with the duration.
+    Two encodings of the same episode, e.g. an m4a and an mp3, do not decode to the same samples and differ
+    :param audio_file: the audio file
+    :return: a hash of the duration and of the decoded windows
+    """
+    # Rounded, so the windows start at the same time in 2 files whose duration is read slightly differently
+    duration = round(probe_media(audio_file).duration, 1)
+    window_seconds = min(FINGERPRINT_WINDOW_SECONDS, duration / FINGERPRINT_WINDOWS)
+    windows = [
+        ffmpeg.input(
+            str(audio_file),
+            ss=round(duration * (index + 0.5) / FINGERPRINT_WINDOWS, 3),
+            t=window_seconds,
+        ).audio
+        for index in range(FINGERPRINT_WINDOWS)
+    ]
+    with profile_call(
+        "ffmpeg.decode_fingerprint", processes=1, reads=[audio_file]
+    ) as record:
+        pcm = run_ffmpeg(
+            ffmpeg.concat(*windows, v=0, a=1).output(
+                "pipe:",
+                format="s16le",
+                acodec="pcm_s16le",
+                ac=1,
+                ar=FINGERPRINT_SAMPLE_RATE,
+            )
+        )
+        if record is not None:
+            record.audio_seconds = len(pcm) / 2 / FINGERPRINT_SAMPLE_RATE
+    return sha256(f"{duration}:".encode("utf-8") + pcm).hexdigest()
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    """
+    Open the fingerprint database, creating it if necessary
+    The transaction is committed, and the connection closed, when leaving the context
+    """
+    connection = sqlite3.connect(
+        determine_cache_dir_path("fingerprints") / "fingerprints.sqlite",
+        timeout=30,
+    )
+    try:
+        with connection:
+            connection.execute("""CREATE TABLE IF NOT EXISTS fingerprints (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    fingerprint TEXT NOT NULL
+                )""")
+            yield connection
+    finally:
+        connection.close()
@@ -0,0 +1,215 @@
+import gzip
+import os
+from copy import deepcopy
+from datetime import date, datetime
+from email.utils import parsedate_to_datetime
+from hashlib import sha256
+from pathlib import Path
+from typing import Collection
+from xml.etree import ElementTree as ET
+
+from python_client.profiling import profile_call
+from python_client.publishing import PublishSummary
+from python_client.rss_feed import remove_podcasts_from_feed
+
+FEED_FILENAME = "rss.xml"
+PAGE_FILENAME = "rss_page_{}.xml"
+ETAG_SUFFIX = ".etag"
+ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
+ET.register_namespace("atom", ATOM_NAMESPACE)
+
+
+def publish_feed(
+    rss_file: Path,
+    public_dir: Path,
+    page_size: int | None = None,
+    timestamp: datetime | None = None,
+    excluded_filenames: Collection[str] = (),
+) -> PublishSummary:
+    """
+    Publish the feed to the public directory, along with its gzip and brotli variants and an ETag sidecar
+    A static server can then serve the compressed variants as they are, and answer conditional requests with the ETag.
+    Nothing is written, nor backed up, unless the content of the feed changed since it was last published
+    :param rss_file: the feed to publish
+    :param public_dir: the public directory
+    :param page_size: if provided, the feed is also published as pages of this many items, the most recent first,
+    linked to each other as a paged feed (RFC 5005)
+    :param timestamp: the time used to name the backup of the previous feed, by default now
+    :param excluded_filenames: the filenames of podcasts whose items are left out of the published feed, e.g. the
+    duplicates of other podcasts. The feed to publish is left as it is
+    :return: what was written, each variant and sidecar counting as a copied file
+    """
+    content = remove_podcasts_from_feed(rss_file.read_bytes(), excluded_filenames)
+    summary = PublishSummary()
+    feed = public_dir / FEED_FILENAME
+    if not _is_published(content, feed):
+        backup_rss_xml_file(public_dir, timestamp or datetime.now())
+        summary += write_feed_artifacts(content, feed)
+    else:
+        summary.unchanged_files += 1
+
+    pages = [] if page_size is None else paginate_feed(content, page_size)
+    for page_number, page_content in enumerate(pages, start=1):
+        page = public_dir / PAGE_FILENAME.format(page_number)
+        if _is_published(page_content, page):
+            summary.unchanged_files += 1
+        else:
+            summary += write_feed_artifacts(page_content, page)
+    _remove_pages_after(public_dir, len(pages))
+    return summary
+
+
+def write_feed_artifacts(content: bytes, target: Path) -> PublishSummary:
+    """
+    Write a feed, its precompressed variants, then its ETag sidecar, which is written last so an interrupted write
+    is redone on the next publication
+    :param content: the content of the feed
+    :param target: the file of the feed
+    :return: what was written
+    """
+    summary = PublishSummary()
+    with profile_call("feed.write_artifacts") as record:
+        for file, file_content in [
+            (target, content),
+            *(
+                (target.with_name(target.name + suffix), variant)
+                for suffix, variant in compress_variants(content).items()
+            ),
+            (target.with_name(target.name + ETAG_SUFFIX), make_etag(content).encode()),
+        ]:
+            _write_atomically(file, file_content)
+            summary.copied_files += 1
+            summary.bytes_written += len(file_content)
+        if record is not None:
+            record.bytes_written = summary.bytes_written
+    return summary
+
+
+def compress_variants(content: bytes) -> dict[str, bytes]:
+    """
+    Compress a file the way static servers expect to find it precompressed, e.g. rss.xml.gz next to rss.xml
+    :param content: the content of the file
+    :return: the compressed content by file suffix, gzip always, brotli if the brotli package is installed
+    """
+    # A fixed mtime, so the same content always gives the same compressed file
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        return variants
+    variants[".br"] = brotli.compress(content, mode=brotli.MODE_TEXT)
+    return variants
+
+
+def make_etag(content: bytes) -> str:
+    """
+    The entity tag of a content, a strong validator as defined by RFC 9110
+    :param content: the content
+    :return: a hash of the content, between double quotes
+    """
+    return f'"{sha256(content).hexdigest()}"'
+
+
+def paginate_feed(content: bytes, page_size: int) -> list[bytes]:
+    """
+    Split a feed into pages of items, the most recent items on the first page
+    The items are ordered by publication date, then by their order in the feed, the last ones being the most recent.
+    Each page holds the channel's description, and links to the first, previous and next pages
+    :param content: the feed
+    :param page_size: how many items per page, at least 1
+    :return: the content of each page, at least one even if the feed has no items
+    """
+    root = ET.fromstring(content)
+    channel = root.find("channel")
+    items = channel.findall("item")
+    for item in items:
+        channel.remove(item)
+    items = [
+        item
+        for _, item in sorted(
+            enumerate(items),
+            key=lambda indexed_item: (
+                _parse_pub_date(indexed_item[1].findtext("pubDate")),
+                indexed_item[0],
+            ),
+            reverse=True,
+        )
+    ]
+    page_count = max(1, -(-len(items) // page_size))
+    pages = []
+    for page_number in range(1, page_count + 1):
+        page_root = deepcopy(root)
+        page_channel = page_root.find("channel")
+        links = {"first": 1}
+        if page_number > 1:
+            links["previous"] = page_number - 1
+        if page_number < page_count:
+            links["next"] = page_number + 1
+        for relation, linked_page in links.items():
+            ET.SubElement(
+                page_channel,
+                f"{{{ATOM_NAMESPACE}}}link",
+                rel=relation,
+                href=PAGE_FILENAME.format(linked_page),
+            )
+        page_channel.extend(
+            items[(page_number - 1) * page_size : page_number * page_size]
+        )
+        pages.append(ET.tostring(page_root, encoding="utf-8", xml_declaration=True))
+    return pages
+
+
+def backup_rss_xml_file(public_dir_path: Path, timestamp: datetime) -> None:
+    """ "
+    Back up the rss file, if it exists, by adding a timestamp to its name
+    :param public_dir_path the path of the public
+    :param timestamp the timestamp used to rename the file
+    """
+    suffix = timestamp.strftime("%y%m%d_%H%M%S")
+    try:
+        (public_dir_path / "rss.xml").rename(public_dir_path / f"rss_{suffix}.xml")
+    except FileNotFoundError:
+        pass
+
+
+def _is_published(content: bytes, target: Path) -> bool:
+    etag_file = target.with_name(target.name + ETAG_SUFFIX)
+    try:
+        return target.exists() and etag_file.read_text() == make_etag(content)
+    except FileNotFoundError:
+        return False
+
+
+def _remove_pages_after(public_dir: Path, page_count: int) -> None:
+    page_number = page_count + 1
+    while (public_dir / PAGE_FILENAME.format(page_number)).exists():
+        page = public_dir / PAGE_FILENAME.format(page_number)
+        for suffix in ("", ".gz", ".br", ETAG_SUFFIX):
+            page.with_name(page.name + suffix).unlink(missing_ok=True)
+        page_number += 1
+
+
+def _parse_pub_date(pub_date: str | None) -> date:
+    """
+    The day of an RFC 822 publication date, the extension writes it without a time, e.g. "Thu, 04 Jan 2024"
+    :return: the day, the earliest possible one if there is no valid date
+    """
+    if pub_date:
+        try:
+            return parsedate_to_datetime(pub_date).date()
+        except (TypeError, ValueError):
+            pass
+        try:
+            return datetime.strptime(pub_date.strip(), "%a, %d %b %Y").date()
+        except ValueError:
+            pass
+    return date.min
+
+
+def _write_atomically(file: Path, content: bytes) -> None:
+    tmp_file = file.with_name(f".{file.name}.tmp")
+    try:
+        tmp_file.write_bytes(content)
+        os.replace(tmp_file, file)
+    finally:
+        tmp_file.unlink(missing_ok=True)
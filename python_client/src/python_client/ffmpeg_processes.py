@@ -0,0 +1,233 @@
+import asyncio
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Coroutine, TypeVar
+
+import ffmpeg
+
+# A hung ffmpeg, e.g. on a corrupt download, is killed after this long. Encoding an hour of audio takes about a minute
+FFMPEG_TIMEOUT_SECONDS = 3600
+FFPROBE_TIMEOUT_SECONDS = 60
+# Only the last part of the error output is kept in the error message, ffmpeg's first lines are about its configuration
+STDERR_TAIL_LENGTH = 2000
+
+# How often a call waiting for a free slot checks again
+SLOT_POLL_INTERVAL_SECONDS = 0.01
+
+# Shared by every thread, each one running its own event loop, see run_sync
+_process_slots = threading.BoundedSemaphore(os.cpu_count() or 1)
+
+T = TypeVar("T")
+
+
+class ProcessFailedError(ffmpeg.Error):
+    """
+    Raised when ffmpeg or ffprobe exits with an error
+    It is an ffmpeg.Error, as raised by ffmpeg-python, with the error output of the process in its message
+    """
+
+    def __init__(self, command: list[str], returncode: int | None, stderr: bytes):
+        super().__init__(command[0], None, stderr)
+        self.command = command
+        self.returncode = returncode
+        stderr_tail = stderr.decode("utf-8", errors="replace")[-STDERR_TAIL_LENGTH:]
+        self.args = (
+            f"{' '.join(command)} exited with code {returncode}:\n{stderr_tail}",
+        )
+
+
+class ProcessTimeoutError(ProcessFailedError, TimeoutError):
+    """
+    Raised when ffmpeg or ffprobe does not finish in time, the process is then killed
+    """
+
+    def __init__(self, command: list[str], timeout: float, stderr: bytes):
+        super().__init__(command, None, stderr)
+        stderr_tail = stderr.decode("utf-8", errors="replace")[-STDERR_TAIL_LENGTH:]
+        self.args = (
+            f"{' '.join(command)} did not finish within {timeout}s:\n{stderr_tail}",
+        )
+
+
+def set_max_concurrent_processes(max_concurrent_processes: int) -> None:
+    """
+    Set how many ffmpeg or ffprobe processes may run at the same time, by default the number of CPUs
+    The limit applies to all the threads of the Python process, whatever their event loop.
+    The processes already running are not counted against the new limit
+    :param max_concurrent_processes: the limit, at least 1
+    """
+    global _process_slots
+    _process_slots = threading.BoundedSemaphore(max(1, max_concurrent_processes))
+
+
+async def run_process_async(
+    command: list[str],
+    timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+    stdin: bytes | None = None,
+) -> bytes:
+    """
+    Run a process, waiting for a slot if as many processes as allowed are already running, see
+    set_max_concurrent_processes
+    The process is killed if it does not finish in time, or if the awaiting task is cancelled
+    :param command: the program and its arguments
+    :param timeout: how many seconds the process may run, None for no limit
+    :param stdin: if provided, what is written to the standard input of the process, otherwise it reads nothing
+    :return: the standard output of the process
+    :raise ProcessFailedError: if the process exits with an error, with its error output
+    :raise ProcessTimeoutError: if the process does not finish in time, with the error output written until then
+    """
+    async with _process_slot():
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=(
+                asyncio.subprocess.DEVNULL if stdin is None else asyncio.subprocess.PIPE
+            ),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        # Filled as the process writes it, so what was written is kept if it is killed
+        stderr = bytearray()
+        try:
+            stdout = await asyncio.wait_for(
+                _communicate(process, stdin, stderr), timeout
+            )
+        except asyncio.TimeoutError:
+            await _kill(process)
+            raise ProcessTimeoutError(command, timeout, bytes(stderr)) from None
+        except BaseException:
+            # Cancelled, the process must not outlive the task
+            await _kill(process)
+            raise
+    if process.returncode != 0:
+        raise ProcessFailedError(command, process.returncode, bytes(stderr))
+    return stdout
+
+
+async def run_ffmpeg_async(
+    stream_spec: Any,
+    timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+    stdin: bytes | None = None,
+) -> bytes:
+    """
+    Run an ffmpeg-python graph, overwriting the output files
+    :param stream_spec: the outputs of the graph, as given to ffmpeg.run
+    :param timeout: how many seconds ffmpeg may run, None for no limit
+    :param stdin: if provided, the content of the "pipe:" input of the graph
+    :return: what ffmpeg wrote to its standard output, i.e. to the "pipe:" output if any
+    """
+    command = ffmpeg.compile(stream_spec, overwrite_output=True)
+    # Only errors are written to stderr, it is then part of the error raised
+    return await run_process_async(
+        [command[0], "-hide_banner", "-loglevel", "error", *command[1:]],
+        timeout,
+        stdin,
+    )
+
+
+async def probe_async(
+    input_file: Path, timeout: float | None = FFPROBE_TIMEOUT_SECONDS
+) -> dict:
+    """
+    Run ffprobe on the first audio stream of a file
+    :param input_file: the file to probe
+    :param timeout: how many seconds ffprobe may run, None for no limit
+    :return: the output of ffprobe, as ffmpeg.probe returns it
+    """
+    stdout = await run_process_async(
+        [
+            "ffprobe",
+            "-loglevel",
+            "error",
+            "-show_format",
+            "-show_streams",
+            "-select_streams",
+            "a:0",
+            "-of",
+            "json",
+            str(input_file),
+        ],
+        timeout,
+    )
+    return json.loads(stdout)
+
+
+def run_ffmpeg(
+    stream_spec: Any,
+    timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+    stdin: bytes | None = None,
+) -> bytes:
+    """
+    Synchronous run_ffmpeg_async, for code that is not running in an event loop
+    """
+    return run_sync(run_ffmpeg_async(stream_spec, timeout, stdin))
+
+
+def probe(input_file: Path, timeout: float | None = FFPROBE_TIMEOUT_SECONDS) -> dict:
+    """
+    Synchronous probe_async, for code that is not running in an event loop
+    """
+    return run_sync(probe_async(input_file, timeout))
+
+
+def run_sync(coroutine: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine in a new event loop, from code that is not running in an event loop, e.g. a thread of a pool
+    :param coroutine: the coroutine
+    :return: its result
+    """
+    return asyncio.run(coroutine)
+
+
+@asynccontextmanager
+async def _process_slot() -> AsyncIterator[None]:
+    """
+    Hold one of the slots shared by all the threads while the process runs
+    The slot is polled for, rather than waited for in another thread, so a cancelled wait cannot take a slot
+    that is never given back
+    """
+    slots = _process_slots
+    while not slots.acquire(blocking=False):
+        await asyncio.sleep(SLOT_POLL_INTERVAL_SECONDS)
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+async def _communicate(
+    process: asyncio.subprocess.Process, stdin: bytes | None, stderr: bytearray
+) -> bytes:
+    """
+    Process.communicate, appending the error output to stderr as it is read
+    :return: the standard output of the process
+    """
+
+    async def write_stdin() -> None:
+        if stdin is None:
+            return
+        process.stdin.write(stdin)
+        try:
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # The process exited without reading everything, its exit code tells why
+            pass
+        process.stdin.close()
+
+    async def read_stderr() -> None:
+        while chunk := await process.stderr.read(1 << 16):
+            stderr.extend(chunk)
+
+    stdout, _, _ = await asyncio.gather(
+        process.stdout.read(), write_stdin(), read_stderr()
+    )
+    await process.wait()
+    return stdout
+
+
+async def _kill(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is None:
+        process.kill()
+    await process.wait()
@@ -7,6 +7,19 @@ def create_firebase_json(public_dir: Path) -> None:
     Create a file firebase.json in the current directory containing the path of the public directory
     :param public_dir: where the public dir is, i.e. the directory containing the podcasts to upload
     """
-    json_content = {"hosting": {"public": str(public_dir)}}
+    # Dot files, such as the publish manifest, are not meant to be served
+    # The feeds are revalidated on every poll, which costs a 304 without body as long as they have not changed
+    json_content = {
+        "hosting": {
+            "public": str(public_dir),
+            "ignore": ["**/.*"],
+            "headers": [
+                {
+                    "source": "/rss*.xml",
+                    "headers": [{"key": "Cache-Control", "value": "no-cache"}],
+                }
+            ],
+        }
+    }
     with open("firebase.json", "w", encoding="utf-8") as f:
         dump(json_content, f)
@@ -0,0 +1,110 @@
+import json
+import os
+from hashlib import sha256
+from pathlib import Path
+
+JOURNAL_FILENAME = ".split_journal.jsonl"
+
+
+class Journal:
+    """
+    The units of work completed in an output directory, e.g. an episode cut, so a rerun can skip them
+    Each completed unit is appended as a JSON line, so processes may record units at the same time,
+    and a run killed while writing loses at most the unit being recorded. The last line of a unit wins.
+    A unit is done if it was recorded with the same fingerprint, and its outputs were not modified since
+    """
+
+    def __init__(self, directory: Path):
+        self.file = directory / JOURNAL_FILENAME
+
+    def is_done(self, unit: str, fingerprint: str) -> bool:
+        """
+        Tell whether a unit of work has been completed with the same inputs, and its outputs are still there
+        :param unit: the unit of work, e.g. "cut:episode.mp3"
+        :param fingerprint: what the unit of work was made from, see make_fingerprint
+        :return: whether the unit of work can be skipped
+        """
+        entry = self._read_entries().get(unit)
+        return (
+            entry is not None
+            and entry["fingerprint"] == fingerprint
+            and all(
+                _describe_file(self.file.parent / name) == output
+                for name, output in entry["outputs"].items()
+            )
+        )
+
+    def record(self, unit: str, fingerprint: str, outputs: list[Path]) -> None:
+        """
+        Record a unit of work as completed
+        :param unit: the unit of work
+        :param fingerprint: what the unit of work was made from
+        :param outputs: the files written by the unit of work, in the directory of the journal
+        """
+        line = json.dumps(
+            {
+                "unit": unit,
+                "fingerprint": fingerprint,
+                "outputs": {output.name: _describe_file(output) for output in outputs},
+            }
+        )
+        # A single write in append mode, so the lines written by several processes do not interleave
+        fd = os.open(self.file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (line + "\n").encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def compact(self) -> None:
+        """
+        Rewrite the journal with only the last line of each unit, the ones of previous runs being outdated
+        It must not be called while other processes record units
+        """
+        entries = self._read_entries()
+        if not entries:
+            return
+        tmp_file = self.file.with_name(f"{self.file.name}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            for entry in entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_file, self.file)
+
+    def _read_entries(self) -> dict[str, dict]:
+        entries = {}
+        try:
+            with open(self.file, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line of a run killed while recording a unit
+                        continue
+                    entries[entry["unit"]] = entry
+        except FileNotFoundError:
+            pass
+        return entries
+
+
+def make_fingerprint(input_files: list[Path], parameters: dict) -> str:
+    """
+    Identify what a unit of work is made from: its input files in their current state, and its parameters
+    :param input_files: the files read by the unit of work
+    :param parameters: the parameters of the unit of work, serializable as JSON
+    :return: a hash of the size and modification time of the input files, and the parameters
+    """
+    content = json.dumps(
+        {
+            "inputs": [_describe_file(input_file) for input_file in input_files],
+            "parameters": parameters,
+        },
+        sort_keys=True,
+    )
+    return sha256(content.encode("utf-8")).hexdigest()
+
+
+def _describe_file(file: Path) -> list | None:
+    try:
+        stat = file.stat()
+    except FileNotFoundError:
+        return None
+    return [file.name, stat.st_size, stat.st_mtime_ns]
@@ -0,0 +1,111 @@
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass, astuple, fields
+from pathlib import Path
+from typing import Iterator
+
+from python_client.cache import determine_cache_dir_path
+from python_client.ffmpeg_processes import FFPROBE_TIMEOUT_SECONDS, run_sync
+from python_client.mp3_frames import read_mp3_stream_info
+from python_client.profiling import profile_call
+
+
+@dataclass(frozen=True)
+class MediaMetadata:
+    """
+    What is known about an audio file without decoding it
+    """
+
+    duration: float
+    codec: str
+    bitrate: int | None
+    sample_rate: int
+    channels: int
+
+
+_COLUMNS = ", ".join(field.name for field in fields(MediaMetadata))
+
+
+def probe_media(input_file: Path) -> MediaMetadata:
+    """
+    Get the metadata of an audio file, probing it only if it has changed since it was last probed
+    The metadata are stored in an sqlite database, by path, along with the size and modification time of the file
+    :param input_file: the audio file
+    :return: its metadata
+    """
+    path = str(input_file.resolve())
+    stat = input_file.stat()
+    with _connect() as connection:
+        row = connection.execute(
+            f"SELECT {_COLUMNS} FROM media WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, stat.st_size, stat.st_mtime_ns),
+        ).fetchone()
+    if row is not None:
+        return MediaMetadata(*row)
+
+    metadata = _read_mp3_headers(input_file) or _probe_with_backend(input_file)
+    with _connect() as connection:
+        connection.execute(
+            f"INSERT OR REPLACE INTO media (path, size, mtime_ns, {_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, *astuple(metadata)),
+        )
+    return metadata
+
+
+def _read_mp3_headers(input_file: Path) -> MediaMetadata | None:
+    """
+    Read the metadata of an mp3 file in process, which is much cheaper than spawning ffprobe
+    :return: the metadata, None if the file is not a plain mp3 file
+    """
+    if input_file.suffix != ".mp3":
+        return None
+    with profile_call("mp3_frames.read_mp3_stream_info"):
+        stream_info = read_mp3_stream_info(input_file)
+    if stream_info is None:
+        return None
+    return MediaMetadata(
+        duration=stream_info.duration,
+        codec="mp3",
+        bitrate=stream_info.bitrate,
+        sample_rate=stream_info.sample_rate,
+        channels=stream_info.channels,
+    )
+
+
+def _probe_with_backend(input_file: Path) -> MediaMetadata:
+    """
+    Probe a file with the audio backend, ffprobe by default
+    """
+    # The backends build MediaMetadata, they cannot be imported before it is defined
+    from python_client.audio_backends import get_audio_backend
+
+    backend = get_audio_backend()
+    with profile_call(f"{backend.name}.probe", processes=backend.processes_per_call):
+        return run_sync(backend.probe(input_file, FFPROBE_TIMEOUT_SECONDS))
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    """
+    Open the metadata database, creating it if necessary
+    The transaction is committed, and the connection closed, when leaving the context
+    """
+    connection = sqlite3.connect(
+        determine_cache_dir_path("media_metadata") / "media_metadata.sqlite",
+        timeout=30,
+    )
+    try:
+        with connection:
+            connection.execute("""CREATE TABLE IF NOT EXISTS media (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    duration REAL NOT NULL,
+                    codec TEXT NOT NULL,
+                    bitrate INTEGER,
+                    sample_rate INTEGER NOT NULL,
+                    channels INTEGER NOT NULL
+                )""")
+            yield connection
+    finally:
+        connection.close()
@@ -0,0 +1,456 @@
+import mmap
+import struct
+from array import array
+from dataclasses import dataclass
+from math import ceil, floor
+from pathlib import Path
+from typing import BinaryIO
+
+from python_client.cache import determine_cache_dir_path, file_cache_key
+from python_client.profiling import profile_call
+
+# Indexed by the 2 version bits of the frame header: 0 is MPEG 2.5, 2 is MPEG 2, 3 is MPEG 1
+_SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+# Layer III bitrates in kbps, by bitrate index, for MPEG 1 and for MPEG 2 / 2.5
+_MPEG1_BITRATES = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_MPEG2_BITRATES = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+
+_INDEX_FILE_HEADER = struct.Struct("<4sII")
+_INDEX_FILE_MAGIC = b"MP3I"
+# The flags of a Xing tag holding the number of frames and the number of bytes of the file
+_XING_FRAMES_AND_BYTES = 0b11
+
+
+@dataclass(frozen=True)
+class Mp3FrameHeader:
+    """
+    The information held by the 4 bytes header of an mp3 frame
+    """
+
+    sample_rate: int
+    samples_per_frame: int
+    frame_length: int
+    bitrate: int
+    channels: int
+    side_info_length: int
+
+
+@dataclass
+class Mp3FrameIndex:
+    """
+    The position in bytes of every audio frame of an mp3 file
+    frame_offsets holds one more offset than there are frames: the end of the last frame
+    """
+
+    sample_rate: int
+    samples_per_frame: int
+    frame_offsets: array
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.frame_offsets) - 1
+
+    @property
+    def duration(self) -> float:
+        return self.frame_count * self.samples_per_frame / self.sample_rate
+
+
+@dataclass(frozen=True)
+class Mp3StreamInfo:
+    """
+    The characteristics of an mp3 file, as read from its headers
+    """
+
+    duration: float
+    bitrate: int
+    sample_rate: int
+    channels: int
+
+
+def parse_frame_header(header: bytes) -> Mp3FrameHeader | None:
+    """
+    Parse the header of an MPEG audio layer III frame
+    :param header: the 4 bytes at the start of the frame
+    :return: the parsed header, None if the bytes are not the header of an mp3 frame this module can handle
+    """
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0b11
+    layer = (header[1] >> 1) & 0b11
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0b11
+    # Version 1 is reserved, layer 1 is layer III, free format (0) and 15 are not usable bitrates
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    padding = (header[2] >> 1) & 1
+    channels = 1 if header[3] >> 6 == 0b11 else 2
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    if version == 3:
+        bitrate = _MPEG1_BITRATES[bitrate_index]
+        samples_per_frame = 1152
+        side_info_length = 17 if channels == 1 else 32
+    else:
+        bitrate = _MPEG2_BITRATES[bitrate_index]
+        samples_per_frame = 576
+        side_info_length = 9 if channels == 1 else 17
+    frame_length = samples_per_frame // 8 * bitrate * 1000 // sample_rate + padding
+    return Mp3FrameHeader(
+        sample_rate=sample_rate,
+        samples_per_frame=samples_per_frame,
+        frame_length=frame_length,
+        bitrate=bitrate,
+        channels=channels,
+        side_info_length=side_info_length,
+    )
+
+
+def build_mp3_frame_index(mp3_file: Path) -> Mp3FrameIndex:
+    """
+    Walk through the frames of an mp3 file to list their position, without decoding them
+    The Xing/Info/VBRI frame, if any, is not part of the index since it describes the whole file and is not audio
+    :param mp3_file: the mp3 file
+    :return: the index of the frames
+    :raise ValueError: if the file is not a plain mp3 file, i.e. a succession of layer III frames of the same sample rate
+    """
+    if mp3_file.stat().st_size == 0:
+        # An empty file cannot be mapped in memory
+        raise ValueError(f"{mp3_file} is empty")
+    with open(mp3_file, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        offset = _skip_id3v2_tag(data)
+        first_header = parse_frame_header(data[offset : offset + 4])
+        if first_header is None:
+            raise ValueError(f"{mp3_file} does not start with an mp3 frame")
+        if _is_info_frame(data, offset, first_header):
+            offset += first_header.frame_length
+
+        frame_offsets = array("Q")
+        while offset + 4 <= len(data):
+            header = parse_frame_header(data[offset : offset + 4])
+            if header is None:
+                if _is_trailing_tag(data, offset):
+                    break
+                raise ValueError(
+                    f"{mp3_file} has no valid mp3 frame at byte {offset}, it cannot be sliced without decoding"
+                )
+            if header.sample_rate != first_header.sample_rate:
+                raise ValueError(f"{mp3_file} mixes several sample rates")
+            if offset + header.frame_length > len(data):
+                # The last frame was truncated, typically by an interrupted download
+                break
+            frame_offsets.append(offset)
+            offset += header.frame_length
+        if not frame_offsets:
+            raise ValueError(f"{mp3_file} does not contain any audio frame")
+        frame_offsets.append(offset)
+    return Mp3FrameIndex(
+        sample_rate=first_header.sample_rate,
+        samples_per_frame=first_header.samples_per_frame,
+        frame_offsets=frame_offsets,
+    )
+
+
+def read_mp3_stream_info(mp3_file: Path) -> Mp3StreamInfo | None:
+    """
+    Read the duration and format of an mp3 file from its headers, without decoding it nor spawning a process
+    The duration comes from the Xing/Info or VBRI frame when there is one, like the ones written by libmp3lame.
+    Otherwise, if the first frames share the same bitrate, the file is assumed to be CBR and the duration is deduced from its size.
+    As a last resort every frame header is read.
+    Durations are rounded to the microsecond, like ffprobe's
+    :param mp3_file: the mp3 file
+    :return: the information read, None if the file is not a plain mp3 file, e.g. an empty one
+    """
+    if mp3_file.stat().st_size == 0:
+        # An empty file cannot be mapped in memory
+        return None
+    with open(mp3_file, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        audio_start = _skip_id3v2_tag(data)
+        header = parse_frame_header(data[audio_start : audio_start + 4])
+        if header is None:
+            return None
+        frame_count = _read_info_frame_count(data, audio_start, header)
+        if frame_count is not None:
+            duration = frame_count * header.samples_per_frame / header.sample_rate
+            audio_bytes = len(data) - audio_start - header.frame_length
+            # An Info frame is the Xing frame of a CBR file
+            xing_offset = audio_start + 4 + header.side_info_length
+            is_constant_bitrate = data[xing_offset : xing_offset + 4] == b"Info"
+            bitrate = (
+                round(audio_bytes * 8 / duration)
+                if duration and not is_constant_bitrate
+                else header.bitrate * 1000
+            )
+            return Mp3StreamInfo(
+                round(duration, 6), bitrate, header.sample_rate, header.channels
+            )
+        if _starts_with_constant_bitrate(data, audio_start, header):
+            audio_end = len(data) - (128 if data[-128:-125] == b"TAG" else 0)
+            duration = (audio_end - audio_start) * 8 / (header.bitrate * 1000)
+            return Mp3StreamInfo(
+                round(duration, 6),
+                header.bitrate * 1000,
+                header.sample_rate,
+                header.channels,
+            )
+    try:
+        index = build_mp3_frame_index(mp3_file)
+    except ValueError:
+        return None
+    audio_bytes = index.frame_offsets[-1] - index.frame_offsets[0]
+    return Mp3StreamInfo(
+        round(index.duration, 6),
+        round(audio_bytes * 8 / index.duration),
+        header.sample_rate,
+        header.channels,
+    )
+
+
+def get_mp3_frame_index(mp3_file: Path) -> Mp3FrameIndex:
+    """
+    Get the frame index of an mp3 file, building it only if it is not in the cache yet
+    The cached index is invalidated as soon as the file is modified
+    :param mp3_file: the mp3 file
+    :return: the index of its frames
+    :raise ValueError: if the file is not a plain mp3 file
+    """
+    index_file = determine_cache_dir_path("mp3_frames") / (
+        file_cache_key(mp3_file) + ".idx"
+    )
+    try:
+        return _load_mp3_frame_index(index_file)
+    except (FileNotFoundError, ValueError):
+        with profile_call(
+            "mp3_frames.build_mp3_frame_index", reads=[mp3_file]
+        ) as record:
+            index = build_mp3_frame_index(mp3_file)
+            if record is not None:
+                record.audio_seconds = index.duration
+        _save_mp3_frame_index(index, index_file)
+        return index
+
+
+def copy_cut_mp3(
+    index: Mp3FrameIndex,
+    input_file: Path,
+    output_file: Path,
+    lower_bound: float,
+    upper_bound: float,
+    title_audio_file: Path | None = None,
+) -> None:
+    """
+    Cut a part of an mp3 file by copying its frames, without decoding nor re-encoding the audio
+    The bounds are rounded to the enclosing frames, i.e. to about 26 milliseconds.
+    The frames are preceded by an Info frame, or a Xing frame if their bitrates differ, holding their number, so
+    the duration of the output is known without reading all of it
+    :param index: the frame index of the input file
+    :param input_file: the input file path
+    :param output_file: the output file path
+    :param lower_bound: start of the segment to cut, in seconds
+    :param upper_bound: end of the segment to cut, in seconds
+    :param title_audio_file: if provided, an mp3 whose frames are put before the segment's.
+    It must have the same sample rate and number of channels as the input, and should have the same bitrate
+    :raise ValueError: if the title audio cannot be put before the frames of the input
+    """
+    if not output_file.parent.exists():
+        raise FileNotFoundError(f"Folder not found: {output_file.parent}")
+    frame_duration = index.samples_per_frame / index.sample_rate
+    first_frame = min(floor(lower_bound / frame_duration), index.frame_count)
+    last_frame = min(ceil(upper_bound / frame_duration), index.frame_count)
+    parts = [(index, input_file, first_frame, last_frame)]
+    if title_audio_file is not None:
+        title_index = build_mp3_frame_index(title_audio_file)
+        input_header = _read_frame_header(input_file, index.frame_offsets[0])
+        title_header = _read_frame_header(
+            title_audio_file, title_index.frame_offsets[0]
+        )
+        if (title_header.sample_rate, title_header.channels) != (
+            input_header.sample_rate,
+            input_header.channels,
+        ):
+            raise ValueError(
+                f"The sample rate or channels of {title_audio_file} differ from the ones of {input_file}"
+            )
+        parts.insert(0, (title_index, title_audio_file, 0, title_index.frame_count))
+    with profile_call("mp3_frames.copy_cut_mp3", writes=[output_file]) as record, open(
+        output_file, "wb"
+    ) as target:
+        info_frame = _make_info_frame(parts)
+        target.write(info_frame)
+        for part in parts:
+            _copy_frames(*part, target)
+        if record is not None:
+            # Only the frames copied are read
+            record.bytes_read = target.tell() - len(info_frame)
+            record.audio_seconds = (last_frame - first_frame) * frame_duration
+
+
+def _make_info_frame(parts: list[tuple[Mp3FrameIndex, Path, int, int]]) -> bytes:
+    """
+    Make the frame describing a file made of the frames of other files, like the one written by LAME
+    It is a silent frame of the same format as the first audio frame, whose side information is followed by a Xing
+    tag, named Info if all the frames have the same bitrate, with the number of frames and bytes of the file
+    :param parts: the index, file, first and last frames of each run of frames copied, in order
+    :return: the frame
+    """
+    frame_count = sum(
+        last_frame - first_frame for _, _, first_frame, last_frame in parts
+    )
+    audio_bytes = sum(
+        index.frame_offsets[last_frame] - index.frame_offsets[first_frame]
+        for index, _, first_frame, last_frame in parts
+    )
+    bitrate_indexes = set()
+    first_header = None
+    for index, file, first_frame, last_frame in parts:
+        if first_frame == last_frame:
+            continue
+        with open(file, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            if first_header is None:
+                offset = index.frame_offsets[first_frame]
+                first_header = bytearray(data[offset : offset + 4])
+            bitrate_indexes.update(
+                data[index.frame_offsets[frame] + 2] >> 4
+                for frame in range(first_frame, last_frame)
+            )
+    if first_header is None:
+        # No frame is copied, the sample rate of the input is enough to make an empty file readable
+        index, file, _, _ = parts[-1]
+        first_header = bytearray(_read_raw_frame_header(file, index.frame_offsets[0]))
+    # Without CRC nor padding, so the tag follows the side information and the frame has its nominal length
+    first_header[1] |= 0b1
+    first_header[2] &= 0b11111101
+    tag = b"Info" if len(bitrate_indexes) <= 1 else b"Xing"
+    for bitrate_index in range(first_header[2] >> 4, 15):
+        first_header[2] = (bitrate_index << 4) | (first_header[2] & 0x0F)
+        header = parse_frame_header(bytes(first_header))
+        tag_offset = 4 + header.side_info_length
+        if header.frame_length >= tag_offset + 16:
+            break
+        # Too short to hold the tag, a larger frame does not have the bitrate of the others
+        tag = b"Xing"
+    frame = bytearray(header.frame_length)
+    frame[:4] = first_header
+    frame[tag_offset : tag_offset + 16] = tag + struct.pack(
+        ">III", _XING_FRAMES_AND_BYTES, frame_count, len(frame) + audio_bytes
+    )
+    return bytes(frame)
+
+
+def _read_raw_frame_header(mp3_file: Path, offset: int) -> bytes:
+    with open(mp3_file, "rb") as f:
+        f.seek(offset)
+        return f.read(4)
+
+
+def _read_frame_header(mp3_file: Path, offset: int) -> Mp3FrameHeader:
+    return parse_frame_header(_read_raw_frame_header(mp3_file, offset))
+
+
+def _copy_frames(
+    index: Mp3FrameIndex,
+    input_file: Path,
+    first_frame: int,
+    last_frame: int,
+    target: BinaryIO,
+) -> None:
+    start = index.frame_offsets[first_frame]
+    remaining = index.frame_offsets[last_frame] - start
+    with open(input_file, "rb") as source:
+        source.seek(start)
+        while remaining > 0:
+            chunk = source.read(min(remaining, 1 << 20))
+            if not chunk:
+                raise ValueError(f"{input_file} changed while it was being cut")
+            target.write(chunk)
+            remaining -= len(chunk)
+
+
+def _skip_id3v2_tag(data: mmap.mmap) -> int:
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    has_footer = data[5] & 0x10
+    return 10 + size + (10 if has_footer else 0)
+
+
+def _is_info_frame(data: mmap.mmap, offset: int, header: Mp3FrameHeader) -> bool:
+    xing_offset = offset + 4 + header.side_info_length
+    vbri_offset = offset + 4 + 32
+    return data[xing_offset : xing_offset + 4] in (b"Xing", b"Info") or (
+        data[vbri_offset : vbri_offset + 4] == b"VBRI"
+    )
+
+
+def _read_info_frame_count(
+    data: mmap.mmap, offset: int, header: Mp3FrameHeader
+) -> int | None:
+    """
+    Read the number of audio frames of a file from its Xing/Info or VBRI frame
+    :return: the number of frames, None if there is no such frame or it does not hold the number of frames
+    """
+    xing_offset = offset + 4 + header.side_info_length
+    if data[xing_offset : xing_offset + 4] in (b"Xing", b"Info"):
+        (flags,) = struct.unpack(">I", data[xing_offset + 4 : xing_offset + 8])
+        if not flags & 1:
+            return None
+        (frame_count,) = struct.unpack(">I", data[xing_offset + 8 : xing_offset + 12])
+        return frame_count
+    vbri_offset = offset + 4 + 32
+    if data[vbri_offset : vbri_offset + 4] == b"VBRI":
+        (frame_count,) = struct.unpack(">I", data[vbri_offset + 14 : vbri_offset + 18])
+        return frame_count
+    return None
+
+
+def _starts_with_constant_bitrate(
+    data: mmap.mmap, offset: int, header: Mp3FrameHeader, frames_to_check: int = 10
+) -> bool:
+    """
+    Whether the first frames of a file without Xing/Info frame all have the bitrate of the first one
+    """
+    for _ in range(frames_to_check):
+        next_header = parse_frame_header(data[offset : offset + 4])
+        if next_header is None:
+            # The file is shorter than the frames to check
+            return _is_trailing_tag(data, offset) or offset >= len(data)
+        if next_header.bitrate != header.bitrate:
+            return False
+        offset += next_header.frame_length
+    return True
+
+
+def _is_trailing_tag(data: mmap.mmap, offset: int) -> bool:
+    return (
+        data[offset : offset + 3] == b"TAG" or data[offset : offset + 8] == b"APETAGEX"
+    )
+
+
+def _load_mp3_frame_index(index_file: Path) -> Mp3FrameIndex:
+    content = index_file.read_bytes()
+    magic, sample_rate, samples_per_frame = _INDEX_FILE_HEADER.unpack_from(content)
+    if magic != _INDEX_FILE_MAGIC:
+        raise ValueError(f"{index_file} is not an mp3 frame index")
+    frame_offsets = array("Q")
+    frame_offsets.frombytes(content[_INDEX_FILE_HEADER.size :])
+    return Mp3FrameIndex(sample_rate, samples_per_frame, frame_offsets)
+
+
+def _save_mp3_frame_index(index: Mp3FrameIndex, index_file: Path) -> None:
+    tmp_file = index_file.with_suffix(".tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(
+            _INDEX_FILE_HEADER.pack(
+                _INDEX_FILE_MAGIC, index.sample_rate, index.samples_per_frame
+            )
+        )
+        index.frame_offsets.tofile(f)
+    tmp_file.replace(index_file)
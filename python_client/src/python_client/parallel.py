@@ -0,0 +1,114 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable
+
+from tqdm import tqdm
+
+from python_client.profiling import (
+    call_profiled,
+    is_profiling_enabled,
+    merge_records,
+    profile_stage,
+)
+
+
+class JobsFailedError(RuntimeError):
+    """
+    Raised once all the jobs have run, when some of them failed
+    """
+
+    def __init__(self, failures: list[tuple[tuple, BaseException]]):
+        self.failures = failures
+        failures_list = "\n".join(
+            f"{_describe_arguments(arguments)}: {error!r}"
+            for arguments, error in failures
+        )
+        super().__init__(f"{len(failures)} job(s) failed:\n{failures_list}")
+
+
+def run_jobs(
+    function: Callable[..., Any],
+    jobs_arguments: list[tuple],
+    jobs: int,
+    description: str,
+    threads: bool = False,
+) -> list[Any]:
+    """
+    Call a function once per tuple of arguments, in a pool of processes when several jobs are allowed
+    A failing job does not stop the others, the failures are raised together once every job has run
+    :param function: the function to call, it must be picklable, i.e. defined at the top level of a module
+    :param jobs_arguments: the positional arguments of each call
+    :param jobs: how many calls may run at the same time, 1 runs them one after the other in the current process
+    :param description: the description of the progress bar
+    :param threads: use a pool of threads rather than processes, for functions that mostly wait for a subprocess
+    When profiling, the calls are attributed to a stage named after the description, and the records of worker
+    processes are merged into the ones of the current process, except those of failed calls
+    :return: the results of the calls, in the order of jobs_arguments
+    :raise JobsFailedError: if any call raised an exception, listing the failures in the order of jobs_arguments
+    """
+    with profile_stage(description):
+        if jobs <= 1:
+            results, errors = _run_serially(function, jobs_arguments, description)
+        else:
+            results, errors = _run_in_pool(
+                function, jobs_arguments, jobs, description, threads
+            )
+    if errors:
+        raise JobsFailedError(
+            [
+                (jobs_arguments[position], errors[position])
+                for position in sorted(errors)
+            ]
+        )
+    return results
+
+
+def _run_serially(
+    function: Callable[..., Any], jobs_arguments: list[tuple], description: str
+) -> tuple[list[Any], dict[int, BaseException]]:
+    results: list[Any] = [None] * len(jobs_arguments)
+    errors: dict[int, BaseException] = {}
+    for position, arguments in enumerate(tqdm(jobs_arguments, description)):
+        try:
+            results[position] = function(*arguments)
+        except Exception as e:
+            errors[position] = e
+    return results, errors
+
+
+def _run_in_pool(
+    function: Callable[..., Any],
+    jobs_arguments: list[tuple],
+    jobs: int,
+    description: str,
+    threads: bool,
+) -> tuple[list[Any], dict[int, BaseException]]:
+    results: list[Any] = [None] * len(jobs_arguments)
+    errors: dict[int, BaseException] = {}
+    # Threads share the records of the current process, worker processes have to send theirs back
+    profile_workers = is_profiling_enabled() and not threads
+    executor_class = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with executor_class(max_workers=jobs) as executor:
+        futures = {
+            (
+                executor.submit(call_profiled, function, description, arguments)
+                if profile_workers
+                else executor.submit(function, *arguments)
+            ): position
+            for position, arguments in enumerate(jobs_arguments)
+        }
+        for future in tqdm(as_completed(futures), description, total=len(futures)):
+            position = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors[position] = e
+                continue
+            if profile_workers:
+                result, records = result
+                merge_records(records)
+            results[position] = result
+    return results, errors
+
+
+def _describe_arguments(arguments: tuple) -> str:
+    return ", ".join(str(argument) for argument in arguments)
@@ -1,14 +1,14 @@
+import os
 from pathlib import Path
+from typing import Iterable
 
 import eyed3
 from tqdm import tqdm
 
-from python_client.audio_processing import convert_to_mp3
-from python_client.rss_feed import (
-    RssFeed,
-    get_podcast_title,
-    list_filenames,
-)
+from python_client.audio_processing import DEFAULT_ENCODING_PROFILE, convert_to_mp3
+from python_client.parallel import run_jobs
+from python_client.profiling import profile_call
+from python_client.rss_feed import iter_feed_items, read_podcast_titles
 
 
 def get_mp3_files(folder: Path) -> list[Path]:
@@ -20,41 +20,120 @@ def get_mp3_files(folder: Path) -> list[Path]:
     return [filename for filename in folder.iterdir() if filename.suffix == ".mp3"]
 
 
-def set_id3_tags(in_directory: Path) -> None:
+def list_episodes(folder: Path) -> list[Path]:
+    """
+    List the audio file of each episode of a directory: its mp3, or its m4a if it has not been converted yet
+    :param folder: the directory
+    :return: the path of the audio files
+    """
+    files = set(folder.iterdir())
+    return sorted(
+        filename
+        for filename in files
+        if filename.suffix == ".mp3"
+        or (filename.suffix == ".m4a" and filename.with_suffix(".mp3") not in files)
+    )
+
+
+def set_id3_tags(in_directory: Path, already_tagged: Iterable[Path] = ()) -> None:
     """
     Take the rss.xml file in a directory, use the title of each item in the rss feed to set the mp3's title metadata
+    Files whose title is already the right one are not rewritten
     :param in_directory: The directory containing an rss.xml file and the mp3 files mentioned in the rss.xml
+    :param already_tagged: mp3 files known to have their title set already, e.g. because it was set when converting them
     """
-    eyed3.log.setLevel("ERROR")
-    rss_feed = RssFeed(in_directory / "rss.xml")
+    podcast_titles = read_podcast_titles(in_directory / "rss.xml")
+    already_tagged = set(already_tagged)
 
     for mp3_file in tqdm(get_mp3_files(in_directory), "Setting id3 tags"):
+        if mp3_file not in already_tagged:
+            set_id3_title(mp3_file, podcast_titles[mp3_file.name])
+
+
+def set_id3_title(mp3_file: Path, title: str) -> None:
+    """
+    Set the title metadata of an mp3 file, unless it already is the given title
+    :param mp3_file: the mp3 file
+    :param title: its title
+    """
+    eyed3.log.setLevel("ERROR")
+    with profile_call("eyed3.load"):
         audio_file = eyed3.load(mp3_file)
-        if audio_file is None:
-            raise ValueError(
-                f"EyeD3 could not read the file {mp3_file}, you may retry the download if the file is corrupt, or remove it."
-            )
-        audio_file.tag.title = get_podcast_title(rss_feed, mp3_file)
+    if audio_file is None:
+        raise ValueError(
+            f"EyeD3 could not read the file {mp3_file}, you may retry the download if the file is corrupt, or remove it."
+        )
+    if audio_file.tag is None:
+        audio_file.initTag()
+    elif audio_file.tag.title == title:
+        return
+    audio_file.tag.title = title
+    with profile_call("eyed3.save"):
         audio_file.tag.save(encoding="utf-8")
 
 
-def convert_m4a_files_to_mp3(in_directory: Path) -> None:
+def convert_m4a_files_to_mp3(
+    in_directory: Path,
+    jobs: int | None = None,
+    titles: dict[str, str] | None = None,
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+) -> list[Path]:
     """
     Convert all m4a files in a directory into mp3 files using ffmpeg
     Skips m4a which already have an equivalent mp3 in the directory
     :param in_directory: directory that contains mp3s
+    :param jobs: how many files to convert at the same time, by default the number of CPUs
+    :param titles: if provided, the title to write in the id3 tag of each mp3, by mp3 filename
+    :param encoding_profile: the encoding of the mp3 files, one of ENCODING_PROFILES
+    :return: the mp3 files created
     """
-    files = list(in_directory.iterdir())
-    m4as_to_convert = [
+    files = set(in_directory.iterdir())
+    m4as_to_convert = sorted(
         filename
         for filename in files
         if filename.suffix == ".m4a" and filename.with_suffix(".mp3") not in files
-    ]
+    )
     if not len(m4as_to_convert):
         print("No m4a to convert")
-        return
-    for m4a_file in tqdm(m4as_to_convert, "Converting m4a files to mp3"):
-        convert_to_mp3(m4a_file, m4a_file.with_suffix(".mp3"))
+        return []
+    run_jobs(
+        convert_m4a_file_to_mp3,
+        [
+            (
+                m4a_file,
+                (titles or {}).get(m4a_file.with_suffix(".mp3").name),
+                encoding_profile,
+            )
+            for m4a_file in m4as_to_convert
+        ],
+        jobs or os.cpu_count() or 1,
+        "Converting m4a files to mp3",
+        threads=True,
+    )
+    return [m4a_file.with_suffix(".mp3") for m4a_file in m4as_to_convert]
+
+
+def convert_m4a_file_to_mp3(
+    m4a_file: Path,
+    title: str | None = None,
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+) -> None:
+    """
+    Convert an m4a file into an mp3 file next to it
+    The mp3 is written under a temporary name then renamed, so an interrupted conversion never leaves an incomplete mp3
+    that would be taken for an already converted file
+    :param m4a_file: the m4a file
+    :param title: if provided, the title to write in the id3 tag of the mp3
+    :param encoding_profile: the encoding of the mp3, one of ENCODING_PROFILES
+    """
+    tmp_mp3_file = m4a_file.with_suffix(".converting")
+    try:
+        convert_to_mp3(
+            m4a_file, tmp_mp3_file, title=title, encoding_profile=encoding_profile
+        )
+        tmp_mp3_file.replace(m4a_file.with_suffix(".mp3"))
+    finally:
+        tmp_mp3_file.unlink(missing_ok=True)
 
 
 def create_dir_if_necessary(dir_path: Path) -> None:
@@ -72,8 +151,9 @@ def ensure_no_unnecessary_files_will_be_uploaded(input_path: Path) -> None:
     This is relevant so the user remember to clean its download directory from all the previous podcast they have already listened to and do not need to be uploaded again.
     :param input_path: The input directory that contains the podcasts and the rss.xml file
     """
-    rss_feed = RssFeed(input_path / "rss.xml")
-    filenames_in_feed = set(Path(f).stem for f in list_filenames(rss_feed))
+    filenames_in_feed = set(
+        Path(item.filename).stem for item in iter_feed_items(input_path / "rss.xml")
+    )
     unneccessary_filenames_in_input_directory = [
         filename
         for filename in input_path.iterdir()
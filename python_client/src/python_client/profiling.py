@@ -0,0 +1,207 @@
+import json
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Iterable, Iterator
+
+# The records of the current run, None when profiling is disabled, which is the default
+_records: list["CallRecord | StageRecord"] | None = None
+_current_stage = "main"
+
+
+@dataclass
+class CallRecord:
+    """
+    A measured call to something external: a subprocess, a library reading or writing files
+    """
+
+    stage: str
+    call: str
+    wall_time: float = 0.0
+    processes: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    audio_seconds: float = 0.0
+
+
+@dataclass
+class StageRecord:
+    """
+    A measured stage of the pipeline, e.g. the conversion of all the m4a files
+    """
+
+    stage: str
+    wall_time: float
+
+
+def is_profiling_enabled() -> bool:
+    return _records is not None
+
+
+@contextmanager
+def profiling_session(report_file: Path | None) -> Iterator[None]:
+    """
+    Profile everything run within the context, and write the report when leaving it, even if an error is raised
+    Does nothing if no report file is given
+    :param report_file: the report to write, JSON lines if its name ends with .jsonl, JSON otherwise
+    """
+    global _records
+    if report_file is None:
+        yield
+        return
+    _records = []
+    try:
+        with profile_stage("total"):
+            yield
+    finally:
+        records, _records = _records, None
+        write_profile_report(report_file, records)
+
+
+@contextmanager
+def profile_stage(stage: str) -> Iterator[None]:
+    """
+    Measure a stage of the pipeline, the calls made within the context are attributed to it
+    :param stage: the name of the stage
+    """
+    global _current_stage
+    if _records is None:
+        yield
+        return
+    previous_stage, _current_stage = _current_stage, stage
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        _records.append(StageRecord(stage, perf_counter() - start))
+        _current_stage = previous_stage
+
+
+@contextmanager
+def profile_call(
+    call: str,
+    processes: int = 0,
+    reads: Iterable[Path] = (),
+    writes: Iterable[Path] = (),
+) -> Iterator[CallRecord | None]:
+    """
+    Measure a call, e.g.:
+        with profile_call("ffmpeg.convert_to_mp3", processes=1, reads=[m4a], writes=[mp3]) as record:
+    The files are only looked at when profiling is enabled
+    :param call: what is called
+    :param processes: how many processes the call spawns
+    :param reads: the files read by the call, their size is counted as bytes read
+    :param writes: the files written by the call, their size is counted as bytes written once the call is over
+    :return: the record, to which the caller may add what only it knows, e.g. the audio seconds processed.
+    None when profiling is disabled
+    """
+    if _records is None:
+        yield None
+        return
+    record = CallRecord(
+        _current_stage, call, processes=processes, bytes_read=_total_size(reads)
+    )
+    start = perf_counter()
+    try:
+        yield record
+    finally:
+        record.wall_time = perf_counter() - start
+        record.bytes_written += _total_size(writes)
+        _records.append(record)
+
+
+def call_profiled(
+    function: Callable[..., Any], stage: str, arguments: tuple
+) -> tuple[Any, list["CallRecord | StageRecord"]]:
+    """
+    Call a function with profiling enabled, in a worker process whose records would otherwise be lost
+    :param function: the function to call
+    :param stage: the stage of the pipeline the call belongs to
+    :param arguments: its positional arguments
+    :return: the result of the function, and the records made during the call, to be given to merge_records
+    """
+    global _records, _current_stage
+    _records, _current_stage = [], stage
+    try:
+        return function(*arguments), _records
+    finally:
+        _records, _current_stage = None, "main"
+
+
+def merge_records(records: list["CallRecord | StageRecord"]) -> None:
+    """
+    Add the records made in a worker process to the ones of the current run
+    """
+    if _records is not None:
+        _records.extend(records)
+
+
+def summarize(records: list["CallRecord | StageRecord"]) -> dict[str, dict]:
+    """
+    Sum the records by stage and by call
+    :param records: the records of a run
+    :return: the wall time of each stage, and the totals of each call, along with the audio seconds processed per wall second
+    """
+    stages: dict[str, dict] = {}
+    calls: dict[str, dict] = {}
+    for record in records:
+        if isinstance(record, StageRecord):
+            stage = stages.setdefault(record.stage, {"count": 0, "wall_time": 0.0})
+            stage["count"] += 1
+            stage["wall_time"] += record.wall_time
+            continue
+        call = calls.setdefault(
+            record.call,
+            {
+                "count": 0,
+                "wall_time": 0.0,
+                "processes": 0,
+                "bytes_read": 0,
+                "bytes_written": 0,
+                "audio_seconds": 0.0,
+            },
+        )
+        call["count"] += 1
+        for field in ("wall_time", "processes", "bytes_read", "bytes_written"):
+            call[field] += getattr(record, field)
+        call["audio_seconds"] += record.audio_seconds
+    for call in calls.values():
+        call["audio_seconds_per_second"] = (
+            call["audio_seconds"] / call["wall_time"] if call["wall_time"] else None
+        )
+    return {"stages": stages, "calls": calls}
+
+
+def write_profile_report(
+    report_file: Path, records: list["CallRecord | StageRecord"]
+) -> None:
+    """
+    Write the report of a run
+    As JSON lines, one line per record then a last line with the summary. As JSON, the summary and the records
+    :param report_file: the report, JSON lines if its name ends with .jsonl, JSON otherwise
+    :param records: the records of the run
+    """
+    summary = summarize(records)
+    with open(report_file, "w", encoding="utf-8") as f:
+        if report_file.suffix == ".jsonl":
+            for record in records:
+                f.write(json.dumps(_record_to_dict(record)) + "\n")
+            f.write(json.dumps({"type": "summary", **summary}) + "\n")
+        else:
+            json.dump(
+                {**summary, "records": [_record_to_dict(r) for r in records]},
+                f,
+                indent=2,
+            )
+
+
+def _record_to_dict(record: "CallRecord | StageRecord") -> dict:
+    return {
+        "type": "stage" if isinstance(record, StageRecord) else "call",
+        **asdict(record),
+    }
+
+
+def _total_size(files: Iterable[Path]) -> int:
+    return sum(file.stat().st_size for file in files if file.exists())
@@ -0,0 +1,155 @@
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+
+from python_client.profiling import profile_call
+
+PUBLISH_MANIFEST_FILENAME = ".publish_manifest.json"
+
+
+@dataclass
+class PublishSummary:
+    """
+    What publishing some files to the public directory actually did
+    """
+
+    linked_files: int = 0
+    copied_files: int = 0
+    unchanged_files: int = 0
+    bytes_written: int = 0
+
+    def __add__(self, other: "PublishSummary") -> "PublishSummary":
+        return PublishSummary(
+            linked_files=self.linked_files + other.linked_files,
+            copied_files=self.copied_files + other.copied_files,
+            unchanged_files=self.unchanged_files + other.unchanged_files,
+            bytes_written=self.bytes_written + other.bytes_written,
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.linked_files} file(s) linked, {self.copied_files} copied, {self.unchanged_files} unchanged, "
+            f"{self.bytes_written / 2**20:.1f} MiB written"
+        )
+
+
+def publish_files(
+    files: list[Path], public_dir: Path, hardlink: bool = True
+) -> PublishSummary:
+    """
+    Make the public directory hold the same content as the given files, writing as little as possible
+    The manifest of the public directory records the size, modification time and hash of each published file:
+    files that did not change since they were published are skipped. The others are hard linked when possible,
+    copied otherwise, the target being replaced atomically so the public directory never holds a partial file.
+    Hard linked files are not hashed, since they cannot differ from their public copy
+    :param files: the files to publish, they keep their name in the public directory
+    :param public_dir: the public directory
+    :param hardlink: whether the files may be hard linked. Hard linked files must not be modified in place by
+    something that expects the public copy to stay as it is
+    :return: the summary of what was done
+    """
+    manifest = _read_manifest(public_dir)
+    summary = PublishSummary()
+    for file in files:
+        target = public_dir / file.name
+        stat = file.stat()
+        entry = manifest.get(file.name)
+        if _is_published(file, stat, target, entry):
+            summary.unchanged_files += 1
+            continue
+
+        if hardlink and _link_atomically(file, target):
+            # The public file is the file itself, there is no need to read it to know they have the same content
+            summary.linked_files += 1
+            file_hash = None
+        else:
+            file_hash = _hash_file(file)
+            if (
+                entry is not None
+                and entry["sha256"] == file_hash
+                and target.exists()
+                and target.stat().st_size == stat.st_size
+            ):
+                # Only the modification time changed
+                summary.unchanged_files += 1
+            else:
+                _copy_atomically(file, target)
+                summary.copied_files += 1
+                summary.bytes_written += stat.st_size
+        manifest[file.name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_hash,
+        }
+    _write_manifest(public_dir, manifest)
+    return summary
+
+
+def _is_published(
+    file: Path, stat: os.stat_result, target: Path, entry: dict | None
+) -> bool:
+    """
+    Whether a file is known to be published as it is, without reading its content
+    """
+    if entry is None or not target.exists():
+        return False
+    if target.samefile(file):
+        # Hard linked, the public file is the file itself
+        return True
+    return (
+        entry["size"] == stat.st_size
+        and entry["mtime_ns"] == stat.st_mtime_ns
+        and target.stat().st_size == stat.st_size
+    )
+
+
+def _hash_file(file: Path) -> str:
+    file_hash = sha256()
+    with profile_call("file.hash", reads=[file]), open(file, "rb") as f:
+        while chunk := f.read(1 << 20):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _link_atomically(file: Path, target: Path) -> bool:
+    """
+    Replace the target by a hard link to the file
+    :return: False if the file cannot be hard linked there, e.g. they are on different filesystems
+    """
+    tmp_target = target.with_name(f".{target.name}.tmp")
+    tmp_target.unlink(missing_ok=True)
+    try:
+        with profile_call("file.link"):
+            os.link(file, tmp_target)
+    except OSError:
+        return False
+    os.replace(tmp_target, target)
+    return True
+
+
+def _copy_atomically(file: Path, target: Path) -> None:
+    tmp_target = target.with_name(f".{target.name}.tmp")
+    try:
+        with profile_call("file.copy", reads=[file], writes=[tmp_target]):
+            shutil.copy(file, tmp_target)
+        os.replace(tmp_target, target)
+    finally:
+        tmp_target.unlink(missing_ok=True)
+
+
+def _read_manifest(public_dir: Path) -> dict[str, dict]:
+    try:
+        with open(public_dir / PUBLISH_MANIFEST_FILENAME, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_manifest(public_dir: Path, manifest: dict[str, dict]) -> None:
+    tmp_manifest = public_dir / f"{PUBLISH_MANIFEST_FILENAME}.tmp"
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_manifest, public_dir / PUBLISH_MANIFEST_FILENAME)
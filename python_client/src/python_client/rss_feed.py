@@ -1,8 +1,13 @@
 from copy import deepcopy
+from dataclasses import dataclass
+from io import BytesIO
 from pathlib import Path
+from typing import Collection, Iterator, NamedTuple
 
 from xml.etree import ElementTree as ET
-from xml.etree.ElementTree import Element, tostring
+from xml.etree.ElementTree import Element, SubElement, tostring
+
+from python_client.profiling import profile_call
 
 # Registering the namespaces is mandatory for ElementTree to be able to interpret then and be able to search through the feed
 namespaces = {"itunes": "http://www.itunes.com/dtds/podcast-1.0.dtd"}
@@ -13,12 +18,67 @@ for ns, ns_full in namespaces.items():
 class RssFeed:
     """
     A container class for the Rss feed, read from rss.xml
+    The items are indexed by the filename of their enclosure, the index has to be updated along with the items
     """
 
     def __init__(self, input_file_path: Path):
         self.input_file_path = input_file_path
-        content = input_file_path.read_text(encoding="utf-8")
-        self.tree = ET.ElementTree(ET.fromstring(content))
+        with profile_call("xml.parse_rss_feed", reads=[input_file_path]):
+            content = input_file_path.read_text(encoding="utf-8")
+            self.tree = ET.ElementTree(ET.fromstring(content))
+        self.items_by_filename: dict[str, Element] = {}
+        for item in self.tree.find("channel").findall("item"):
+            # Like a search through the items, the first item wins when several have the same filename
+            self.items_by_filename.setdefault(_get_item_filename(item), item)
+
+
+class FeedItem(NamedTuple):
+    """
+    The fields of an item of the rss feed that are needed by read-only processing
+    """
+
+    filename: str
+    title: str | None
+    duration: str | None
+
+
+def iter_feed_items(input_file_path: Path) -> Iterator[FeedItem]:
+    """
+    Read the items of an rss.xml file one by one, without holding the whole feed in memory
+    Each item is discarded once read, so the memory used does not grow with the size of the feed
+    :param input_file_path: the rss.xml file
+    :return: an iterator over the items of the feed
+    """
+    channel = None
+    for event, element in ET.iterparse(input_file_path, events=("start", "end")):
+        if event == "start":
+            if element.tag == "channel":
+                channel = element
+            continue
+        if element.tag != "item":
+            continue
+        title_element = element.find("title")
+        duration_element = element.find("itunes:duration", namespaces=namespaces)
+        yield FeedItem(
+            filename=_get_item_filename(element),
+            title=None if title_element is None else title_element.text,
+            duration=None if duration_element is None else duration_element.text,
+        )
+        if channel is not None:
+            channel.remove(element)
+
+
+def read_podcast_titles(input_file_path: Path) -> dict[str, str]:
+    """
+    Read the title of every podcast of an rss.xml file, streaming through the feed
+    :param input_file_path: the rss.xml file
+    :return: the title of each podcast, by filename. When several items have the same filename, the first one wins
+    """
+    titles: dict[str, str] = {}
+    with profile_call("xml.read_podcast_titles", reads=[input_file_path]):
+        for item in iter_feed_items(input_file_path):
+            titles.setdefault(item.filename, item.title)
+    return titles
 
 
 def list_filenames(rss_feed) -> list[str]:
@@ -33,6 +93,29 @@ def list_filenames(rss_feed) -> list[str]:
     ]
 
 
+def remove_podcasts_from_feed(
+    content: bytes, podcast_filenames: Collection[str]
+) -> bytes:
+    """
+    Remove the items of some podcasts from the content of a feed, e.g. the duplicates of other podcasts
+    :param content: the content of the feed
+    :param podcast_filenames: the filenames of the podcasts to remove
+    :return: the content of the feed without their items, the same content if there are none
+    """
+    root = ET.fromstring(content)
+    channel = root.find("channel")
+    items = [
+        item
+        for item in channel.findall("item")
+        if _get_item_filename(item) in podcast_filenames
+    ]
+    if not items:
+        return content
+    for item in items:
+        channel.remove(item)
+    return tostring(root, encoding="utf-8", xml_declaration=True)
+
+
 def get_podcast_title(rss_feed: RssFeed, podcast_filename: Path) -> str:
     """
     Get the title of a podcast in an RSS feed given the podcast's filename
@@ -65,45 +148,87 @@ def get_podcast_duration(rss_feed: RssFeed, podcast_filename: Path) -> str:
     return duration_element.text
 
 
+@dataclass(frozen=True)
+class PodcastUpdate:
+    """
+    The fields to change in the item of a podcast, None for the fields to keep as they are
+    """
+
+    duration: str | None = None
+    title: str | None = None
+    enclosure_length: int | None = None
+
+
 def set_podcast_duration(
     rss_feed: RssFeed, podcast_filename: Path, duration: str
 ) -> RssFeed:
     """
     Set the duration of a podcast in an RSS feed given the podcast's filename, returning a new RSS Feed
+    To update several podcasts, use update_podcasts, which copies the feed only once
     :param rss_feed: the rss feed, it will not be modified
     :param podcast_filename: the filename of the podcast, only the end of the path will be considered
     :param duration: The duration of the podcast
     :return: The RSSFeed with the duration item modified
     """
-    rss_feed = deepcopy(rss_feed)
-    item = _get_item(rss_feed, podcast_filename)
-    duration_element: Element | None = item.find(
-        "itunes:duration", namespaces=namespaces
+    return update_podcasts(
+        rss_feed, {podcast_filename: PodcastUpdate(duration=duration)}
     )
-    item.remove(duration_element)
-    duration_element = Element("itunes:duration")
-    duration_element.text = duration
-    item.append(duration_element)
+
+
+def update_podcasts(
+    rss_feed: RssFeed, updates: dict[Path, PodcastUpdate], in_place: bool = False
+) -> RssFeed:
+    """
+    Apply updates to several podcasts of an RSS feed at once
+    By default the feed is copied once, then the copy is updated. With in_place, the given feed is modified instead,
+    which is only legitimate when the caller owns the feed, i.e. no one else holds a reference to it
+    :param rss_feed: the rss feed
+    :param updates: the update of each podcast, by filename, only the end of the paths will be considered
+    :param in_place: whether to modify rss_feed rather than a copy of it
+    :return: the updated RSSFeed, rss_feed itself if in_place
+    """
+    if not in_place:
+        rss_feed = deepcopy(rss_feed)
+    for podcast_filename, update in updates.items():
+        item = _get_item(rss_feed, podcast_filename)
+        if update.duration is not None:
+            duration_element: Element | None = item.find(
+                "itunes:duration", namespaces=namespaces
+            )
+            if duration_element is not None:
+                item.remove(duration_element)
+            duration_element = Element(f"{{{namespaces['itunes']}}}duration")
+            duration_element.text = update.duration
+            item.append(duration_element)
+        if update.title is not None:
+            title_element = item.find("title")
+            if title_element is None:
+                title_element = SubElement(item, "title")
+            title_element.text = update.title
+        if update.enclosure_length is not None:
+            item.find("enclosure").set("length", str(update.enclosure_length))
     return rss_feed
 
 
 def save_rss_feed(rss_feed: RssFeed, path: Path) -> None:
     """
     Save an rss feed to the given path
+    The file is left untouched if it already holds the same feed, so it is not seen as modified
     :param rss_feed: the rss feed to save
     :param path: the target path
     """
-    rss_feed.tree.write(path, encoding="utf-8")
+    with profile_call("xml.save_rss_feed", writes=[path]):
+        content = BytesIO()
+        rss_feed.tree.write(content, encoding="utf-8")
+        if path.exists() and path.read_bytes() == content.getvalue():
+            return
+        path.write_bytes(content.getvalue())
 
 
 def _get_item(rss_feed: RssFeed, podcast_filename: Path) -> Element:
     try:
-        return next(
-            item
-            for item in rss_feed.tree.find("channel").findall("item")
-            if _get_item_filename(item) == podcast_filename.name
-        )
-    except StopIteration:
+        return rss_feed.items_by_filename[podcast_filename.name]
+    except KeyError:
         print(
             f"Cannot find the podcast {podcast_filename.name} in the rss feed {rss_feed.input_file_path.name}"
         )
@@ -0,0 +1,140 @@
+from math import ceil
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import ffmpeg
+
+from python_client.ffmpeg_processes import run_ffmpeg
+from python_client.profiling import profile_call
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# The audio is analyzed at a low rate: the loudness of speech is still measurable, and a 3 hours episode takes 20 MB
+ENVELOPE_SAMPLE_RATE = 1000
+ENERGY_WINDOW_SECONDS = 0.05
+# A pause is a quiet spot lasting about this long, shorter dips are the gaps between words
+SMOOTHING_SECONDS = 0.5
+# How far from a nominal boundary the quietest spot is looked for
+SEARCH_SECONDS = 30
+# The quietest spot wins, unless one almost as quiet is closer to the nominal boundary, by up to this many dB
+DISTANCE_PENALTY_DB = 1.0
+
+
+def get_silence_aware_segments(
+    input_file: Path,
+    duration: float,
+    window_size: int,
+    overlap: float,
+    search_seconds: float = SEARCH_SECONDS,
+) -> list[tuple[float, float]]:
+    """
+    Generates the segments of an audio to be split into windows, cutting in the quietest spot near each boundary
+    A drop-in alternative to get_segments, giving as many segments. Since the cuts fall in pauses, the overlap can be
+    much shorter. Requires numpy, see the "silence" extra
+    :param input_file: the audio file, decoded once at a low rate to measure its loudness
+    :param duration: the duration of the audio
+    :param window_size: about how long a segment should last
+    :param overlap: the duration of the part that is repeated between each segment
+    :param search_seconds: how far from each nominal boundary a quiet spot is looked for, at most half a window
+    :return: a list of (segment_start_time, segment_end_time), in seconds
+    """
+    nominal_boundaries = list(range(window_size, ceil(duration), window_size))
+    boundaries = [0.0]
+    if nominal_boundaries:
+        energy, window_seconds = compute_energy_envelope(input_file)
+        boundaries += find_quiet_boundaries(
+            energy,
+            window_seconds,
+            nominal_boundaries,
+            min(search_seconds, window_size / 2),
+        )
+    boundaries.append(float(ceil(duration)))
+    return [
+        (start, min(end + overlap, ceil(duration)))
+        for start, end in zip(boundaries, boundaries[1:])
+    ]
+
+
+def compute_energy_envelope(input_file: Path) -> tuple["np.ndarray", float]:
+    """
+    Decode an audio file once, as mono PCM at a low rate, and compute its loudness over short windows
+    :param input_file: the audio file
+    :return: the energy of each window in dB, and the duration of a window in seconds
+    """
+    np = _import_numpy()
+    with profile_call(
+        "ffmpeg.decode_envelope", processes=1, reads=[input_file]
+    ) as record:
+        pcm = run_ffmpeg(
+            ffmpeg.input(str(input_file)).output(
+                "pipe:",
+                format="s16le",
+                acodec="pcm_s16le",
+                ac=1,
+                ar=ENVELOPE_SAMPLE_RATE,
+            )
+        )
+        if record is not None:
+            record.audio_seconds = len(pcm) / 2 / ENVELOPE_SAMPLE_RATE
+    samples_per_window = round(ENERGY_WINDOW_SECONDS * ENVELOPE_SAMPLE_RATE)
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    window_count = len(samples) // samples_per_window
+    windows = (
+        samples[: window_count * samples_per_window]
+        .astype(np.float32)
+        .reshape(window_count, samples_per_window)
+    )
+    power = np.mean(np.square(windows), axis=1)
+    # Silence is about -inf dB, 1 avoids the log of 0 while staying far below any audible sound
+    return 10 * np.log10(power + 1), samples_per_window / ENVELOPE_SAMPLE_RATE
+
+
+def find_quiet_boundaries(
+    energy: "np.ndarray",
+    window_seconds: float,
+    nominal_boundaries: list[float],
+    search_seconds: float,
+) -> list[float]:
+    """
+    Move each boundary to the quietest pause near it
+    :param energy: the energy of each window of the audio in dB, see compute_energy_envelope
+    :param window_seconds: the duration of a window
+    :param nominal_boundaries: where the audio would be cut without looking at it, in seconds, in increasing order
+    :param search_seconds: how far from a nominal boundary the pause may be
+    :return: the boundaries, in seconds, in the middle of the quietest window near each nominal boundary
+    """
+    np = _import_numpy()
+    if len(energy) == 0:
+        return [float(boundary) for boundary in nominal_boundaries]
+    smoothing_windows = max(1, round(SMOOTHING_SECONDS / window_seconds))
+    kernel = np.ones(smoothing_windows)
+    # Divided by the number of windows actually summed, so the ends of the audio do not look quieter than they are
+    smoothed_energy = np.convolve(energy, kernel, mode="same") / np.convolve(
+        np.ones_like(energy), kernel, mode="same"
+    )
+    search_windows = round(search_seconds / window_seconds)
+    boundaries = []
+    for nominal_boundary in nominal_boundaries:
+        center = round(nominal_boundary / window_seconds)
+        first = max(0, center - search_windows)
+        last = min(len(smoothed_energy), center + search_windows + 1)
+        if first >= last:
+            boundaries.append(float(nominal_boundary))
+            continue
+        distance = np.abs(np.arange(first, last) - center) / max(1, search_windows)
+        quietest = first + int(
+            np.argmin(smoothed_energy[first:last] + DISTANCE_PENALTY_DB * distance)
+        )
+        boundaries.append(round((quietest + 0.5) * window_seconds, 3))
+    return boundaries
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError(
+            "Silence-aware boundaries require numpy, install it with: poetry install --extras silence"
+        ) from e
+    return numpy
@@ -1,16 +1,34 @@
-import shutil
+import re
 from argparse import Namespace, ArgumentParser
 from math import ceil
 from pathlib import Path
-from tempfile import TemporaryDirectory
 
-from tqdm import tqdm
+from python_client.audio_backends import AUDIO_BACKENDS, set_audio_backend
+from python_client.audio_processing import (
+    DEFAULT_ENCODING_PROFILE,
+    ENCODING_PROFILES,
+    get_duration,
+    cut_audio_segments,
+    concatenate_mp3s,
+)
+from python_client.duplicates import find_duplicate_episodes, report_duplicates
+from python_client.journal import Journal, make_fingerprint
+from python_client.media_metadata import probe_media
+from python_client.mp3_frames import copy_cut_mp3, get_mp3_frame_index
+from python_client.parallel import run_jobs
+from python_client.preprocessing import get_mp3_files, convert_m4a_files_to_mp3
+from python_client.profiling import profile_stage, profiling_session
+from python_client.rss_feed import read_podcast_titles
+from python_client.silence import get_silence_aware_segments
+from python_client.text_to_speech import get_part_title_audio
+from python_client.watch import watch_directory
 
-from python_client.audio_processing import get_duration, cut_audio, concatenate_mp3s
-from python_client.preprocessing import get_mp3_files
-from python_client.rss_feed import RssFeed, get_podcast_title
-from python_client.text_to_speech import generate_part_title_audio
-from python_client.upload_podcasts import convert_m4a_files_to_mp3
+CUTTING_MODES = ("reencode", "copy")
+BOUNDARIES = ("fixed", "silence")
+SEGMENT_DURATION_SECONDS = 600
+OVERLAP_SECONDS = 10
+# Cut in a pause, a segment only needs to repeat the end of the previous one to let the listener find their way
+SILENCE_OVERLAP_SECONDS = 1
 
 
 def parse_args() -> Namespace:
@@ -25,6 +43,53 @@ def parse_args() -> Namespace:
         help="Input folder where audio files and feed.sample.xml files are downloaded",
     )
     parser.add_argument("output_folder", type=str, help="Output folder")
+    parser.add_argument(
+        "--cutting-mode",
+        choices=CUTTING_MODES,
+        default="reencode",
+        help="reencode the segments, or copy the mp3 frames as they are, which is much faster",
+    )
+    parser.add_argument(
+        "--boundaries",
+        choices=BOUNDARIES,
+        default="fixed",
+        help="cut every 10 minutes with a 10 seconds overlap, or in the quietest spot near every 10 minutes "
+        "with a 1 second overlap, which requires numpy",
+    )
+    parser.add_argument(
+        "--encoding-profile",
+        choices=ENCODING_PROFILES,
+        default=DEFAULT_ENCODING_PROFILE,
+        help="the encoding of the converted and reencoded files, the speech profiles make files 3 to 4 times smaller",
+    )
+    parser.add_argument(
+        "--audio-backend",
+        choices=AUDIO_BACKENDS,
+        help="ffmpeg to run a process per operation, the default, or pyav to run them in process, "
+        "which saves starting processes but encodes slower with PyAV's wheels",
+    )
+    parser.add_argument(
+        "--no-titles",
+        action="store_true",
+        help="Do not add a voice saying the title at the start of each segment",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="How many m4a files to convert, and episodes or segments to process, at the same time",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="REPORT",
+        help="Write where the time went to this file, as JSON, or JSON lines if it ends with .jsonl",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, and split the podcasts as they are downloaded",
+    )
     return parser.parse_args()
 
 
@@ -33,37 +98,167 @@ def split_podcasts():
     Split the podcasts from an input directory in sys.argv to an output directory
     """
     args = parse_args()
-    input_dir = Path(args.input_folder)
-    output_dir = Path(args.output_folder)
-    output_dir.mkdir(exist_ok=True)
+    if args.audio_backend is not None:
+        set_audio_backend(args.audio_backend)
+    with profiling_session(args.profile):
+        input_dir = Path(args.input_folder)
+        output_dir = Path(args.output_folder)
+        output_dir.mkdir(exist_ok=True)
+        if args.watch:
+            print(f"Watching {input_dir}, press Ctrl+C to stop")
+            watch_directory(
+                input_dir, lambda _: split_directory(input_dir, output_dir, args)
+            )
+        else:
+            split_directory(input_dir, output_dir, args)
+
+
+def split_directory(input_dir: Path, output_dir: Path, args: Namespace) -> None:
+    """
+    Split the podcasts of the input directory which are not split yet, see split_episode
+    An episode downloaded more than once is split once, see find_duplicate_episodes
+    :param input_dir: the directory of the downloaded podcasts and their rss.xml
+    :param output_dir: the directory of the parts
+    :param args: the arguments from the command line
+    """
+    # The jobs only append to the journal, it is compacted before they start
+    Journal(output_dir).compact()
+
+    convert_m4a_files_to_mp3(
+        input_dir, jobs=args.jobs, encoding_profile=args.encoding_profile
+    )
+
+    mp3_files = get_mp3_files(input_dir)
+    podcast_titles = None
+    if not args.no_titles:
+        with profile_stage("Reading titles"):
+            podcast_titles = read_podcast_titles(input_dir / "rss.xml")
+    with profile_stage("Finding duplicates"):
+        # The titles are read in the order of the feed
+        duplicates = find_duplicate_episodes(
+            mp3_files, None if podcast_titles is None else list(podcast_titles)
+        )
+    report_duplicates(duplicates)
+    mp3_files = [mp3_file for mp3_file in mp3_files if mp3_file not in duplicates]
+    if podcast_titles is None:
+        episode_titles = len(mp3_files) * [None]
+    else:
+        episode_titles = [podcast_titles[mp3_file.name] for mp3_file in mp3_files]
 
-    convert_m4a_files_to_mp3(input_dir)
+    run_jobs(
+        split_episode,
+        [
+            (
+                mp3_file,
+                output_dir,
+                args.cutting_mode,
+                episode_title,
+                args.boundaries,
+                args.encoding_profile,
+            )
+            for mp3_file, episode_title in zip(mp3_files, episode_titles)
+        ],
+        args.jobs,
+        "Cutting podcasts",
+    )
+
+
+def split_episode(
+    input_file: Path,
+    output_dir: Path,
+    cutting_mode: str,
+    episode_title: str | None = None,
+    boundaries: str = "fixed",
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+) -> None:
+    """
+    Split an episode into parts of 10 minutes, overlapping by 10 seconds, or by 1 second if cut in pauses
+    The split is recorded in the journal of the output directory, it is skipped if the episode was already split
+    the same way and its parts were not modified since.
+    If the split fails, the parts of the episode already written are removed so no partial episode is left in the output directory
+    :param input_file: The episode to split
+    :param output_dir: The target directory for the splits
+    :param cutting_mode: "reencode" or "copy", see split_audio
+    :param episode_title: the title of the episode, to be said at the start of each part. None for no title
+    :param boundaries: "fixed" or "silence", see split_audio
+    :param encoding_profile: the encoding of the parts, see split_audio
+    """
+    overlap = SILENCE_OVERLAP_SECONDS if boundaries == "silence" else OVERLAP_SECONDS
+    journal = Journal(output_dir)
+    unit = f"cut:{input_file.name}"
+    fingerprint = make_fingerprint(
+        [input_file],
+        {
+            "cutting_mode": cutting_mode,
+            "segment_duration": SEGMENT_DURATION_SECONDS,
+            "overlap": overlap,
+            "episode_title": episode_title,
+            "boundaries": boundaries,
+            "encoding_profile": encoding_profile,
+        },
+    )
+    if journal.is_done(unit, fingerprint):
+        return
+    # Parts of a previous split, possibly partial or made from another version of the episode
+    _remove_segments(input_file, output_dir)
+    try:
+        segment_files = split_audio(
+            input_file,
+            output_dir,
+            segment_duration_seconds=SEGMENT_DURATION_SECONDS,
+            overlap=overlap,
+            cutting_mode=cutting_mode,
+            episode_title=episode_title,
+            boundaries=boundaries,
+            encoding_profile=encoding_profile,
+        )
+    except Exception:
+        _remove_segments(input_file, output_dir)
+        raise
+    journal.record(unit, fingerprint, segment_files)
 
-    for mp3_file in tqdm(get_mp3_files(input_dir), "Cutting podcasts"):
-        split_audio(mp3_file, output_dir, segment_duration_seconds=600, overlap=10)
 
-    for segment, title in tqdm(
-        get_title_for_each_segment(
-            input_dir / "rss.xml", get_mp3_files(output_dir)
-        ).items(),
-        desc="Adding title to audio files",
-    ):
-        add_title_to_segment(segment, title)
+def _remove_segments(input_file: Path, output_dir: Path) -> None:
+    """
+    Remove the parts of an episode from the output directory, named as by get_segment_filename
+    Only the exact naming is matched, so the parts of an episode whose name starts with this one's are kept
+    """
+    segment_pattern = re.compile(
+        rf"{re.escape(input_file.stem)}_part_\d{{2,}}_of_\d{{2,}}\.mp3"
+    )
+    for segment in get_mp3_files(output_dir):
+        if segment_pattern.fullmatch(segment.name):
+            segment.unlink()
 
 
-def add_title_to_segment(segment: Path, title: str) -> None:
+def add_title_to_segment(
+    segment: Path, title: str, encoding_profile: str = DEFAULT_ENCODING_PROFILE
+) -> None:
     """
     Modify the mp3 segment at the given path to add a voice saying the title at the beginning of the audio
+    The titling is recorded in the journal of the segment's directory, so a segment is not given its title twice
     :param segment: mp3 segment to modify
     :param title: audio to add
+    :param encoding_profile: the encoding of the titled segment, one of ENCODING_PROFILES
     """
-    with TemporaryDirectory() as tmp_dir:
-        tmp_dir = Path(tmp_dir)
-        title_audio_filename = tmp_dir / "title.mp3"
-        generate_part_title_audio(title, title_audio_filename)
-        title_and_segment_mp3 = tmp_dir / "title_and_segment.mp3"
-        concatenate_mp3s([title_audio_filename, segment], title_and_segment_mp3)
-        shutil.copy(title_and_segment_mp3, segment)
+    journal = Journal(segment.parent)
+    unit = f"title:{segment.name}"
+    fingerprint = make_fingerprint(
+        [], {"title": title, "encoding_profile": encoding_profile}
+    )
+    if journal.is_done(unit, fingerprint):
+        return
+    # The titled segment is encoded straight over the segment, which is read beforehand
+    segment_audio = segment.read_bytes()
+    title_audio = get_part_title_audio(
+        title, sample_rate=probe_media(segment).sample_rate
+    )
+    try:
+        concatenate_mp3s([title_audio, segment_audio], segment, encoding_profile)
+    except BaseException:
+        segment.write_bytes(segment_audio)
+        raise
+    journal.record(unit, fingerprint, [segment])
 
 
 def get_segments(
@@ -83,27 +278,133 @@ def get_segments(
 
 
 def split_audio(
-    input_file: Path, output_dir: Path, segment_duration_seconds: int, overlap: int
-) -> None:
+    input_file: Path,
+    output_dir: Path,
+    segment_duration_seconds: int,
+    overlap: float,
+    cutting_mode: str = "reencode",
+    episode_title: str | None = None,
+    boundaries: str = "fixed",
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+) -> list[Path]:
     """
     split an audio file into parts of an approximate duration
     :param input_file: The file to split
     :param output_dir: The target directory for the splits
     :param segment_duration_seconds: the approximate duration of a split in seconds
     :param overlap: The overlap between each segments, so a sentence is not cut in the middle
+    :param cutting_mode: "reencode" to decode and encode the segments, "copy" to copy the mp3 frames of each segment.
+    The copy mode falls back to reencoding when the input is not a plain mp3 file, or when the frames of the titles,
+    encoded with the sample rate, channels and bitrate of the input, cannot be put before its frames
+    :param episode_title: if provided, each part starts with a voice saying the part number and this title
+    :param boundaries: "fixed" to cut every segment_duration_seconds, "silence" to cut in the quietest spot near them,
+    see get_silence_aware_segments
+    :param encoding_profile: the encoding of the reencoded parts, one of ENCODING_PROFILES. Copied parts keep the
+    encoding of the input
+    :return: the files of the parts, in order
     """
+    if cutting_mode == "copy":
+        try:
+            frame_index = get_mp3_frame_index(input_file)
+        except ValueError as e:
+            print(f"Cannot copy the frames of {input_file.name}, reencoding it: {e}")
+        else:
+            segments = _plan_segments(
+                input_file,
+                frame_index.duration,
+                segment_duration_seconds,
+                overlap,
+                boundaries,
+            )
+            segment_files = [
+                output_dir
+                / get_segment_filename(input_file, part_number, len(segments))
+                for part_number in range(len(segments))
+            ]
+            # The titles are encoded like the input, so their frames can be put before the ones of the segments
+            input_metadata = probe_media(input_file)
+            try:
+                for part_number, (lower_bound, upper_bound) in enumerate(segments):
+                    copy_cut_mp3(
+                        frame_index,
+                        input_file,
+                        segment_files[part_number],
+                        lower_bound,
+                        upper_bound,
+                        title_audio_file=(
+                            None
+                            if episode_title is None
+                            else get_part_title_audio(
+                                get_part_title(
+                                    episode_title, part_number, len(segments)
+                                ),
+                                sample_rate=frame_index.sample_rate,
+                                channels=input_metadata.channels,
+                                bitrate=input_metadata.bitrate,
+                            )
+                        ),
+                    )
+            except ValueError as e:
+                for segment_file in segment_files:
+                    segment_file.unlink(missing_ok=True)
+                print(
+                    f"Cannot put the titles before the frames of {input_file.name}, reencoding it: {e}"
+                )
+            else:
+                return segment_files
+
     duration = get_duration(input_file)
-    segments = get_segments(duration, segment_duration_seconds, overlap)
-    for part_number, (lower_bound, upper_bound) in tqdm(
-        enumerate(segments), total=len(segments), desc=f"Cutting {input_file.name}"
-    ):
-        filename_suffix = f"_part_{part_number + 1:02d}_of_{len(segments):02d}.mp3"
-        cut_audio(
-            input_file,
-            output_file=output_dir / (input_file.stem + filename_suffix),
-            lower_bound=lower_bound,
-            upper_bound=upper_bound,
+    segments = _plan_segments(
+        input_file, duration, segment_duration_seconds, overlap, boundaries
+    )
+    segment_files = [
+        output_dir / get_segment_filename(input_file, part_number, len(segments))
+        for part_number in range(len(segments))
+    ]
+    cut_audio_segments(
+        input_file,
+        [
+            (segment_file, lower_bound, upper_bound)
+            for segment_file, (lower_bound, upper_bound) in zip(segment_files, segments)
+        ],
+        title_audio_files=(
+            None
+            if episode_title is None
+            else [
+                get_part_title_audio(
+                    get_part_title(episode_title, part_number, len(segments))
+                )
+                for part_number in range(len(segments))
+            ]
+        ),
+        encoding_profile=encoding_profile,
+    )
+    return segment_files
+
+
+def _plan_segments(
+    input_file: Path,
+    duration: float,
+    segment_duration_seconds: int,
+    overlap: float,
+    boundaries: str,
+) -> list[tuple[float, float]]:
+    if boundaries == "silence":
+        return get_silence_aware_segments(
+            input_file, duration, segment_duration_seconds, overlap
         )
+    return get_segments(duration, segment_duration_seconds, overlap)
+
+
+def get_segment_filename(input_file: Path, part_number: int, total_parts: int) -> str:
+    """
+    Name of the file of a segment of an episode, e.g. episode_part_02_of_05.mp3
+    :param input_file: the episode being split
+    :param part_number: the index of the segment, starting from 0
+    :param total_parts: how many segments the episode is split into
+    :return: the filename of the segment
+    """
+    return f"{input_file.stem}_part_{part_number + 1:02d}_of_{total_parts:02d}.mp3"
 
 
 def get_title_for_each_segment(rss_file: Path, segments: list[Path]) -> dict[Path, str]:
@@ -113,20 +414,32 @@ def get_title_for_each_segment(rss_file: Path, segments: list[Path]) -> dict[Pat
     :param segments: the segments
     :return A dictionary of segments and corresponding title
     """
-    rss_feed = RssFeed(rss_file)
-    return {segment: _get_title_for_segment(rss_feed, segment) for segment in segments}
+    podcast_titles = read_podcast_titles(rss_file)
+    return {
+        segment: _get_title_for_segment(podcast_titles, segment) for segment in segments
+    }
 
 
-def _get_title_for_segment(rss_feed: RssFeed, segment: Path) -> str:
+def _get_title_for_segment(podcast_titles: dict[str, str], segment: Path) -> str:
     """
     Generate the title to give to a segment, relying on the segment filename and the rss feed info
-    :param rss_feed: the rss feed
+    :param podcast_titles: the title of each podcast of the rss feed, by filename
     :param segment: the segment
     :return the appropriate title for the segment
     """
 
-    path_in_rss_feed = Path(segment.stem[:-14] + ".mp3")
-    title = get_podcast_title(rss_feed, path_in_rss_feed)
+    title = podcast_titles[segment.stem[:-14] + ".mp3"]
     segment_number = int(segment.stem[-8:-6])
     total_segments = int(segment.stem[-2:])
-    return f"Partie {segment_number} sur {total_segments} de {title}"
+    return get_part_title(title, segment_number - 1, total_segments)
+
+
+def get_part_title(episode_title: str, part_number: int, total_parts: int) -> str:
+    """
+    The title to give to a part of an episode
+    :param episode_title: the title of the episode
+    :param part_number: the index of the part, starting from 0
+    :param total_parts: how many parts the episode is split into
+    :return: the title of the part
+    """
+    return f"Partie {part_number + 1} sur {total_parts} de {episode_title}"
@@ -1,8 +1,17 @@
+import json
+import shutil
+from functools import cache
+from hashlib import sha256
 from pathlib import Path
 
 from picotts import PicoTTS
 
-from python_client.audio_processing import convert_to_mp3
+from python_client.audio_processing import MP3_ENCODING, convert_to_mp3
+from python_client.cache import FileCache
+from python_client.profiling import profile_call
+
+VOICE = "fr-FR"
+TITLE_AUDIO_CACHE_MAX_SIZE_BYTES = 200 * 1024 * 1024
 
 
 def generate_part_title_audio(title: str, output_filename: Path) -> None:
@@ -11,15 +20,114 @@ def generate_part_title_audio(title: str, output_filename: Path) -> None:
     :param title: title to say
     :param output_filename: target audio file
     """
+    shutil.copyfile(get_part_title_audio(title), output_filename)
+
+
+def get_part_title_audio(
+    title: str,
+    sample_rate: int | None = None,
+    channels: int | None = None,
+    bitrate: int | None = None,
+) -> Path:
+    """
+    Get an mp3 file of a voice saying the given title
+    The encoded audio is cached, so a title already said is not synthesized again
+    :param title: title to say
+    :param sample_rate: the sample rate of the mp3, by default the one of the synthesized voice
+    :param channels: the number of channels of the mp3, by default the one of MP3_ENCODING
+    :param bitrate: the constant bitrate of the mp3 in bits per second, by default the one of MP3_ENCODING. Along
+    with the sample rate and the channels, it lets the title be put before the frames of another mp3 without
+    reencoding them
+    :return: the path of the mp3 within the cache, it must not be modified
+    """
     title_to_tell = _make_title_pronounceable(title)
-    filename_wav = output_filename.with_suffix(".wav")
-    picotts = PicoTTS()
-    picotts.voice = "fr-FR"
-    wavs = picotts.synth_wav(title_to_tell)
-    with open(filename_wav, "wb") as buffer:
-        buffer.write(wavs)
-    convert_to_mp3(filename_wav, output_filename)
-    filename_wav.unlink()
+    title_audio_cache = _get_title_audio_cache()
+    key = _title_audio_cache_key(title_to_tell, VOICE, sample_rate, channels, bitrate)
+    cached_title_audio = title_audio_cache.get(key)
+    if cached_title_audio is None:
+        cached_title_audio = title_audio_cache.put(
+            key,
+            _synthesize_title_audio(
+                title_to_tell, sample_rate, channels, bitrate, title_audio_cache
+            ),
+        )
+    return cached_title_audio
+
+
+def _synthesize_title_audio(
+    title_to_tell: str,
+    sample_rate: int | None,
+    channels: int | None,
+    bitrate: int | None,
+    title_audio_cache: FileCache,
+) -> Path:
+    """
+    Synthesize the voice saying a title and encode it to mp3
+    The synthesized WAV is piped to the encoder, only the mp3 is written
+    :param title_to_tell: the pronounceable title
+    :param sample_rate: the sample rate of the mp3, None to keep the one of the voice
+    :param channels: the number of channels of the mp3, None for the one of MP3_ENCODING
+    :param bitrate: the bitrate of the mp3, None for the one of MP3_ENCODING
+    :param title_audio_cache: the cache the mp3 will be stored into, it is written there
+    :return: a temporary mp3 file within the cache directory
+    """
+    with profile_call("picotts.synth_wav", processes=1) as record:
+        wavs = _get_tts_engine(VOICE).synth_wav(title_to_tell)
+        if record is not None:
+            record.bytes_written = len(wavs)
+    filename_mp3 = title_audio_cache.new_temporary_file()
+    try:
+        convert_to_mp3(
+            wavs, filename_mp3, sample_rate, channels=channels, bitrate=bitrate
+        )
+    except BaseException:
+        filename_mp3.unlink()
+        raise
+    return filename_mp3
+
+
+@cache
+def _get_tts_engine(voice: str) -> PicoTTS:
+    """
+    Get the TTS engine of a voice, built once per process
+    :param voice: the voice, e.g. fr-FR
+    :return: the TTS engine
+    """
+    return PicoTTS(voice=voice)
+
+
+def _get_title_audio_cache() -> FileCache:
+    return FileCache("title_audio", TITLE_AUDIO_CACHE_MAX_SIZE_BYTES, suffix=".mp3")
+
+
+def _title_audio_cache_key(
+    title_to_tell: str,
+    voice: str,
+    sample_rate: int | None,
+    channels: int | None = None,
+    bitrate: int | None = None,
+) -> str:
+    """
+    Identify an encoded title audio by everything it is made of: what is said, by which voice, and how it is encoded
+    :param title_to_tell: the pronounceable title
+    :param voice: the voice
+    :param sample_rate: the sample rate of the mp3
+    :param channels: the number of channels of the mp3, None for the one of MP3_ENCODING
+    :param bitrate: the bitrate of the mp3, None for the one of MP3_ENCODING
+    :return: the cache key of the title audio
+    """
+    content = json.dumps(
+        {
+            "text": title_to_tell,
+            "voice": voice,
+            "encoding": MP3_ENCODING,
+            "sample_rate": sample_rate,
+            "channels": channels,
+            "bitrate": bitrate,
+        },
+        sort_keys=True,
+    )
+    return sha256(content.encode("utf-8")).hexdigest()
 
 
 def _make_title_pronounceable(title: str) -> str:
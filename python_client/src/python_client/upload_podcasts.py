@@ -1,43 +1,288 @@
-import shutil
-import sys
-from datetime import datetime
+import os
+import subprocess
+from argparse import ArgumentParser, Namespace
+from dataclasses import dataclass, field
 from pathlib import Path
 
-from python_client.audio_processing import get_duration
+from python_client.audio_backends import AUDIO_BACKENDS, set_audio_backend
+from python_client.audio_processing import (
+    DEFAULT_ENCODING_PROFILE,
+    ENCODING_PROFILES,
+    get_duration,
+)
+from python_client.duplicates import find_duplicate_episodes, report_duplicates
+from python_client.feed_artifacts import publish_feed
 from python_client.firebase_hosting import create_firebase_json
+from python_client.parallel import run_jobs
 from python_client.preprocessing import (
-    convert_m4a_files_to_mp3,
-    set_id3_tags,
+    convert_m4a_file_to_mp3,
+    set_id3_title,
     get_mp3_files,
     create_dir_if_necessary,
     ensure_no_unnecessary_files_will_be_uploaded,
+    list_episodes,
 )
+from python_client.profiling import profile_stage, profiling_session
+from python_client.publishing import PublishSummary, publish_files
 from python_client.rss_feed import (
+    PodcastUpdate,
     RssFeed,
+    get_podcast_title,
+    list_filenames,
     save_rss_feed,
-    set_podcast_duration,
+    update_podcasts,
 )
+from python_client.watch import watch_directory
+
+
+@dataclass(frozen=True)
+class PreparedEpisode:
+    """
+    An mp3 as it was once prepared, with its duration
+    """
+
+    size: int
+    mtime_ns: int
+    title: str
+    duration: float
+
+
+@dataclass
+class UploadState:
+    """
+    What a watching upload keeps from one pass to the next, so the feed is not parsed and an episode not prepared twice
+    """
+
+    # The feed as last saved, and the size and modification time of its file then
+    rss_feed: RssFeed | None = None
+    rss_feed_stat: tuple[int, int] | None = None
+    prepared_episodes: dict[Path, PreparedEpisode] = field(default_factory=dict)
+    # Whether the public directory changed since it was last deployed, e.g. because the deploy failed
+    deploy_pending: bool = False
+
+
+def parse_args() -> Namespace:
+    """
+    Parse the arguments from the command line
+    :return: the arguments input_folder, profile, watch, feed_page_size, encoding_profile, audio_backend, jobs and
+    deploy_command
+    """
+    parser = ArgumentParser(
+        description="Prepare the downloaded podcasts and publish them to the public directory"
+    )
+    parser.add_argument(
+        "input_folder",
+        type=str,
+        help="Input folder where audio files and the rss.xml file are downloaded",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="REPORT",
+        help="Write where the time went to this file, as JSON, or JSON lines if it ends with .jsonl",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, and publish the podcasts as they are downloaded",
+    )
+    parser.add_argument(
+        "--feed-page-size",
+        type=int,
+        metavar="N",
+        help="Also publish the feed as pages of N items, the most recent first, rss_page_1.xml being the first page",
+    )
+    parser.add_argument(
+        "--encoding-profile",
+        choices=ENCODING_PROFILES,
+        default=DEFAULT_ENCODING_PROFILE,
+        help="the encoding of the m4a files converted to mp3, the mp3 files are published as they are",
+    )
+    parser.add_argument(
+        "--audio-backend",
+        choices=AUDIO_BACKENDS,
+        help="ffmpeg to run a process per operation, the default, or pyav to run them in process, "
+        "which saves starting processes but encodes slower with PyAV's wheels",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="How many episodes to prepare at the same time, by default the number of CPUs",
+    )
+    parser.add_argument(
+        "--deploy-command",
+        metavar="COMMAND",
+        help="A shell command deploying the public directory, run once the podcasts are published. "
+        "With --watch, it is run after each pass that changed the public directory",
+    )
+    return parser.parse_args()
 
 
 def prepare_podcast_upload():
     """
     Takes the RSS feed and audio files from the download directory
     Prepare and move them to a public directory where they will be ready to use for the podcast app
+    Then deploy the public directory with the deploy command, if one is given
+    """
+    args = parse_args()
+    if args.audio_backend is not None:
+        set_audio_backend(args.audio_backend)
+    with profiling_session(args.profile):
+        input_directory = Path(args.input_folder)
+        public_dir_path = determine_public_dir_path()
+
+        def publish(state: UploadState | None) -> None:
+            summary = publish_podcasts(
+                input_directory,
+                public_dir_path,
+                state,
+                args.feed_page_size,
+                args.encoding_profile,
+                args.jobs,
+            )
+            if args.deploy_command is not None:
+                deploy(args.deploy_command, summary, state)
+
+        if args.watch:
+            state = UploadState()
+            print(f"Watching {input_directory}, press Ctrl+C to stop")
+            watch_directory(input_directory, lambda _: publish(state))
+        else:
+            publish(None)
+
+
+def publish_podcasts(
+    input_directory: Path,
+    public_dir_path: Path,
+    state: UploadState | None = None,
+    feed_page_size: int | None = None,
+    encoding_profile: str = DEFAULT_ENCODING_PROFILE,
+    jobs: int | None = None,
+) -> PublishSummary:
     """
-    input_directory = Path(sys.argv[1])
-    ensure_no_unnecessary_files_will_be_uploaded(input_directory)
+    Prepare the podcasts of the download directory, fill their duration in the feed, and publish them with the feed
+    An episode downloaded more than once is prepared and published once, the duplicates are left out of the published
+    feed, see find_duplicate_episodes
+    :param input_directory: the download directory, with the audio files and the rss.xml
+    :param public_dir_path: the public directory
+    :param state: what was kept from the previous pass when watching, the episodes that have not changed since are not
+    prepared again. None to prepare every episode
+    :param feed_page_size: if provided, the feed is also published as pages of this many items, see publish_feed
+    :param encoding_profile: the encoding of the m4a episodes converted to mp3, see prepare_episode
+    :param jobs: how many episodes to prepare at the same time, by default the number of CPUs
+    :return: what publishing did to the public directory
+    """
+    state = state or UploadState()
+    with profile_stage("Checking the input directory"):
+        ensure_no_unnecessary_files_will_be_uploaded(input_directory)
 
-    public_dir_path = determine_public_dir_path()
     create_dir_if_necessary(public_dir_path)
-    backup_rss_xml_file(public_dir_path, datetime.now())
-    convert_m4a_files_to_mp3(input_directory)
-    set_id3_tags(input_directory)
-    fill_podcasts_duration(input_directory)
-
-    shutil.copy(input_directory / "rss.xml", public_dir_path / "rss.xml")
-    for mp3_file in get_mp3_files(input_directory):
-        shutil.copy(mp3_file, public_dir_path / mp3_file.name)
+
+    rss_file = input_directory / "rss.xml"
+    with profile_stage("Reading the feed"):
+        rss_feed = (
+            state.rss_feed
+            if state.rss_feed_stat == _get_stat(rss_file)
+            else RssFeed(rss_file)
+        )
+    episodes = list_episodes(input_directory)
+    with profile_stage("Finding duplicates"):
+        duplicates = find_duplicate_episodes(episodes, list_filenames(rss_feed))
+    report_duplicates(duplicates)
+    episodes = [episode for episode in episodes if episode not in duplicates]
+    titles = {
+        episode.with_suffix(".mp3"): get_podcast_title(
+            rss_feed, episode.with_suffix(".mp3")
+        )
+        for episode in episodes
+    }
+    for mp3_file, duration in run_jobs(
+        prepare_episode,
+        [
+            (episode, titles[episode.with_suffix(".mp3")], encoding_profile)
+            for episode in episodes
+            if not _is_prepared(state, episode, titles[episode.with_suffix(".mp3")])
+        ],
+        jobs or os.cpu_count() or 1,
+        "Preparing podcasts",
+        threads=True,
+    ):
+        state.prepared_episodes[mp3_file] = PreparedEpisode(
+            *_get_stat(mp3_file), titles[mp3_file], duration
+        )
+    prepared_episodes = [
+        (mp3_file, state.prepared_episodes[mp3_file].duration) for mp3_file in titles
+    ]
+    with profile_stage("Updating the feed"):
+        # The feed has just been read or saved, nothing else refers to it so it can be updated in place
+        update_podcasts(
+            rss_feed,
+            {
+                mp3_file: PodcastUpdate(duration=duration_to_hours(duration))
+                for mp3_file, duration in prepared_episodes
+            },
+            in_place=True,
+        )
+        save_rss_feed(rss_feed, rss_file)
+    state.rss_feed, state.rss_feed_stat = rss_feed, _get_stat(rss_file)
+
+    with profile_stage("Publishing"):
+        # The feed is only written, and the previous one backed up, when its content changed
+        summary = publish_feed(
+            rss_file,
+            public_dir_path,
+            page_size=feed_page_size,
+            excluded_filenames={
+                duplicate.with_suffix(".mp3").name for duplicate in duplicates
+            },
+        ) + publish_files(
+            [mp3_file for mp3_file, _ in prepared_episodes], public_dir_path
+        )
+    print(f"Published to {public_dir_path}: {summary}")
     create_firebase_json(public_dir_path)
+    return summary
+
+
+def deploy(
+    deploy_command: str, summary: PublishSummary, state: UploadState | None = None
+) -> None:
+    """
+    Run the command deploying the public directory, e.g. firebase deploy
+    When watching, it is only run if the public directory changed since the last successful deploy
+    :param deploy_command: the command, run by the shell
+    :param summary: what the pass which has just published did to the public directory
+    :param state: what was kept from the previous passes when watching, None to deploy anyway
+    :raise subprocess.CalledProcessError: if the command fails, the next pass then deploys again
+    """
+    if state is not None:
+        state.deploy_pending |= bool(summary.linked_files or summary.copied_files)
+        if not state.deploy_pending:
+            return
+    with profile_stage("Deploying"):
+        subprocess.run(deploy_command, shell=True, check=True)
+    if state is not None:
+        state.deploy_pending = False
+
+
+def prepare_episode(
+    episode: Path, title: str, encoding_profile: str = DEFAULT_ENCODING_PROFILE
+) -> tuple[Path, float]:
+    """
+    Make the mp3 file of an episode, tagged with its title, reading the source audio only once
+    An m4a is converted with its tag in a single encoding, whose duration is read from the header written by the encoder.
+    An mp3 has its tag set only if it is not the right one, and its duration read from its headers
+    :param episode: the m4a or mp3 file of the episode
+    :param title: the title of the episode
+    :param encoding_profile: the encoding of the mp3 converted from an m4a, one of ENCODING_PROFILES. An mp3 is kept
+    as it is
+    :return: the mp3 file and its duration in seconds
+    """
+    mp3_file = episode.with_suffix(".mp3")
+    if episode.suffix == ".m4a":
+        convert_m4a_file_to_mp3(episode, title, encoding_profile)
+    else:
+        set_id3_title(mp3_file, title)
+    return mp3_file, get_duration(mp3_file)
 
 
 def duration_to_hours(duration_in_seconds: float) -> str:
@@ -60,25 +305,15 @@ def fill_podcasts_duration(in_directory: Path) -> None:
     :param in_directory: the directory that contains mp3s and an rss feed
     """
     xml_feed = RssFeed(in_directory / "rss.xml")
-    for mp3_file in get_mp3_files(in_directory):
-        duration = get_duration(mp3_file)
-        xml_feed = set_podcast_duration(xml_feed, mp3_file, duration_to_hours(duration))
+    updates = {
+        mp3_file: PodcastUpdate(duration=duration_to_hours(get_duration(mp3_file)))
+        for mp3_file in get_mp3_files(in_directory)
+    }
+    # The feed has just been read, nothing else refers to it so it can be updated in place
+    update_podcasts(xml_feed, updates, in_place=True)
     save_rss_feed(xml_feed, in_directory / "rss.xml")
 
 
-def backup_rss_xml_file(public_dir_path: Path, timestamp: datetime) -> None:
-    """ "
-    Back up the rss file, if it exists, by adding a timestamp to its name
-    :param public_dir_path the path of the public
-    :param timestamp the timestamp used to rename the file
-    """
-    suffix = timestamp.strftime("%y%m%d_%H%M%S")
-    try:
-        (public_dir_path / "rss.xml").rename(public_dir_path / f"rss_{suffix}.xml")
-    except FileNotFoundError:
-        pass
-
-
 def determine_public_dir_path() -> Path:
     """
     Determine the path of the public directory
@@ -86,3 +321,20 @@ def determine_public_dir_path() -> Path:
     :return:
     """
     return Path(__file__).parents[3] / "public"
+
+
+def _get_stat(file: Path) -> tuple[int, int]:
+    stat = file.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _is_prepared(state: UploadState, episode: Path, title: str) -> bool:
+    """
+    Tell whether an episode is an mp3 which has not changed since it was prepared with the same title
+    """
+    prepared_episode = state.prepared_episodes.get(episode)
+    return (
+        prepared_episode is not None
+        and (prepared_episode.size, prepared_episode.mtime_ns) == _get_stat(episode)
+        and prepared_episode.title == title
+    )
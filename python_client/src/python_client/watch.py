@@ -0,0 +1,88 @@
+import os
+import time
+import traceback
+from pathlib import Path
+from typing import Callable
+
+POLL_INTERVAL_SECONDS = 2.0
+# A download is considered complete once the directory has not changed for this long
+SETTLE_SECONDS = 10.0
+# Files being written under a temporary name, by the browser or by the client itself
+IGNORED_SUFFIXES = (".part", ".crdownload", ".tmp", ".converting")
+
+Snapshot = dict[Path, tuple[int, int]]
+
+
+def watch_directory(
+    directory: Path,
+    on_change: Callable[[list[Path]], None],
+    poll_interval: float = POLL_INTERVAL_SECONDS,
+    settle_seconds: float = SETTLE_SECONDS,
+    should_stop: Callable[[], bool] = lambda: False,
+) -> None:
+    """
+    Call a function each time files are added, modified or removed in a directory, once they are no longer being written
+    The directory is polled, and the function is called once it has not changed for settle_seconds, so a file being
+    downloaded is not processed before it is complete. The function is first called with all the files of the directory.
+    The files the function writes in the directory are seen as changes, the function must be idempotent so the pass
+    they trigger does nothing. If the function raises, the error is printed and the files are retried on their next change
+    :param directory: the directory to watch
+    :param on_change: the function to call with the files added, modified or removed since the previous call
+    :param poll_interval: how many seconds between 2 looks at the directory
+    :param settle_seconds: how many seconds the directory must stay the same before on_change is called
+    :param should_stop: tells whether to stop watching, checked after each look at the directory. Ctrl+C stops it too
+    """
+    try:
+        _watch(directory, on_change, poll_interval, settle_seconds, should_stop)
+    except KeyboardInterrupt:
+        print(f"Stopped watching {directory}")
+
+
+def _watch(
+    directory: Path,
+    on_change: Callable[[list[Path]], None],
+    poll_interval: float,
+    settle_seconds: float,
+    should_stop: Callable[[], bool],
+) -> None:
+    processed: Snapshot = {}
+    last_seen = scan_directory(directory)
+    last_change = time.monotonic() - settle_seconds
+    while True:
+        current = scan_directory(directory)
+        now = time.monotonic()
+        if current != last_seen:
+            last_seen, last_change = current, now
+        elif current != processed and now - last_change >= settle_seconds:
+            changed = sorted(
+                path
+                for path in current.keys() | processed.keys()
+                if current.get(path) != processed.get(path)
+            )
+            processed = current
+            try:
+                on_change(changed)
+            except Exception:
+                traceback.print_exc()
+                print("The files will be processed again on their next change")
+        if should_stop():
+            return
+        time.sleep(poll_interval)
+
+
+def scan_directory(directory: Path) -> Snapshot:
+    """
+    Take the size and modification time of the files of a directory, except hidden and temporary ones
+    :param directory: the directory
+    :return: the size and modification time of each file, by path
+    """
+    snapshot = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or entry.name.endswith(IGNORED_SUFFIXES):
+                continue
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            snapshot[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
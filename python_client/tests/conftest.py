@@ -2,6 +2,11 @@ from pathlib import Path
 
 import pytest
 
+from python_client.audio_backends import (
+    AUDIO_BACKEND_ENVIRONMENT_VARIABLE,
+    AUDIO_BACKENDS,
+)
+from python_client.cache import CACHE_DIR_ENVIRONMENT_VARIABLE
 from tests.helpers import _resources_path
 
 
@@ -12,3 +17,26 @@ def resources_path() -> Path:
     :return: the resources directory path
     """
     return _resources_path()
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path_factory, monkeypatch) -> Path:
+    """
+    Make every test use its own empty cache directory, so tests neither depend on each other nor pollute the user's cache
+    :return: the cache directory path
+    """
+    cache_dir = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv(CACHE_DIR_ENVIRONMENT_VARIABLE, str(cache_dir))
+    return cache_dir
+
+
+@pytest.fixture(params=AUDIO_BACKENDS)
+def audio_backend(request, monkeypatch) -> str:
+    """
+    Run a test once per audio backend, skipping the ones whose dependencies are not installed
+    :return: the name of the backend
+    """
+    if request.param == "pyav":
+        pytest.importorskip("av")
+    monkeypatch.setenv(AUDIO_BACKEND_ENVIRONMENT_VARIABLE, request.param)
+    return request.param
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from python_client.audio_backends import (
+    AUDIO_BACKEND_ENVIRONMENT_VARIABLE,
+    _to_pyav_encoding,
+    get_audio_backend,
+    set_audio_backend,
+)
+from python_client.audio_processing import ENCODING_PROFILES
+
+
+def test_get_audio_backend_defaults_to_ffmpeg(monkeypatch):
+    # Given no backend chosen
+    monkeypatch.delenv(AUDIO_BACKEND_ENVIRONMENT_VARIABLE, raising=False)
+
+    # Then the ffmpeg program is used, one process per operation
+    assert get_audio_backend().name == "ffmpeg"
+    assert get_audio_backend().processes_per_call == 1
+
+
+def test_set_audio_backend(monkeypatch):
+    # Given the pyav backend is installed
+    pytest.importorskip("av")
+    monkeypatch.setenv(AUDIO_BACKEND_ENVIRONMENT_VARIABLE, "ffmpeg")
+
+    # When it is chosen
+    set_audio_backend("pyav")
+
+    # Then it is used by this process, and by the processes it starts
+    assert get_audio_backend().name == "pyav"
+    assert os.environ[AUDIO_BACKEND_ENVIRONMENT_VARIABLE] == "pyav"
+
+
+def test_set_unknown_audio_backend(monkeypatch):
+    monkeypatch.setenv(AUDIO_BACKEND_ENVIRONMENT_VARIABLE, "ffmpeg")
+    with pytest.raises(ValueError, match="pyav"):
+        set_audio_backend("gstreamer")
+    assert get_audio_backend().name == "ffmpeg"
+
+
+def test_to_pyav_encoding():
+    # The ffmpeg options of the encoding profiles are translated for PyAV
+    assert _to_pyav_encoding(ENCODING_PROFILES["archive"]) == (
+        "libmp3lame",
+        2,
+        192000,
+        {},
+    )
+    assert _to_pyav_encoding(ENCODING_PROFILES["speech-vbr"]) == (
+        "libmp3lame",
+        1,
+        None,
+        {"flags": "+qscale", "global_quality": "826"},
+    )
+    with pytest.raises(ValueError, match="af"):
+        _to_pyav_encoding({"acodec": "libmp3lame", "af": "loudnorm"})
@@ -1,16 +1,24 @@
+import asyncio
 from os import listdir
 
+import eyed3
 import pytest
 from pytest import approx
 
 from python_client.audio_processing import (
+    ENCODING_PROFILES,
     get_duration,
     convert_to_mp3,
+    convert_to_mp3_async,
     cut_audio,
+    cut_audio_segments,
     concatenate_mp3s,
 )
+from python_client.media_metadata import probe_media
 from tests.helpers import copy_resource_file
 
+pytestmark = pytest.mark.usefixtures("audio_backend")
+
 
 def test_convert_to_mp3(tmp_path):
     # Given an input folder containing m4a files
@@ -23,6 +31,26 @@ def test_convert_to_mp3(tmp_path):
     assert set(listdir(tmp_path)) == {"sample.m4a", "sample.mp3"}
 
 
+def test_convert_to_mp3_async(tmp_path, resources_path):
+    # Given 2 files to convert
+    inputs = [resources_path / "sample.m4a", resources_path / "sample.mp3"]
+
+    async def convert_all():
+        await asyncio.gather(
+            *(
+                convert_to_mp3_async(input_file, tmp_path / f"{number}.mp3")
+                for number, input_file in enumerate(inputs)
+            )
+        )
+
+    # When they are converted concurrently
+    asyncio.run(convert_all())
+
+    # Then both mp3 are written
+    assert get_duration(tmp_path / "0.mp3") == approx(5, abs=0.1)
+    assert get_duration(tmp_path / "1.mp3") == approx(5, abs=0.1)
+
+
 def test_get_duration(resources_path):
     # Given an mp3 file
     file = resources_path / "sample.mp3"
@@ -54,3 +82,114 @@ def test_concatenate_mp3s(resources_path, tmp_path):
     duration_of_concatenated_file = get_duration(tmp_path / "concatenated.mp3")
     duration_of_source_file = get_duration(resources_path / "sample.mp3")
     assert duration_of_concatenated_file == approx(3 * duration_of_source_file, 0.1)
+
+
+def test_cut_audio_segments(tmp_path, resources_path):
+    # Given an mp3 file and overlapping segments to cut from it
+    input_file = resources_path / "sample.mp3"
+    segments = [
+        (tmp_path / "first.mp3", 0, 3),
+        (tmp_path / "second.mp3", 2, 5),
+    ]
+
+    # When the segments are cut in a single pass
+    cut_audio_segments(input_file, segments)
+
+    # Then every segment is created and lasts approximately its bounds
+    assert set(listdir(tmp_path)) == {"first.mp3", "second.mp3"}
+    assert get_duration(tmp_path / "first.mp3") == approx(3, 0.1)
+    assert get_duration(tmp_path / "second.mp3") == approx(3, 0.1)
+
+
+def test_convert_to_mp3_with_title(tmp_path, resources_path):
+    # When an audio file is converted with a title
+    convert_to_mp3(resources_path / "sample.m4a", tmp_path / "sample.mp3", title="Été")
+
+    # Then the title is written in the id3 tag of the mp3
+    assert eyed3.load(tmp_path / "sample.mp3").tag.title == "Été"
+
+
+@pytest.mark.parametrize(
+    "encoding_profile,channels",
+    [("archive", 2), ("speech-mono-64k", 1), ("speech-vbr", 1)],
+)
+def test_encoding_profiles(tmp_path, resources_path, encoding_profile, channels):
+    # Given an mp3 file
+    input_file = resources_path / "sample.mp3"
+
+    # When it is converted, cut, cut in segments and concatenated with an encoding profile
+    convert_to_mp3(
+        input_file, tmp_path / "converted.mp3", encoding_profile=encoding_profile
+    )
+    cut_audio(input_file, tmp_path / "cut.mp3", 1, 3, encoding_profile)
+    cut_audio_segments(
+        input_file,
+        [(tmp_path / "segment.mp3", 0, 2)],
+        encoding_profile=encoding_profile,
+    )
+    concatenate_mp3s(2 * [input_file], tmp_path / "concatenated.mp3", encoding_profile)
+
+    # Then every output has the channels of the profile
+    for output in ["converted.mp3", "cut.mp3", "segment.mp3", "concatenated.mp3"]:
+        assert probe_media(tmp_path / output).channels == channels
+
+
+def test_speech_profiles_are_smaller(tmp_path, resources_path):
+    # When an mp3 file is converted with each profile
+    for encoding_profile in ENCODING_PROFILES:
+        convert_to_mp3(
+            resources_path / "sample.mp3",
+            tmp_path / f"{encoding_profile}.mp3",
+            encoding_profile=encoding_profile,
+        )
+
+    # Then the speech profiles give smaller files than the archive one
+    archive_size = (tmp_path / "archive.mp3").stat().st_size
+    assert (tmp_path / "speech-mono-64k.mp3").stat().st_size < archive_size / 2
+    assert (tmp_path / "speech-vbr.mp3").stat().st_size < archive_size / 2
+
+
+def test_unknown_encoding_profile(tmp_path, resources_path):
+    # When an audio file is converted with an encoding profile that does not exist
+    # Then it fails before running ffmpeg
+    with pytest.raises(ValueError, match="speech-mono-64k"):
+        convert_to_mp3(
+            resources_path / "sample.mp3",
+            tmp_path / "sample.mp3",
+            encoding_profile="lossless",
+        )
+    assert not (tmp_path / "sample.mp3").exists()
+
+
+def test_convert_to_mp3_from_content(tmp_path, resources_path):
+    # Given the content of an audio file, e.g. a voice synthesized in memory
+    content = (resources_path / "sample.mp3").read_bytes()
+
+    # When it is converted
+    convert_to_mp3(content, tmp_path / "sample.mp3", encoding_profile="speech-vbr")
+
+    # Then the mp3 is written, and is the only file written
+    assert listdir(tmp_path) == ["sample.mp3"]
+    assert get_duration(tmp_path / "sample.mp3") == approx(5, abs=0.1)
+
+
+def test_concatenate_mp3s_over_one_of_them(tmp_path, resources_path):
+    # Given an mp3 file whose content has been read
+    copy_resource_file("sample.mp3", tmp_path)
+    content = (tmp_path / "sample.mp3").read_bytes()
+
+    # When the mp3 file is replaced by the concatenation of another mp3 and its content
+    concatenate_mp3s([resources_path / "sample.mp3", content], tmp_path / "sample.mp3")
+
+    # Then it lasts as long as both
+    assert get_duration(tmp_path / "sample.mp3") == approx(10, abs=0.2)
+
+
+def test_concatenate_mp3s_pipes_a_single_content(tmp_path, resources_path):
+    # Given the content of 2 mp3 files
+    content = (resources_path / "sample.mp3").read_bytes()
+
+    # When they are concatenated
+    # Then it fails, ffmpeg has only one standard input
+    with pytest.raises(ValueError):
+        concatenate_mp3s([content, content], tmp_path / "concatenated.mp3")
@@ -0,0 +1,50 @@
+import os
+
+from python_client.cache import FileCache, determine_cache_dir_path, file_cache_key
+
+
+def test_determine_cache_dir_path(cache_dir):
+    # When the path of a cache is determined
+    path = determine_cache_dir_path("some_cache")
+
+    # Then it is a directory within the cache root
+    assert path == cache_dir / "some_cache"
+    assert path.is_dir()
+
+
+def test_file_cache_key_changes_when_file_is_modified(tmp_path):
+    # Given a file and its cache key
+    file = tmp_path / "file.mp3"
+    file.write_bytes(b"content")
+    key = file_cache_key(file)
+
+    # Then the key is stable as long as the file does not change
+    assert file_cache_key(file) == key
+
+    # When the file is modified
+    file.write_bytes(b"other content")
+    os.utime(file, ns=(0, 0))
+
+    # Then its key changes
+    assert file_cache_key(file) != key
+
+
+def test_file_cache_evicts_least_recently_used_files(tmp_path):
+    # Given a cache that can hold 2 files of 10 bytes, which holds 2 files
+    file_cache = FileCache("test", max_size_bytes=20)
+    for key in ("first", "second"):
+        file = file_cache.new_temporary_file()
+        file.write_bytes(10 * b"a")
+        file_cache.put(key, file)
+        os.utime(file_cache.get(key), ns=(0, len(key)))
+
+    # When the first file is used, then a third one is stored
+    assert file_cache.get("first") is not None
+    third_file = tmp_path / "third"
+    third_file.write_bytes(10 * b"a")
+    file_cache.put("third", third_file)
+
+    # Then the least recently used file has been evicted
+    assert file_cache.get("second") is None
+    assert file_cache.get("first") is not None
+    assert file_cache.get("third") is not None
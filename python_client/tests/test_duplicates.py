@@ -0,0 +1,78 @@
+import shutil
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+
+from python_client import duplicates
+from python_client.audio_processing import cut_audio
+from python_client.duplicates import find_duplicate_episodes, fingerprint_audio
+from python_client.preprocessing import set_id3_title
+from tests.helpers import copy_resource_file
+
+
+def test_find_duplicate_episodes_keeps_the_first_one_in_the_feed(tmp_path: Path):
+    # Given an episode downloaded twice, under another name and with another title in its tag
+    copy_resource_file("sample.mp3", tmp_path)
+    shutil.copy(tmp_path / "sample.mp3", tmp_path / "copy.mp3")
+    set_id3_title(
+        tmp_path / "copy.mp3", "A much longer title than the one of the sample"
+    )
+
+    # When the duplicates are searched, the copy coming first in the feed
+    found_duplicates = find_duplicate_episodes(
+        [tmp_path / "sample.mp3", tmp_path / "copy.mp3"],
+        ["copy.mp3", "sample.mp3"],
+    )
+
+    # Then the episode is a duplicate of its copy
+    assert found_duplicates == {tmp_path / "sample.mp3": tmp_path / "copy.mp3"}
+
+
+def test_find_duplicate_episodes_without_feed_keeps_the_first_one_by_name(
+    tmp_path: Path,
+):
+    # Given an episode downloaded twice
+    copy_resource_file("sample.mp3", tmp_path)
+    shutil.copy(tmp_path / "sample.mp3", tmp_path / "copy.mp3")
+
+    # When the duplicates are searched, without the order of the feed
+    found_duplicates = find_duplicate_episodes(
+        [tmp_path / "sample.mp3", tmp_path / "copy.mp3"]
+    )
+
+    # Then the first one by name is kept
+    assert found_duplicates == {tmp_path / "sample.mp3": tmp_path / "copy.mp3"}
+
+
+def test_find_duplicate_episodes_of_different_audio(tmp_path: Path):
+    # Given 2 episodes whose audio differs, one being the beginning of the other
+    copy_resource_file("sample.mp3", tmp_path)
+    cut_audio(tmp_path / "sample.mp3", tmp_path / "beginning.mp3", 0, 4)
+
+    # When the duplicates are searched
+    found_duplicates = find_duplicate_episodes(
+        [tmp_path / "sample.mp3", tmp_path / "beginning.mp3"]
+    )
+
+    # Then there are none
+    assert found_duplicates == {}
+
+
+def test_fingerprint_audio_is_cached_until_the_file_changes(
+    tmp_path: Path, mocker: MockerFixture
+):
+    # Given an episode whose fingerprint was computed once
+    copy_resource_file("sample.mp3", tmp_path)
+    compute_spy = mocker.spy(duplicates, "compute_audio_fingerprint")
+    fingerprint = fingerprint_audio(tmp_path / "sample.mp3")
+
+    # When it is fingerprinted again, then once its tag is changed
+    cached_fingerprint = fingerprint_audio(tmp_path / "sample.mp3")
+    calls_before_change = compute_spy.call_count
+    set_id3_title(tmp_path / "sample.mp3", "Another title")
+    fingerprint_after_change = fingerprint_audio(tmp_path / "sample.mp3")
+
+    # Then it is only computed again once the file changed, and the audio being the same, so is the fingerprint
+    assert calls_before_change == 1
+    assert compute_spy.call_count == 2
+    assert cached_fingerprint == fingerprint == fingerprint_after_change
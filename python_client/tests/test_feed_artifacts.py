@@ -0,0 +1,153 @@
+import gzip
+from datetime import datetime
+from os import listdir
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+import pytest
+
+from python_client.feed_artifacts import (
+    ATOM_NAMESPACE,
+    backup_rss_xml_file,
+    make_etag,
+    paginate_feed,
+    publish_feed,
+)
+from tests.helpers import copy_resource_file
+
+
+def test_backup_old_rss_xml_file_when_file_exists(tmp_path):
+    # Given a file rss.xml present in a directory
+    (tmp_path / "rss.xml").touch()
+
+    # When it is backed up at a certain time
+    backup_rss_xml_file(tmp_path, datetime(2025, 10, 30, 8, 12, 0))
+
+    # Then the file is renamed with the given timestamp
+    assert listdir(tmp_path) == ["rss_251030_081200.xml"]
+
+
+def test_backup_old_rss_xml_file_when_file_does_not_exist(tmp_path):
+    # Given an empty directory
+    # When it is backed up at a certain time
+    backup_rss_xml_file(tmp_path, datetime(2025, 10, 30, 8, 12, 0))
+    # Then the directory still is empty
+    assert listdir(tmp_path) == []
+
+
+def test_publish_feed(tmp_path: Path, resources_path: Path):
+    # Given a public directory
+    public_dir = tmp_path / "public"
+    public_dir.mkdir()
+
+    # When a feed is published
+    summary = publish_feed(resources_path / "rss.xml", public_dir)
+
+    # Then it is published with its compressed variants and its ETag
+    content = (resources_path / "rss.xml").read_bytes()
+    assert (public_dir / "rss.xml").read_bytes() == content
+    assert gzip.decompress((public_dir / "rss.xml.gz").read_bytes()) == content
+    assert (public_dir / "rss.xml.etag").read_text() == make_etag(content)
+    assert summary.copied_files >= 3
+
+
+def test_publish_feed_without_excluded_podcasts(tmp_path: Path, resources_path: Path):
+    # Given a feed, and a public directory
+    copy_resource_file("rss.xml", tmp_path)
+    content = (tmp_path / "rss.xml").read_bytes()
+    public_dir = tmp_path / "public"
+    public_dir.mkdir()
+
+    # When it is published without one of its podcasts
+    publish_feed(tmp_path / "rss.xml", public_dir, excluded_filenames={"sample.mp3"})
+
+    # Then the published feed does not have its item, while the feed published is left as it is
+    published_content = (public_dir / "rss.xml").read_bytes()
+    assert b"sample.mp3" not in published_content
+    assert b"Une_journ_e___la_radio_en_mars_1968.mp3" in published_content
+    assert (public_dir / "rss.xml.etag").read_text() == make_etag(published_content)
+    assert (tmp_path / "rss.xml").read_bytes() == content
+
+
+def test_publish_feed_with_brotli(tmp_path: Path, resources_path: Path):
+    brotli = pytest.importorskip("brotli")
+
+    # When a feed is published while brotli is installed
+    publish_feed(resources_path / "rss.xml", tmp_path)
+
+    # Then its brotli variant is published too
+    assert (
+        brotli.decompress((tmp_path / "rss.xml.br").read_bytes())
+        == (resources_path / "rss.xml").read_bytes()
+    )
+
+
+def test_publish_feed_unchanged(tmp_path: Path, resources_path: Path):
+    # Given a feed already published
+    public_dir = tmp_path / "public"
+    public_dir.mkdir()
+    publish_feed(resources_path / "rss.xml", public_dir)
+    files = set(listdir(public_dir))
+    mtime_ns = (public_dir / "rss.xml").stat().st_mtime_ns
+
+    # When it is published again
+    summary = publish_feed(resources_path / "rss.xml", public_dir)
+
+    # Then nothing is written, and there is no backup
+    assert set(listdir(public_dir)) == files
+    assert (public_dir / "rss.xml").stat().st_mtime_ns == mtime_ns
+    assert summary.copied_files == 0
+
+
+def test_publish_feed_changed(tmp_path: Path, resources_path: Path):
+    # Given a feed already published
+    public_dir = tmp_path / "public"
+    public_dir.mkdir()
+    copy_resource_file("rss.xml", tmp_path)
+    publish_feed(tmp_path / "rss.xml", public_dir)
+
+    # When it changes, and is published again
+    (tmp_path / "rss.xml").write_text(
+        (tmp_path / "rss.xml").read_text().replace("Sample file", "New title")
+    )
+    publish_feed(tmp_path / "rss.xml", public_dir, timestamp=datetime(2025, 10, 30))
+
+    # Then the new feed is published and the previous one backed up
+    assert "New title" in (public_dir / "rss.xml").read_text()
+    assert "rss_251030_000000.xml" in listdir(public_dir)
+    assert (public_dir / "rss.xml.etag").read_text() == make_etag(
+        (tmp_path / "rss.xml").read_bytes()
+    )
+
+
+def test_paginate_feed(resources_path: Path):
+    # When a feed of 2 items is split into pages of 1 item
+    pages = [
+        ET.fromstring(page)
+        for page in paginate_feed((resources_path / "rss.xml").read_bytes(), 1)
+    ]
+
+    # Then the last item of the feed, the most recent, is on the first page, which links to the next one
+    assert [page.find("channel/item/title").text for page in pages] == [
+        "Sample file",
+        "Une journée à la radio en mars 1968",
+    ]
+    assert pages[0].find("channel/title").text == "Noan's podcasts"
+    links = {
+        link.get("rel"): link.get("href")
+        for link in pages[0].findall(f"channel/{{{ATOM_NAMESPACE}}}link")
+    }
+    assert links == {"first": "rss_page_1.xml", "next": "rss_page_2.xml"}
+
+
+def test_publish_feed_removes_extra_pages(tmp_path: Path, resources_path: Path):
+    # Given a feed published as pages of 1 item
+    publish_feed(resources_path / "rss.xml", tmp_path, page_size=1)
+    assert (tmp_path / "rss_page_2.xml.gz").exists()
+
+    # When it is published as pages of 10 items
+    publish_feed(resources_path / "rss.xml", tmp_path, page_size=10)
+
+    # Then the second page is removed
+    assert (tmp_path / "rss_page_1.xml").exists()
+    assert not any(name.startswith("rss_page_2") for name in listdir(tmp_path))
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+import ffmpeg
+import pytest
+
+from python_client.ffmpeg_processes import (
+    ProcessFailedError,
+    ProcessTimeoutError,
+    probe,
+    run_ffmpeg,
+    run_process_async,
+    run_sync,
+    set_max_concurrent_processes,
+)
+
+
+def test_run_ffmpeg(tmp_path: Path, resources_path: Path):
+    # When ffmpeg is run on a graph
+    run_ffmpeg(
+        ffmpeg.input(str(resources_path / "sample.mp3"), t=1).output(
+            str(tmp_path / "cut.mp3")
+        )
+    )
+
+    # Then the output is written
+    assert float(probe(tmp_path / "cut.mp3")["format"]["duration"]) == pytest.approx(
+        1, abs=0.1
+    )
+
+
+def test_run_ffmpeg_with_piped_input(tmp_path: Path, resources_path: Path):
+    # When ffmpeg is given the content of an audio file on its standard input
+    run_ffmpeg(
+        ffmpeg.input("pipe:").output(str(tmp_path / "copy.mp3"), acodec="copy"),
+        stdin=(resources_path / "sample.mp3").read_bytes(),
+    )
+
+    # Then it reads it as it would read the file
+    assert float(probe(tmp_path / "copy.mp3")["format"]["duration"]) == pytest.approx(
+        5, abs=0.1
+    )
+
+
+def test_run_ffmpeg_failure_reports_stderr(tmp_path: Path):
+    # When ffmpeg fails
+    with pytest.raises(ProcessFailedError) as e:
+        run_ffmpeg(ffmpeg.input(str(tmp_path / "missing.mp3")).output("out.mp3"))
+
+    # Then the error holds what ffmpeg said, and is an ffmpeg.Error like the ones of ffmpeg-python
+    assert "missing.mp3" in str(e.value)
+    assert e.value.returncode != 0
+    assert isinstance(e.value, ffmpeg.Error)
+
+
+def test_run_process_timeout_kills_process():
+    # When a process does not finish in time
+    with pytest.raises(ProcessTimeoutError):
+        asyncio.run(
+            run_process_async(
+                [sys.executable, "-c", "import time; time.sleep(10)"], timeout=0.5
+            )
+        )
+    # Then the error is raised without waiting for the process to finish
+
+
+def test_run_process_timeout_reports_stderr():
+    # When a process which has written to its error output does not finish in time
+    with pytest.raises(ProcessTimeoutError) as e:
+        asyncio.run(
+            run_process_async(
+                [
+                    sys.executable,
+                    "-c",
+                    "import sys, time; sys.stderr.write('stuck on frame 42'); sys.stderr.flush(); time.sleep(10)",
+                ],
+                timeout=0.5,
+            )
+        )
+
+    # Then the error holds what it wrote
+    assert b"stuck on frame 42" in e.value.stderr
+    assert "stuck on frame 42" in str(e.value)
+
+
+def test_cancelled_run_process_kills_process(tmp_path: Path):
+    # Given a process that writes a file once it has slept
+    marker = tmp_path / "marker"
+    command = [
+        sys.executable,
+        "-c",
+        f"import time, pathlib; time.sleep(1); pathlib.Path({str(marker)!r}).touch()",
+    ]
+
+    async def cancel_process():
+        task = asyncio.create_task(run_process_async(command))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(1.2)
+
+    # When the task running it is cancelled
+    asyncio.run(cancel_process())
+
+    # Then the process was killed before it could write the file
+    assert not marker.exists()
+
+
+def test_max_concurrent_processes():
+    # Given a limit of 2 processes at the same time
+    set_max_concurrent_processes(2)
+    command = [sys.executable, "-c", "import time; time.sleep(0.5)"]
+
+    async def run_processes() -> float:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*(run_process_async(command) for _ in range(4)))
+        return loop.time() - start
+
+    # When 4 processes are run
+    try:
+        duration = asyncio.run(run_processes())
+    finally:
+        set_max_concurrent_processes(os.cpu_count() or 1)
+
+    # Then they run 2 by 2
+    assert duration >= 1
+
+
+def test_max_concurrent_processes_across_threads():
+    # Given a limit of 2 processes at the same time
+    set_max_concurrent_processes(2)
+    command = [sys.executable, "-c", "import time; time.sleep(0.5)"]
+
+    # When 4 threads each run a process in their own event loop, like the jobs of run_jobs
+    start = perf_counter()
+    try:
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(lambda _: run_sync(run_process_async(command)), range(4)))
+    finally:
+        set_max_concurrent_processes(os.cpu_count() or 1)
+
+    # Then they still run 2 by 2
+    assert perf_counter() - start >= 1
@@ -18,3 +18,9 @@ def test_create_firebase_json(tmp_path):
         firebase_config = load(f)
 
     assert firebase_config["hosting"]["public"] == str(public_dir)
+    # And dot files such as the publish manifest are not uploaded
+    assert firebase_config["hosting"]["ignore"] == ["**/.*"]
+    # And the feeds are revalidated by the clients on every poll
+    assert firebase_config["hosting"]["headers"][0]["headers"] == [
+        {"key": "Cache-Control", "value": "no-cache"}
+    ]
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+from python_client.journal import JOURNAL_FILENAME, Journal, make_fingerprint
+
+
+def test_journal_records_done_units(tmp_path: Path):
+    # Given a unit of work which wrote a file
+    (tmp_path / "output.mp3").write_bytes(b"output")
+    Journal(tmp_path).record(
+        "cut:episode.mp3", "fingerprint", [tmp_path / "output.mp3"]
+    )
+
+    # Then it is done, with the same fingerprint only
+    assert Journal(tmp_path).is_done("cut:episode.mp3", "fingerprint")
+    assert not Journal(tmp_path).is_done("cut:episode.mp3", "other fingerprint")
+    assert not Journal(tmp_path).is_done("cut:other.mp3", "fingerprint")
+
+
+def test_journal_unit_not_done_when_output_changes(tmp_path: Path):
+    # Given a unit of work which wrote a file
+    (tmp_path / "output.mp3").write_bytes(b"output")
+    journal = Journal(tmp_path)
+    journal.record("cut:episode.mp3", "fingerprint", [tmp_path / "output.mp3"])
+
+    # When the file is overwritten
+    (tmp_path / "output.mp3").write_bytes(b"partial")
+
+    # Then the unit of work is to be done again
+    assert not journal.is_done("cut:episode.mp3", "fingerprint")
+
+
+def test_journal_ignores_truncated_line(tmp_path: Path):
+    # Given a journal whose last line was being written when the run was killed
+    (tmp_path / "output.mp3").write_bytes(b"output")
+    journal = Journal(tmp_path)
+    journal.record("cut:episode.mp3", "fingerprint", [tmp_path / "output.mp3"])
+    with open(tmp_path / JOURNAL_FILENAME, "a") as f:
+        f.write('{"unit": "cut:other')
+
+    # When it is compacted
+    journal.compact()
+
+    # Then the complete lines are kept, the truncated one is dropped
+    assert journal.is_done("cut:episode.mp3", "fingerprint")
+    assert len((tmp_path / JOURNAL_FILENAME).read_text().splitlines()) == 1
+
+
+def test_make_fingerprint_changes_with_input(tmp_path: Path):
+    # Given the fingerprint of a unit of work
+    (tmp_path / "input.mp3").write_bytes(b"input")
+    fingerprint = make_fingerprint([tmp_path / "input.mp3"], {"overlap": 10})
+
+    # Then it changes with its parameters or its input
+    assert make_fingerprint([tmp_path / "input.mp3"], {"overlap": 5}) != fingerprint
+    (tmp_path / "input.mp3").write_bytes(b"modified input")
+    assert make_fingerprint([tmp_path / "input.mp3"], {"overlap": 10}) != fingerprint
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+from pytest_mock import MockerFixture
+
+from python_client import media_metadata
+from python_client.media_metadata import MediaMetadata, probe_media
+from tests.helpers import copy_resource_file
+
+pytestmark = pytest.mark.usefixtures("audio_backend")
+
+
+def test_probe_media(resources_path):
+    assert probe_media(resources_path / "sample.m4a") == MediaMetadata(
+        duration=5.0, codec="aac", bitrate=135122, sample_rate=44100, channels=2
+    )
+
+
+def test_probe_media_is_cached(resources_path, mocker: MockerFixture):
+    # Given a file that has already been probed
+    metadata = probe_media(resources_path / "sample.mp3")
+
+    # When it is probed again
+    probe_spy = mocker.spy(media_metadata, "_probe_with_backend")
+    cached_metadata = probe_media(resources_path / "sample.mp3")
+
+    # Then the metadata are read from the cache, ffprobe is not run
+    assert cached_metadata == metadata
+    probe_spy.assert_not_called()
+
+
+def test_probe_media_when_file_changes(tmp_path, resources_path):
+    # Given a file that has already been probed
+    copy_resource_file("sample.mp3", tmp_path)
+    probe_media(tmp_path / "sample.mp3")
+
+    # When it is replaced by another file
+    os.replace(tmp_path / "sample.mp3", tmp_path / "old.mp3")
+    copy_resource_file("sample.m4a", tmp_path)
+    os.replace(tmp_path / "sample.m4a", tmp_path / "sample.mp3")
+
+    # Then its new metadata are probed
+    assert probe_media(tmp_path / "sample.mp3").codec == "aac"
+
+
+def test_probe_media_reads_mp3_headers_in_process(
+    resources_path, mocker: MockerFixture
+):
+    # When an mp3 file is probed
+    probe_spy = mocker.spy(media_metadata, "_probe_with_backend")
+    metadata = probe_media(resources_path / "sample.mp3")
+
+    # Then its headers are read without running ffprobe
+    assert metadata == MediaMetadata(
+        duration=5.041633, codec="mp3", bitrate=192000, sample_rate=44100, channels=2
+    )
+    probe_spy.assert_not_called()
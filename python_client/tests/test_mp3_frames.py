@@ -0,0 +1,171 @@
+from os import listdir
+
+import ffmpeg
+import pytest
+from pytest import approx
+
+from python_client.audio_processing import get_duration
+from python_client.mp3_frames import (
+    build_mp3_frame_index,
+    copy_cut_mp3,
+    get_mp3_frame_index,
+    parse_frame_header,
+    read_mp3_stream_info,
+)
+from tests.helpers import copy_resource_file
+
+
+def test_parse_frame_header():
+    # Given the header of an MPEG 1 layer III frame, 192kbps, 44.1kHz, stereo
+    header = bytes.fromhex("fffbb000")
+
+    # When it is parsed
+    frame_header = parse_frame_header(header)
+
+    # Then its characteristics are known
+    assert frame_header.sample_rate == 44100
+    assert frame_header.bitrate == 192
+    assert frame_header.samples_per_frame == 1152
+    assert frame_header.frame_length == 626
+    assert frame_header.channels == 2
+
+
+def test_parse_frame_header_of_non_mp3_data():
+    assert parse_frame_header(b"ID3\x04") is None
+
+
+def test_build_mp3_frame_index(resources_path):
+    # Given an mp3 file
+    mp3_file = resources_path / "sample.mp3"
+
+    # When its frames are indexed
+    index = build_mp3_frame_index(mp3_file)
+
+    # Then the index covers the whole audio
+    assert index.duration == approx(get_duration(mp3_file), abs=0.05)
+    assert index.frame_offsets[-1] == mp3_file.stat().st_size
+
+
+def test_build_mp3_frame_index_of_non_mp3_file(resources_path):
+    # Given an audio file which is not an mp3
+    # Then it cannot be indexed
+    with pytest.raises(ValueError):
+        build_mp3_frame_index(resources_path / "sample.m4a")
+
+
+def test_get_mp3_frame_index_is_persisted(tmp_path, cache_dir):
+    # Given an mp3 file
+    copy_resource_file("sample.mp3", tmp_path)
+
+    # When its index is requested twice
+    first_index = get_mp3_frame_index(tmp_path / "sample.mp3")
+    second_index = get_mp3_frame_index(tmp_path / "sample.mp3")
+
+    # Then the index has been stored in the cache and read back identically
+    assert listdir(cache_dir / "mp3_frames") != []
+    assert second_index == first_index
+
+
+def test_copy_cut_mp3(tmp_path, resources_path):
+    # Given an mp3 file and its frame index
+    input_file = resources_path / "sample.mp3"
+    index = get_mp3_frame_index(input_file)
+
+    # When it is cut from 2 to 4 seconds by copying its frames
+    copy_cut_mp3(index, input_file, tmp_path / "sample_2_to_4.mp3", 2, 4)
+
+    # Then the resulting audio file lasts approximately 2 seconds
+    assert get_duration(tmp_path / "sample_2_to_4.mp3") == approx(2, 0.1)
+
+
+@pytest.mark.parametrize(
+    "encoding",
+    [
+        {"acodec": "libmp3lame", "ab": "192k"},
+        {"acodec": "libmp3lame", "q:a": 4},
+        {"acodec": "libmp3lame", "ab": "64k", "ac": 1, "ar": 22050},
+    ],
+    ids=["cbr", "vbr", "mono_mpeg2"],
+)
+def test_copy_cut_mp3_writes_an_info_frame(tmp_path, resources_path, encoding):
+    # Given an mp3 file, and a title encoded the same way
+    input_file = tmp_path / "sample.mp3"
+    title_file = tmp_path / "title.mp3"
+    for output_file, duration in ((input_file, 5), (title_file, 1)):
+        ffmpeg.input(str(resources_path / "sample.m4a"), t=duration).output(
+            str(output_file), loglevel="quiet", **encoding
+        ).run()
+
+    # When it is cut from 1 to 3.5 seconds by copying its frames after the ones of the title
+    copy_cut_mp3(
+        get_mp3_frame_index(input_file),
+        input_file,
+        tmp_path / "cut.mp3",
+        1,
+        3.5,
+        title_audio_file=title_file,
+    )
+
+    # Then the cut starts with an Info frame, so its duration is read from its headers as ffprobe reads it
+    first_frame = (tmp_path / "cut.mp3").read_bytes()[:64]
+    assert b"Info" in first_frame or b"Xing" in first_frame
+    assert read_mp3_stream_info(tmp_path / "cut.mp3").duration == approx(
+        float(ffmpeg.probe(tmp_path / "cut.mp3")["format"]["duration"]), abs=0.01
+    )
+    assert read_mp3_stream_info(tmp_path / "cut.mp3").duration == approx(3.5, abs=0.1)
+
+
+@pytest.mark.parametrize(
+    "encoding",
+    [
+        {"acodec": "libmp3lame", "ab": "192k"},
+        {"acodec": "libmp3lame", "q:a": 4},
+        {"acodec": "libmp3lame", "ab": "64k", "ac": 1, "ar": 22050},
+    ],
+    ids=["cbr", "vbr", "mono_mpeg2"],
+)
+def test_read_mp3_stream_info_agrees_with_ffprobe(tmp_path, resources_path, encoding):
+    # Given an mp3 file
+    mp3_file = tmp_path / "sample.mp3"
+    ffmpeg.input(str(resources_path / "sample.m4a")).output(
+        str(mp3_file), loglevel="quiet", **encoding
+    ).run()
+
+    # When its headers are read
+    stream_info = read_mp3_stream_info(mp3_file)
+
+    # Then the result is the one of ffprobe
+    probe = ffmpeg.probe(mp3_file)
+    assert stream_info.duration == approx(float(probe["format"]["duration"]), abs=0.01)
+    assert stream_info.sample_rate == int(probe["streams"][0]["sample_rate"])
+    assert stream_info.channels == probe["streams"][0]["channels"]
+
+
+def test_read_mp3_stream_info_without_info_frame(tmp_path, resources_path):
+    # Given an mp3 file which has no Info frame
+    (
+        ffmpeg.input(str(resources_path / "sample.mp3"))
+        .output(str(tmp_path / "no_info.mp3"), acodec="copy", write_xing=0)
+        .run(quiet=True)
+    )
+
+    # Then its duration is the one of ffprobe
+    assert read_mp3_stream_info(tmp_path / "no_info.mp3").duration == approx(
+        float(ffmpeg.probe(tmp_path / "no_info.mp3")["format"]["duration"]), abs=0.01
+    )
+
+
+def test_read_mp3_stream_info_of_non_mp3_file(resources_path):
+    assert read_mp3_stream_info(resources_path / "sample.m4a") is None
+
+
+def test_read_mp3_stream_info_of_empty_or_truncated_file(tmp_path, resources_path):
+    # Given an empty episode, and one truncated within its first frame header
+    (tmp_path / "empty.mp3").write_bytes(b"")
+    (tmp_path / "truncated.mp3").write_bytes(
+        (resources_path / "sample.mp3").read_bytes()[:2]
+    )
+
+    # Then they are not read as mp3 files
+    assert read_mp3_stream_info(tmp_path / "empty.mp3") is None
+    assert read_mp3_stream_info(tmp_path / "truncated.mp3") is None
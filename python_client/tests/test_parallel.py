@@ -0,0 +1,27 @@
+import pytest
+
+from python_client.parallel import JobsFailedError, run_jobs
+
+
+def _divide(numerator: int, denominator: int) -> float:
+    return numerator / denominator
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_jobs(jobs: int):
+    # When a function is run on several arguments
+    results = run_jobs(_divide, [(1, 2), (3, 4), (5, 8)], jobs, "Dividing")
+
+    # Then the results are in the order of the arguments
+    assert results == [0.5, 0.75, 0.625]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_jobs_with_failures(jobs: int):
+    # When some of the jobs fail
+    with pytest.raises(JobsFailedError) as e:
+        run_jobs(_divide, [(1, 0), (3, 4), (5, 0)], jobs, "Dividing")
+
+    # Then every failure is reported, in the order of the arguments
+    assert [arguments for arguments, _ in e.value.failures] == [(1, 0), (5, 0)]
+    assert all(isinstance(error, ZeroDivisionError) for _, error in e.value.failures)
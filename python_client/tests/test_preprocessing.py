@@ -12,7 +12,7 @@ from python_client.preprocessing import (
     create_dir_if_necessary,
     ensure_no_unnecessary_files_will_be_uploaded,
 )
-from tests.helpers import copy_resource_file
+from tests.helpers import copy_resource_file, _resources_path
 
 
 def test_convert_m4a_files_to_mp3(tmp_path: Path, mocker: MockerFixture):
@@ -90,3 +90,84 @@ def test_ensure_no_unnecessary_files_will_be_uploaded(tmp_path):
         f"another_file.mp3\n"
         f"another_file_with_another_audio_extension.m4a"
     )
+
+
+def test_convert_m4a_files_to_mp3_in_parallel(tmp_path: Path):
+    # Given an input folder containing several m4a files
+    for name in ("first", "second", "third"):
+        shutil.copy(_resources_path() / "sample.m4a", tmp_path / f"{name}.m4a")
+
+    # When they are converted by 2 concurrent workers
+    convert_m4a_files_to_mp3(tmp_path, jobs=2)
+
+    # Then every m4a has its mp3
+    assert set(listdir(tmp_path)) == {
+        "first.m4a",
+        "first.mp3",
+        "second.m4a",
+        "second.mp3",
+        "third.m4a",
+        "third.mp3",
+    }
+
+
+def test_convert_m4a_files_to_mp3_does_not_leave_partial_mp3(
+    tmp_path: Path, mocker: MockerFixture
+):
+    # Given an input folder containing an m4a file
+    copy_resource_file("sample.m4a", tmp_path)
+
+    # When its conversion is interrupted after having written part of the output
+    def interrupted_convert_to_mp3(input_file: Path, output_file: Path, **kwargs):
+        output_file.write_bytes(b"partial")
+        raise KeyboardInterrupt()
+
+    mocker.patch(
+        "python_client.preprocessing.convert_to_mp3", interrupted_convert_to_mp3
+    )
+    with pytest.raises(KeyboardInterrupt):
+        convert_m4a_files_to_mp3(tmp_path, jobs=1)
+
+    # Then no mp3 is left, so the file will be converted by the next run
+    assert listdir(tmp_path) == ["sample.m4a"]
+
+
+def test_convert_m4a_files_to_mp3_with_titles(tmp_path: Path):
+    # Given an input folder containing an m4a file
+    copy_resource_file("sample.m4a", tmp_path)
+
+    # When it is converted with the title of the podcast
+    converted_mp3_files = convert_m4a_files_to_mp3(
+        tmp_path, titles={"sample.mp3": "Sample file"}
+    )
+
+    # Then the mp3 created has its id3 title set
+    assert converted_mp3_files == [tmp_path / "sample.mp3"]
+    assert eyed3.load(tmp_path / "sample.mp3").tag.title == "Sample file"
+
+
+def test_set_id3_tags_skips_files_already_tagged(tmp_path: Path, mocker: MockerFixture):
+    # Given an input folder whose mp3 file already has the title of the rss.xml
+    copy_resource_file("sample.mp3", tmp_path)
+    copy_resource_file("rss.xml", tmp_path)
+    set_id3_tags(tmp_path)
+
+    # When id3 tags are set again
+    save_spy = mocker.spy(eyed3.id3.tag.Tag, "save")
+    set_id3_tags(tmp_path)
+
+    # Then the file is not rewritten
+    save_spy.assert_not_called()
+
+
+def test_set_id3_tags_skips_given_files(tmp_path: Path, mocker: MockerFixture):
+    # Given an input folder with an mp3 file known to be tagged
+    copy_resource_file("sample.mp3", tmp_path)
+    copy_resource_file("rss.xml", tmp_path)
+
+    # When id3 tags are set
+    load_spy = mocker.spy(eyed3, "load")
+    set_id3_tags(tmp_path, already_tagged=[tmp_path / "sample.mp3"])
+
+    # Then the file is not even read
+    load_spy.assert_not_called()
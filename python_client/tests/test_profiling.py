@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from python_client.parallel import run_jobs
+from python_client.profiling import (
+    CallRecord,
+    StageRecord,
+    is_profiling_enabled,
+    profile_call,
+    profiling_session,
+    summarize,
+)
+
+
+def _write_file(file: Path) -> None:
+    with profile_call("file.write", writes=[file]) as record:
+        file.write_bytes(b"0123456789")
+        if record is not None:
+            record.audio_seconds = 2.0
+
+
+def test_profile_call_when_disabled(tmp_path):
+    # When a call is measured while profiling is disabled
+    with profile_call("file.write", writes=[tmp_path / "file"]) as record:
+        pass
+
+    # Then nothing is recorded
+    assert record is None
+    assert not is_profiling_enabled()
+
+
+def test_profiling_session_writes_json_report(tmp_path):
+    # Given a report file
+    report_file = tmp_path / "report.json"
+
+    # When a call is made during a profiling session
+    with profiling_session(report_file):
+        _write_file(tmp_path / "file")
+
+    # Then the report holds the call, with the bytes it wrote, and the whole run as a stage
+    report = json.loads(report_file.read_text())
+    assert report["calls"]["file.write"]["count"] == 1
+    assert report["calls"]["file.write"]["bytes_written"] == 10
+    assert report["calls"]["file.write"]["audio_seconds"] == 2.0
+    assert "total" in report["stages"]
+    assert not is_profiling_enabled()
+
+
+def test_profiling_session_writes_json_lines_report(tmp_path):
+    # Given a JSON lines report file
+    report_file = tmp_path / "report.jsonl"
+
+    # When a call is made during a profiling session
+    with profiling_session(report_file):
+        _write_file(tmp_path / "file")
+
+    # Then there is a line per record, then the summary
+    lines = [json.loads(line) for line in report_file.read_text().splitlines()]
+    assert [line["type"] for line in lines] == ["call", "stage", "summary"]
+    assert lines[0]["stage"] == "total"
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_jobs_merges_records_of_workers(tmp_path, jobs: int):
+    # Given a report file
+    report_file = tmp_path / "report.json"
+
+    # When calls are made by jobs, possibly in other processes, during a profiling session
+    with profiling_session(report_file):
+        run_jobs(_write_file, [(tmp_path / "a",), (tmp_path / "b",)], jobs, "Writing")
+
+    # Then the calls of every job are reported, in the stage of the jobs
+    report = json.loads(report_file.read_text())
+    assert report["calls"]["file.write"]["count"] == 2
+    assert {
+        record["stage"] for record in report["records"] if record["type"] == "call"
+    } == {"Writing"}
+
+
+def test_summarize():
+    # Given the records of a run
+    records = [
+        CallRecord("cut", "ffmpeg.cut_audio", 2.0, processes=1, audio_seconds=60.0),
+        CallRecord("cut", "ffmpeg.cut_audio", 1.0, processes=1, audio_seconds=30.0),
+        StageRecord("cut", 3.5),
+    ]
+
+    # When they are summarized
+    summary = summarize(records)
+
+    # Then the calls are summed, along with the audio processed per second
+    assert summary["stages"] == {"cut": {"count": 1, "wall_time": 3.5}}
+    assert summary["calls"]["ffmpeg.cut_audio"]["processes"] == 2
+    assert summary["calls"]["ffmpeg.cut_audio"]["audio_seconds_per_second"] == 30.0
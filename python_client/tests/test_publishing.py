@@ -0,0 +1,83 @@
+import os
+from os import listdir
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+
+from python_client.publishing import (
+    PUBLISH_MANIFEST_FILENAME,
+    PublishSummary,
+    publish_files,
+)
+
+
+def _make_directories(tmp_path: Path) -> tuple[Path, Path]:
+    input_dir = tmp_path / "input"
+    public_dir = tmp_path / "public"
+    input_dir.mkdir()
+    public_dir.mkdir()
+    (input_dir / "first.mp3").write_bytes(b"first")
+    (input_dir / "second.mp3").write_bytes(b"second")
+    return input_dir, public_dir
+
+
+def test_publish_files(tmp_path: Path):
+    # Given an input directory with files, and an empty public directory
+    input_dir, public_dir = _make_directories(tmp_path)
+    files = [input_dir / "first.mp3", input_dir / "second.mp3"]
+
+    # When the files are published
+    summary = publish_files(files, public_dir)
+
+    # Then they are hard linked into the public directory, along with a manifest
+    assert summary == PublishSummary(linked_files=2)
+    assert set(listdir(public_dir)) == {
+        "first.mp3",
+        "second.mp3",
+        PUBLISH_MANIFEST_FILENAME,
+    }
+    assert (public_dir / "first.mp3").samefile(input_dir / "first.mp3")
+
+    # When they are published again
+    summary = publish_files(files, public_dir)
+
+    # Then nothing is done
+    assert summary == PublishSummary(unchanged_files=2)
+
+
+def test_publish_files_by_copy(tmp_path: Path):
+    # Given an input directory with files, and an empty public directory
+    input_dir, public_dir = _make_directories(tmp_path)
+    files = [input_dir / "first.mp3", input_dir / "second.mp3"]
+
+    # When the files are published without hard links
+    summary = publish_files(files, public_dir, hardlink=False)
+
+    # Then they are copied
+    assert summary == PublishSummary(copied_files=2, bytes_written=11)
+    assert (public_dir / "first.mp3").read_bytes() == b"first"
+    assert not (public_dir / "first.mp3").samefile(input_dir / "first.mp3")
+
+    # When one of them is only touched, and the other one modified
+    os.utime(input_dir / "first.mp3", ns=(0, 0))
+    (input_dir / "second.mp3").write_bytes(b"modified")
+    summary = publish_files(files, public_dir, hardlink=False)
+
+    # Then only the modified one is copied again
+    assert summary == PublishSummary(copied_files=1, unchanged_files=1, bytes_written=8)
+    assert (public_dir / "second.mp3").read_bytes() == b"modified"
+
+
+def test_publish_files_falls_back_to_copy(tmp_path: Path, mocker: MockerFixture):
+    # Given files that cannot be hard linked into the public directory, e.g. because it is on another filesystem
+    input_dir, public_dir = _make_directories(tmp_path)
+    mocker.patch(
+        "python_client.publishing.os.link", side_effect=OSError("cross-device")
+    )
+
+    # When they are published
+    summary = publish_files([input_dir / "first.mp3"], public_dir)
+
+    # Then they are copied
+    assert summary == PublishSummary(copied_files=1, bytes_written=5)
+    assert set(listdir(public_dir)) == {"first.mp3", PUBLISH_MANIFEST_FILENAME}
@@ -9,6 +9,13 @@ from python_client.rss_feed import (
     set_podcast_duration,
     get_podcast_duration,
     save_rss_feed,
+    update_podcasts,
+    PodcastUpdate,
+    FeedItem,
+    iter_feed_items,
+    read_podcast_titles,
+    remove_podcasts_from_feed,
+    namespaces,
 )
 
 
@@ -51,3 +58,131 @@ def test_set_podcast_duration(dummy_rss_feed: RssFeed):
 def test_save_rss_feed(dummy_rss_feed, tmp_path):
     save_rss_feed(dummy_rss_feed, tmp_path / "dummy.xml")
     assert listdir(tmp_path) == ["dummy.xml"]
+
+
+def test_get_podcast_title_of_unknown_podcast(dummy_rss_feed: RssFeed):
+    with pytest.raises(KeyError):
+        get_podcast_title(dummy_rss_feed, Path("unknown.mp3"))
+
+
+def test_set_podcast_duration_keeps_the_index_in_sync(dummy_rss_feed: RssFeed):
+    # When the duration of a podcast is set, which copies the feed
+    rss_feed_with_duration = set_podcast_duration(
+        dummy_rss_feed, Path("sample.mp3"), "00:00:05"
+    )
+
+    # Then the index of the new feed points to the items of the new feed, the original feed is untouched
+    new_items = rss_feed_with_duration.tree.find("channel").findall("item")
+    assert list(rss_feed_with_duration.items_by_filename.values()) == new_items
+    assert get_podcast_duration(dummy_rss_feed, Path("sample.mp3")) == "undefined"
+
+
+def test_update_podcasts(dummy_rss_feed: RssFeed):
+    # When several podcasts are updated at once
+    updated_rss_feed = update_podcasts(
+        dummy_rss_feed,
+        {
+            Path("sample.mp3"): PodcastUpdate(
+                duration="00:00:05", title="New title", enclosure_length=121769
+            ),
+            Path("Une_journ_e___la_radio_en_mars_1968.mp3"): PodcastUpdate(
+                duration="02:00:25"
+            ),
+        },
+    )
+
+    # Then every field is updated in the new feed
+    assert get_podcast_duration(updated_rss_feed, Path("sample.mp3")) == "00:00:05"
+    assert get_podcast_title(updated_rss_feed, Path("sample.mp3")) == "New title"
+    assert (
+        updated_rss_feed.items_by_filename["sample.mp3"].find("enclosure").get("length")
+        == "121769"
+    )
+    assert (
+        get_podcast_duration(
+            updated_rss_feed, Path("Une_journ_e___la_radio_en_mars_1968.mp3")
+        )
+        == "02:00:25"
+    )
+    # And the original feed is left untouched
+    assert get_podcast_title(dummy_rss_feed, Path("sample.mp3")) == "Sample file"
+
+
+def test_update_podcasts_in_place(dummy_rss_feed: RssFeed):
+    # When a podcast is updated in place
+    updated_rss_feed = update_podcasts(
+        dummy_rss_feed,
+        {Path("sample.mp3"): PodcastUpdate(duration="00:00:05")},
+        in_place=True,
+    )
+
+    # Then the given feed itself is modified
+    assert updated_rss_feed is dummy_rss_feed
+    assert get_podcast_duration(dummy_rss_feed, Path("sample.mp3")) == "00:00:05"
+
+
+def test_update_podcasts_twice_keeps_a_single_duration(dummy_rss_feed: RssFeed):
+    # When the duration of a podcast is updated twice in the same feed
+    for duration in ("00:00:04", "00:00:05"):
+        update_podcasts(
+            dummy_rss_feed,
+            {Path("sample.mp3"): PodcastUpdate(duration=duration)},
+            in_place=True,
+        )
+
+    # Then the item has a single duration, the last one
+    item = dummy_rss_feed.items_by_filename["sample.mp3"]
+    durations = item.findall("itunes:duration", namespaces=namespaces)
+    assert [duration.text for duration in durations] == ["00:00:05"]
+
+
+def test_iter_feed_items(resources_path):
+    # When the items of a feed are read as a stream
+    items = list(iter_feed_items(resources_path / "rss.xml"))
+
+    # Then every item is read with its filename, title and duration
+    assert items == [
+        FeedItem(
+            filename="Une_journ_e___la_radio_en_mars_1968.mp3",
+            title="Une journée à la radio en mars 1968",
+            duration="02:00:24",
+        ),
+        FeedItem(filename="sample.mp3", title="Sample file", duration="undefined"),
+    ]
+
+
+def test_iter_feed_items_of_saved_feed(dummy_rss_feed: RssFeed, tmp_path):
+    # Given a feed whose duration has been set, then saved
+    rss_feed_with_duration = set_podcast_duration(
+        dummy_rss_feed, Path("sample.mp3"), "00:00:05"
+    )
+    save_rss_feed(rss_feed_with_duration, tmp_path / "rss.xml")
+
+    # When it is read as a stream
+    items = list(iter_feed_items(tmp_path / "rss.xml"))
+
+    # Then the new duration is read
+    assert items[1].duration == "00:00:05"
+
+
+def test_read_podcast_titles(resources_path):
+    assert read_podcast_titles(resources_path / "rss.xml") == {
+        "Une_journ_e___la_radio_en_mars_1968.mp3": "Une journée à la radio en mars 1968",
+        "sample.mp3": "Sample file",
+    }
+
+
+def test_remove_podcasts_from_feed(resources_path, tmp_path):
+    # Given the content of a feed
+    content = (resources_path / "rss.xml").read_bytes()
+
+    # When a podcast is removed from it, then none
+    without_sample = remove_podcasts_from_feed(content, {"sample.mp3"})
+    unchanged = remove_podcasts_from_feed(content, set())
+
+    # Then only the other podcast is left in the first one, the second one is the same content
+    (tmp_path / "rss.xml").write_bytes(without_sample)
+    assert [item.filename for item in iter_feed_items(tmp_path / "rss.xml")] == [
+        "Une_journ_e___la_radio_en_mars_1968.mp3"
+    ]
+    assert unchanged is content
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import ffmpeg
+import numpy as np
+import pytest
+
+from python_client.silence import (
+    compute_energy_envelope,
+    find_quiet_boundaries,
+    get_silence_aware_segments,
+)
+
+
+def _generate_audio_with_pause(output_file: Path) -> Path:
+    """
+    4 seconds of tone, a pause of 1 second, then 4 seconds of tone
+    """
+    tone = ffmpeg.input("sine=frequency=440:sample_rate=44100:duration=4", f="lavfi")
+    pause = ffmpeg.input("anullsrc=sample_rate=44100:channel_layout=mono", f="lavfi")
+    ffmpeg.concat(tone, pause.filter("atrim", duration=1), tone, v=0, a=1).output(
+        str(output_file), loglevel="quiet"
+    ).run(overwrite_output=True)
+    return output_file
+
+
+def test_compute_energy_envelope(tmp_path: Path):
+    # Given an audio with a pause in the middle
+    audio = _generate_audio_with_pause(tmp_path / "audio.mp3")
+
+    # When its energy is computed
+    energy, window_seconds = compute_energy_envelope(audio)
+
+    # Then the pause is much quieter than the tone
+    assert len(energy) * window_seconds == pytest.approx(9, abs=0.1)
+    assert energy[round(4.5 / window_seconds)] < energy[round(2 / window_seconds)] - 40
+
+
+def test_find_quiet_boundaries():
+    # Given a loud audio of 60 seconds in windows of 0.1 second, with a gap between words at 25 seconds,
+    # and a pause from 32 to 35 seconds
+    energy = np.full(600, 80.0)
+    energy[250:252] = 0
+    energy[320:350] = 0
+
+    # When the boundary at 30 seconds is moved to a quiet spot within 10 seconds
+    boundaries = find_quiet_boundaries(energy, 0.1, [30], 10)
+
+    # Then it is in the pause, the gap between words being too short
+    assert 32 < boundaries[0] < 35
+
+
+def test_get_silence_aware_segments(tmp_path: Path):
+    # Given an audio with a pause between 4 and 5 seconds
+    audio = _generate_audio_with_pause(tmp_path / "audio.mp3")
+
+    # When it is split into segments of about 3 seconds, looking for pauses up to 1.5 seconds away
+    segments = get_silence_aware_segments(audio, 9, 3, overlap=0.5)
+
+    # Then there are as many segments as with fixed boundaries, and the second boundary is moved into the pause
+    assert len(segments) == 3
+    assert 4 < segments[2][0] < 5
+    assert segments[0][0] == 0 and segments[-1][1] == 9
+    assert segments[1][1] == segments[2][0] + 0.5
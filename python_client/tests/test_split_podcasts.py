@@ -1,17 +1,28 @@
+import shutil
+from argparse import Namespace
 from os import listdir
 from pathlib import Path
 
+import ffmpeg
 import pytest
+from pytest import approx
+from pytest_mock import MockerFixture
 
+from python_client import split_podcasts
 from python_client.audio_processing import get_duration
+from python_client.media_metadata import probe_media
 from python_client.split_podcasts import (
     get_segments,
     split_audio,
     get_title_for_each_segment,
     add_title_to_segment,
+    split_episode,
+    split_directory,
 )
 from tests.helpers import copy_resource_file
 
+pytestmark = pytest.mark.usefixtures("audio_backend")
+
 
 def test_split_audio(tmp_path: Path):
     # Given an mp3 file of 5 secs and a title in an input directory, an empty output directory
@@ -89,3 +100,308 @@ def test_add_title_to_segment(tmp_path):
 
     # Then the mp3 is modified, and lasts longer than before the modification
     assert get_duration(tmp_path / "sample.mp3") > duration
+
+
+def test_add_title_to_segment_writes_only_the_segment(tmp_path):
+    # Given a segment
+    copy_resource_file("sample.mp3", tmp_path)
+    sample_rate = probe_media(tmp_path / "sample.mp3").sample_rate
+
+    # When a title is added at its start
+    add_title_to_segment(tmp_path / "sample.mp3", "Partie 1 sur 1 de Episode")
+
+    # Then the segment is encoded in place, at its sample rate, without work files next to it
+    assert set(listdir(tmp_path)) == {"sample.mp3", ".split_journal.jsonl"}
+    assert probe_media(tmp_path / "sample.mp3").sample_rate == sample_rate
+
+
+def test_split_audio_in_copy_mode(tmp_path: Path):
+    # Given an mp3 file of 5 secs in an input directory, an empty output directory
+    input_dir = tmp_path / "input"
+    output_dir = tmp_path / "output"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    copy_resource_file("sample.mp3", input_dir)
+
+    # When it is split into parts of 2 secs, with 1 second overlap, by copying the mp3 frames
+    split_audio(
+        input_dir / "sample.mp3",
+        output_dir,
+        segment_duration_seconds=2,
+        overlap=1,
+        cutting_mode="copy",
+    )
+
+    # Then it generates the same 3 parts as when reencoding
+    assert set(listdir(output_dir)) == {
+        "sample_part_01_of_03.mp3",
+        "sample_part_02_of_03.mp3",
+        "sample_part_03_of_03.mp3",
+    }
+    assert get_duration(output_dir / "sample_part_01_of_03.mp3") == pytest.approx(
+        3, 0.1
+    )
+    assert get_duration(output_dir / "sample_part_03_of_03.mp3") == pytest.approx(
+        1, 0.1
+    )
+
+
+def test_split_audio_in_copy_mode_falls_back_to_reencoding(
+    tmp_path: Path, resources_path: Path
+):
+    # Given an audio file named .mp3 which is actually not an mp3
+    shutil.copy(resources_path / "sample.m4a", tmp_path / "sample.mp3")
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    # When it is split by copying its frames
+    split_audio(
+        tmp_path / "sample.mp3",
+        output_dir,
+        segment_duration_seconds=2,
+        overlap=1,
+        cutting_mode="copy",
+    )
+
+    # Then it is reencoded instead
+    assert len(listdir(output_dir)) == 3
+
+
+def test_split_episode_removes_partial_output_on_failure(
+    tmp_path: Path, mocker: MockerFixture
+):
+    # Given an output directory which contains the parts of other episodes, one whose name starts like this one's
+    (tmp_path / "other_part_01_of_01.mp3").touch()
+    (tmp_path / "sample_part_two_part_01_of_01.mp3").touch()
+
+    # When the split of an episode fails after having written one of its parts
+    def failing_split_audio(input_file: Path, output_dir: Path, **kwargs):
+        (output_dir / "sample_part_01_of_02.mp3").touch()
+        raise RuntimeError("ffmpeg crashed")
+
+    mocker.patch("python_client.split_podcasts.split_audio", failing_split_audio)
+    with pytest.raises(RuntimeError):
+        split_episode(tmp_path / "sample.mp3", tmp_path, "reencode")
+
+    # Then the parts of the failed episode are removed, the others are kept
+    assert sorted(listdir(tmp_path)) == [
+        "other_part_01_of_01.mp3",
+        "sample_part_two_part_01_of_01.mp3",
+    ]
+
+
+@pytest.mark.parametrize("cutting_mode", ["reencode", "copy"])
+def test_split_audio_with_title(tmp_path: Path, cutting_mode: str):
+    # Given an mp3 file of 5 secs
+    copy_resource_file("sample.mp3", tmp_path)
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    # When it is split into parts of 2 secs, with 1 second overlap, with the title of the episode
+    split_audio(
+        tmp_path / "sample.mp3",
+        output_dir,
+        segment_duration_seconds=2,
+        overlap=1,
+        cutting_mode=cutting_mode,
+        episode_title="Sample file",
+    )
+
+    # Then each part starts with its title, so lasts longer than the part itself, and keeps the input's sample rate
+    assert len(listdir(output_dir)) == 3
+    assert get_duration(output_dir / "sample_part_01_of_03.mp3") > 3
+    assert (
+        ffmpeg.probe(output_dir / "sample_part_01_of_03.mp3")["streams"][0][
+            "sample_rate"
+        ]
+        == "44100"
+    )
+
+
+def test_split_audio_with_title_in_copy_mode_keeps_the_encoding(
+    tmp_path: Path, resources_path: Path, capsys
+):
+    # Given a mono mp3 file of 5 secs at 64kbps
+    ffmpeg.input(str(resources_path / "sample.m4a")).output(
+        str(tmp_path / "sample.mp3"), loglevel="quiet", ac=1, ab="64k"
+    ).run()
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    # When it is split into parts of 2 secs, with 1 second overlap, by copying its frames after the titles
+    split_audio(
+        tmp_path / "sample.mp3",
+        output_dir,
+        segment_duration_seconds=2,
+        overlap=1,
+        cutting_mode="copy",
+        episode_title="Sample file",
+    )
+
+    # Then the frames are copied, after titles encoded like the input, and the duration of each part is read as
+    # ffprobe reads it
+    assert "reencoding" not in capsys.readouterr().out
+    for part_file in sorted(output_dir.glob("*.mp3")):
+        probe = ffmpeg.probe(part_file)
+        assert probe["streams"][0]["channels"] == 1
+        assert get_duration(part_file) == approx(
+            float(probe["format"]["duration"]), abs=0.05
+        )
+    assert len(listdir(output_dir)) == 3
+
+
+def test_split_episode_skips_episodes_already_split(
+    tmp_path: Path, mocker: MockerFixture
+):
+    # Given an episode which has already been split
+    copy_resource_file("sample.mp3", tmp_path)
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    split_episode(tmp_path / "sample.mp3", output_dir, "copy")
+
+    # When it is split again
+    split_audio_spy = mocker.spy(split_podcasts, "split_audio")
+    split_episode(tmp_path / "sample.mp3", output_dir, "copy")
+
+    # Then its parts are kept as they are
+    split_audio_spy.assert_not_called()
+    assert "sample_part_01_of_01.mp3" in listdir(output_dir)
+
+
+def test_split_episode_redoes_partial_output(tmp_path: Path, mocker: MockerFixture):
+    # Given an episode which has already been split, but whose part was then truncated
+    copy_resource_file("sample.mp3", tmp_path)
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    split_episode(tmp_path / "sample.mp3", output_dir, "copy")
+    (output_dir / "sample_part_01_of_01.mp3").write_bytes(b"")
+
+    # When it is split again
+    split_audio_spy = mocker.spy(split_podcasts, "split_audio")
+    split_episode(tmp_path / "sample.mp3", output_dir, "copy")
+
+    # Then it is split again
+    split_audio_spy.assert_called_once()
+    assert get_duration(output_dir / "sample_part_01_of_01.mp3") == pytest.approx(
+        5, abs=0.1
+    )
+
+
+def test_add_title_to_segment_is_idempotent(tmp_path):
+    # Given a segment to which a title was added
+    copy_resource_file("sample.mp3", tmp_path)
+    title = "Partie 1 sur 1 de Episode"
+    add_title_to_segment(tmp_path / "sample.mp3", title)
+    duration = get_duration(tmp_path / "sample.mp3")
+
+    # When the same title is added again, e.g. by a rerun
+    add_title_to_segment(tmp_path / "sample.mp3", title)
+
+    # Then the segment is left as it is, with a single title
+    assert get_duration(tmp_path / "sample.mp3") == duration
+
+
+def test_split_audio_with_silence_aware_boundaries(tmp_path: Path):
+    # Given an mp3 file of 5 secs
+    copy_resource_file("sample.mp3", tmp_path)
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    # When it is split into parts of 2 secs, cutting in the quietest spots
+    segment_files = split_audio(
+        tmp_path / "sample.mp3",
+        output_dir,
+        segment_duration_seconds=2,
+        overlap=0,
+        cutting_mode="copy",
+        boundaries="silence",
+    )
+
+    # Then there are as many parts as with fixed boundaries, adding up to the whole episode
+    assert len(segment_files) == 3
+    assert sum(map(get_duration, segment_files)) == pytest.approx(5, abs=0.2)
+
+
+def test_split_episode_with_another_encoding_profile(
+    tmp_path: Path, mocker: MockerFixture
+):
+    # Given an episode which has already been split with the default encoding
+    copy_resource_file("sample.mp3", tmp_path)
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    split_episode(tmp_path / "sample.mp3", output_dir, "reencode")
+
+    # When it is split again with a speech encoding
+    split_audio_spy = mocker.spy(split_podcasts, "split_audio")
+    split_episode(
+        tmp_path / "sample.mp3",
+        output_dir,
+        "reencode",
+        encoding_profile="speech-mono-64k",
+    )
+
+    # Then it is split again, and its part is mono
+    split_audio_spy.assert_called_once()
+    assert probe_media(output_dir / "sample_part_01_of_01.mp3").channels == 1
+
+
+def test_split_directory_skips_duplicate_episodes(tmp_path: Path):
+    # Given an episode downloaded twice, under the names of both podcasts of the feed
+    input_dir = tmp_path / "input"
+    output_dir = tmp_path / "output"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    copy_resource_file("sample.mp3", input_dir)
+    copy_resource_file("rss.xml", input_dir)
+    shutil.copy(
+        input_dir / "sample.mp3", input_dir / "Une_journ_e___la_radio_en_mars_1968.mp3"
+    )
+
+    # When the directory is split
+    split_directory(
+        input_dir,
+        output_dir,
+        Namespace(
+            cutting_mode="copy",
+            boundaries="fixed",
+            encoding_profile="archive",
+            no_titles=False,
+            jobs=1,
+        ),
+    )
+
+    # Then only the one coming first in the feed is split
+    assert [part.name for part in output_dir.glob("*.mp3")] == [
+        "Une_journ_e___la_radio_en_mars_1968_part_01_of_01.mp3"
+    ]
+
+
+def test_split_directory_converts_m4a_files_with_jobs(
+    tmp_path: Path, mocker: MockerFixture
+):
+    # Given an input directory with an m4a episode
+    input_dir = tmp_path / "input"
+    output_dir = tmp_path / "output"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    copy_resource_file("sample.m4a", input_dir)
+
+    # When the directory is split with 2 jobs
+    convert_spy = mocker.spy(split_podcasts, "convert_m4a_files_to_mp3")
+    split_directory(
+        input_dir,
+        output_dir,
+        Namespace(
+            cutting_mode="copy",
+            boundaries="fixed",
+            encoding_profile="archive",
+            no_titles=True,
+            jobs=2,
+        ),
+    )
+
+    # Then the m4a files are converted with 2 jobs too
+    assert convert_spy.call_args.kwargs["jobs"] == 2
+    assert [part.name for part in output_dir.glob("*.mp3")] == [
+        "sample_part_01_of_01.mp3"
+    ]
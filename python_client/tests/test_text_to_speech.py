@@ -1,10 +1,18 @@
 from os import listdir
 
+import ffmpeg
+from picotts import PicoTTS
+import pytest
+from pytest_mock import MockerFixture
+
 from python_client.text_to_speech import (
     _make_title_pronounceable,
     generate_part_title_audio,
+    get_part_title_audio,
 )
 
+pytestmark = pytest.mark.usefixtures("audio_backend")
+
 
 def test_make_title_pronounceable():
     assert _make_title_pronounceable("Episode 1/12") == "Episode 1 sur 12"
@@ -20,3 +28,44 @@ def test_generate_part_title_audio(tmp_path):
 
     # Then an audio file is generated
     assert listdir(tmp_path) == ["coucou.mp3"]
+
+
+def test_generate_part_title_audio_is_cached(tmp_path, mocker: MockerFixture):
+    # Given a title whose audio has already been generated
+    title = "Episode 2 sur 10"
+    generate_part_title_audio(title, tmp_path / "first.mp3")
+
+    # When the same title is generated again
+    synth_wav_spy = mocker.spy(PicoTTS, "synth_wav")
+    convert_to_mp3_spy = mocker.patch("python_client.text_to_speech.convert_to_mp3")
+    generate_part_title_audio(title, tmp_path / "second.mp3")
+
+    # Then the cached audio is used, neither synthesized nor encoded again
+    synth_wav_spy.assert_not_called()
+    convert_to_mp3_spy.assert_not_called()
+    assert (tmp_path / "second.mp3").read_bytes() == (
+        tmp_path / "first.mp3"
+    ).read_bytes()
+
+
+def test_get_part_title_audio_writes_only_the_mp3():
+    # When the audio of a title is generated
+    title_audio = get_part_title_audio("Episode 3 sur 10")
+
+    # Then the synthesized voice is piped to the encoder, only the mp3 is written in the cache
+    assert [file.name for file in title_audio.parent.iterdir() if file.is_file()] == [
+        title_audio.name
+    ]
+
+
+def test_get_part_title_audio_is_encoded_like_the_episode():
+    # When the audio of a title is generated for a mono episode at 64kbps
+    title_audio = get_part_title_audio(
+        "Episode 4 sur 10", sample_rate=44100, channels=1, bitrate=64000
+    )
+
+    # Then it is encoded the same way, and not mistaken for the title encoded with the default settings
+    stream = ffmpeg.probe(title_audio)["streams"][0]
+    assert stream["channels"] == 1
+    assert stream["bit_rate"] == "64000"
+    assert title_audio != get_part_title_audio("Episode 4 sur 10", sample_rate=44100)
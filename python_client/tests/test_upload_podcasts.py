@@ -1,12 +1,26 @@
-from datetime import datetime
+import json
+import shutil
+import subprocess
 from os import listdir
+from pathlib import Path
 
+import eyed3
+import pytest
+from pytest import approx
+from pytest_mock import MockerFixture
+
+from python_client import media_metadata, upload_podcasts
+from python_client.publishing import PublishSummary
 from python_client.rss_feed import RssFeed, get_podcast_duration
 from python_client.upload_podcasts import (
     determine_public_dir_path,
-    backup_rss_xml_file,
     fill_podcasts_duration,
     duration_to_hours,
+    prepare_episode,
+    prepare_podcast_upload,
+    publish_podcasts,
+    UploadState,
+    deploy,
 )
 from tests.helpers import copy_resource_file
 
@@ -21,25 +35,6 @@ def test_determine_public_dir_path():
     assert "python_client" in listdir(public_dir_path.parent)
 
 
-def test_backup_old_rss_xml_file_when_file_exists(tmp_path):
-    # Given a file rss.xml present in a directory
-    (tmp_path / "rss.xml").touch()
-
-    # When it is backed up at a certain time
-    backup_rss_xml_file(tmp_path, datetime(2025, 10, 30, 8, 12, 0))
-
-    # Then the file is renamed with the given timestamp
-    assert listdir(tmp_path) == ["rss_251030_081200.xml"]
-
-
-def test_backup_old_rss_xml_file_when_file_does_not_exist(tmp_path):
-    # Given an empty directory
-    # When it is backed up at a certain time
-    backup_rss_xml_file(tmp_path, datetime(2025, 10, 30, 8, 12, 0))
-    # Then the directory still is empty
-    assert listdir(tmp_path) == []
-
-
 def test_fill_podcasts_duration(tmp_path):
     # Given an input folder with an mp3 and a corresponding rss.xml
     copy_resource_file("sample.mp3", tmp_path)
@@ -58,3 +53,212 @@ def test_duration_to_hours():
     assert duration_to_hours(4) == "00:00:04"
     assert duration_to_hours(5.15) == "00:00:05"
     assert duration_to_hours(3727) == "01:02:07"
+
+
+def test_prepare_episode_of_m4a(tmp_path):
+    # Given an m4a episode
+    copy_resource_file("sample.m4a", tmp_path)
+
+    # When it is prepared
+    mp3_file, duration = prepare_episode(tmp_path / "sample.m4a", "Sample file")
+
+    # Then it is converted into a tagged mp3, and its duration is known
+    assert mp3_file == tmp_path / "sample.mp3"
+    assert eyed3.load(mp3_file).tag.title == "Sample file"
+    assert duration == approx(5, abs=0.1)
+
+
+def test_prepare_episode_of_mp3(tmp_path, mocker: MockerFixture):
+    # Given an mp3 episode
+    copy_resource_file("sample.mp3", tmp_path)
+
+    # When it is prepared
+    probe_spy = mocker.spy(media_metadata, "_probe_with_backend")
+    mp3_file, duration = prepare_episode(tmp_path / "sample.mp3", "Sample file")
+
+    # Then it is tagged, and its duration is read without running ffprobe
+    assert eyed3.load(mp3_file).tag.title == "Sample file"
+    assert duration == approx(5.04, abs=0.01)
+    probe_spy.assert_not_called()
+
+
+def test_prepare_podcast_upload(tmp_path, mocker: MockerFixture, monkeypatch):
+    # Given an input directory with an m4a episode and its rss feed, and an empty public directory
+    input_dir = tmp_path / "input"
+    public_dir = tmp_path / "public"
+    input_dir.mkdir()
+    copy_resource_file("sample.m4a", input_dir)
+    copy_resource_file("rss.xml", input_dir)
+    mocker.patch(
+        "python_client.upload_podcasts.determine_public_dir_path",
+        return_value=public_dir,
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("sys.argv", ["prepare_podcast_upload", str(input_dir)])
+
+    # When the upload is prepared
+    prepare_podcast_upload()
+
+    # Then the public directory holds the tagged mp3 and the rss feed with the episode's duration
+    assert {"rss.xml", "sample.mp3"} <= set(listdir(public_dir))
+    assert eyed3.load(public_dir / "sample.mp3").tag.title == "Sample file"
+    feed = RssFeed(public_dir / "rss.xml")
+    assert get_podcast_duration(feed, Path("sample.mp3")) == "00:00:05"
+    assert (tmp_path / "firebase.json").exists()
+
+
+def test_prepare_podcast_upload_with_profile(
+    tmp_path, mocker: MockerFixture, monkeypatch
+):
+    # Given an input directory with an m4a episode and its rss feed
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    copy_resource_file("sample.m4a", input_dir)
+    copy_resource_file("rss.xml", input_dir)
+    mocker.patch(
+        "python_client.upload_podcasts.determine_public_dir_path",
+        return_value=tmp_path / "public",
+    )
+    monkeypatch.chdir(tmp_path)
+    report_file = tmp_path / "report.json"
+    monkeypatch.setattr(
+        "sys.argv",
+        ["prepare_podcast_upload", str(input_dir), "--profile", str(report_file)],
+    )
+
+    # When the upload is prepared with profiling
+    prepare_podcast_upload()
+
+    # Then the report tells the time spent converting the episode and in each stage
+    report = json.loads(report_file.read_text())
+    conversion = report["calls"]["ffmpeg.convert_to_mp3"]
+    assert conversion["processes"] == 1
+    assert conversion["audio_seconds"] == approx(5, abs=0.1)
+    assert {"Preparing podcasts", "Publishing", "total"} <= set(report["stages"])
+
+
+def test_publish_podcasts_again_skips_prepared_episodes(
+    tmp_path, mocker: MockerFixture, monkeypatch
+):
+    # Given podcasts published once while watching the download directory
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    copy_resource_file("sample.m4a", input_dir)
+    copy_resource_file("rss.xml", input_dir)
+    monkeypatch.chdir(tmp_path)
+    state = UploadState()
+    publish_podcasts(input_dir, tmp_path / "public", state)
+    rss_stat = (input_dir / "rss.xml").stat()
+
+    # When they are published again, nothing having changed
+    prepare_episode_spy = mocker.spy(upload_podcasts, "prepare_episode")
+    rss_feed_spy = mocker.spy(upload_podcasts, "RssFeed")
+    publish_podcasts(input_dir, tmp_path / "public", state)
+
+    # Then the episode is not prepared again, the feed is neither parsed nor rewritten
+    prepare_episode_spy.assert_not_called()
+    rss_feed_spy.assert_not_called()
+    assert (input_dir / "rss.xml").stat().st_mtime_ns == rss_stat.st_mtime_ns
+    assert "sample.mp3" in listdir(tmp_path / "public")
+
+
+def test_publish_podcasts_skips_duplicate_episodes(tmp_path, monkeypatch):
+    # Given an episode downloaded twice, under the names of both podcasts of the feed
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    copy_resource_file("sample.mp3", input_dir)
+    copy_resource_file("rss.xml", input_dir)
+    shutil.copy(
+        input_dir / "sample.mp3", input_dir / "Une_journ_e___la_radio_en_mars_1968.mp3"
+    )
+    monkeypatch.chdir(tmp_path)
+
+    # When the podcasts are published
+    publish_podcasts(input_dir, tmp_path / "public")
+
+    # Then only the one coming first in the feed is published, and is the only podcast of the published feed
+    published_files = set(listdir(tmp_path / "public"))
+    assert "Une_journ_e___la_radio_en_mars_1968.mp3" in published_files
+    assert "sample.mp3" not in published_files
+    published_feed = RssFeed(tmp_path / "public" / "rss.xml")
+    assert list(published_feed.items_by_filename) == [
+        "Une_journ_e___la_radio_en_mars_1968.mp3"
+    ]
+    assert "sample.mp3" in RssFeed(input_dir / "rss.xml").items_by_filename
+
+
+def test_publish_podcasts_with_jobs(tmp_path, mocker: MockerFixture, monkeypatch):
+    # Given an input directory with an m4a episode and its rss feed
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    copy_resource_file("sample.m4a", input_dir)
+    copy_resource_file("rss.xml", input_dir)
+    monkeypatch.chdir(tmp_path)
+
+    # When the podcasts are published with a single job
+    run_jobs_spy = mocker.spy(upload_podcasts, "run_jobs")
+    publish_podcasts(input_dir, tmp_path / "public", jobs=1)
+
+    # Then the episodes are prepared one at a time
+    assert run_jobs_spy.call_args.args[2] == 1
+    assert "sample.mp3" in listdir(tmp_path / "public")
+
+
+def test_deploy_when_watching_only_after_changes(tmp_path):
+    # Given a watching upload, and a deploy command which counts its runs
+    state = UploadState()
+    deploy_command = f"echo deployed >> {tmp_path / 'deploys.txt'}"
+
+    # When a pass changes the public directory, then one changes nothing
+    deploy(deploy_command, PublishSummary(copied_files=1), state)
+    deploy(deploy_command, PublishSummary(unchanged_files=1), state)
+
+    # Then the public directory is deployed once
+    assert (tmp_path / "deploys.txt").read_text().splitlines() == ["deployed"]
+
+
+def test_deploy_when_watching_retries_a_failed_deploy(tmp_path):
+    # Given a watching upload whose deploy failed after a pass changed the public directory
+    state = UploadState()
+    with pytest.raises(subprocess.CalledProcessError):
+        deploy("exit 1", PublishSummary(linked_files=1), state)
+
+    # When a pass changes nothing
+    deploy(f"touch {tmp_path / 'deployed'}", PublishSummary(unchanged_files=1), state)
+
+    # Then the public directory is deployed anyway
+    assert (tmp_path / "deployed").exists()
+    assert not state.deploy_pending
+
+
+def test_prepare_podcast_upload_with_deploy_command(
+    tmp_path, mocker: MockerFixture, monkeypatch
+):
+    # Given an input directory with an m4a episode and its rss feed
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    copy_resource_file("sample.m4a", input_dir)
+    copy_resource_file("rss.xml", input_dir)
+    mocker.patch(
+        "python_client.upload_podcasts.determine_public_dir_path",
+        return_value=tmp_path / "public",
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "prepare_podcast_upload",
+            str(input_dir),
+            "--feed-page-size",
+            "1",
+            "--deploy-command",
+            "touch deployed",
+        ],
+    )
+
+    # When the upload is prepared
+    prepare_podcast_upload()
+
+    # Then the feed is paged, and the public directory deployed once published
+    assert "rss_page_2.xml" in listdir(tmp_path / "public")
+    assert (tmp_path / "deployed").exists()
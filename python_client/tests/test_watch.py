@@ -0,0 +1,48 @@
+import threading
+import time
+from pathlib import Path
+
+from python_client.watch import scan_directory, watch_directory
+
+
+def test_scan_directory_ignores_hidden_and_temporary_files(tmp_path: Path):
+    # Given a directory with an episode, an episode being downloaded and a hidden file
+    (tmp_path / "episode.mp3").write_bytes(b"mp3")
+    (tmp_path / "other.m4a.part").write_bytes(b"m4a")
+    (tmp_path / ".split_journal.jsonl").write_bytes(b"{}")
+
+    # Then only the episode is watched
+    assert list(scan_directory(tmp_path)) == [tmp_path / "episode.mp3"]
+
+
+def test_watch_directory_waits_for_files_to_be_written(tmp_path: Path):
+    # Given a directory with an episode, being watched
+    (tmp_path / "episode.mp3").write_bytes(b"mp3")
+    calls = []
+    stop = threading.Event()
+    watcher = threading.Thread(
+        target=watch_directory,
+        args=(tmp_path, calls.append),
+        kwargs={
+            "poll_interval": 0.02,
+            "settle_seconds": 0.3,
+            "should_stop": stop.is_set,
+        },
+    )
+    watcher.start()
+    try:
+        # When another episode is being written, then complete
+        time.sleep(0.5)
+        with open(tmp_path / "new.mp3", "wb") as f:
+            for _ in range(10):
+                f.write(b"chunk")
+                f.flush()
+                time.sleep(0.05)
+            assert len(calls) == 1
+        time.sleep(0.6)
+    finally:
+        stop.set()
+        watcher.join()
+
+    # Then all the files are processed first, then the new episode once it is complete
+    assert calls == [[tmp_path / "episode.mp3"], [tmp_path / "new.mp3"]]
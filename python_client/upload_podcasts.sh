@@ -1 +1 @@
-poetry run prepare_podcast_upload $1 && firebase deploy --only hosting --project podcasts-noan
+poetry run prepare_podcast_upload "$@" --deploy-command "firebase deploy --only hosting --project podcasts-noan"